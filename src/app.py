@@ -2,6 +2,10 @@ from flask import Flask, request
 from flask_restx import Api, Resource, fields
 from routes.server import router as server_router, api as server_api
 from routes.auth import router as auth_router, api as auth_api
+from routes.system import router as system_router, api as system_api
+from init.database import init_app as init_db_session
+from init.timing import init_app as init_request_timing
+from init.metrics import init_app as init_metrics
 # from routes.network_segment import router as network_segment_router
 # from init.database import init_db
 
@@ -17,12 +21,23 @@ api = Api(
 # 注册API命名空间
 api.add_namespace(server_api, path='/api/server')
 api.add_namespace(auth_api, path='/api/auth')
+api.add_namespace(system_api, path='/api/system')
 
 # 注册路由
 app.register_blueprint(server_router, url_prefix='/api/server')
 app.register_blueprint(auth_router, url_prefix='/api/auth')
+app.register_blueprint(system_router, url_prefix='/api/system')
 # app.register_blueprint(network_segment_router, url_prefix='/api/network_segment')
 
+# 请求结束时关闭请求内的数据库会话
+init_db_session(app)
+
+# 请求阶段耗时（Server-Timing 响应头）
+init_request_timing(app)
+
+# Prometheus 指标（/metrics）
+init_metrics(app)
+
 # 初始化数据库
 # init_db()
 
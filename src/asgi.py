@@ -0,0 +1,108 @@
+"""
+ASGI 入口（异步模式）
+服务器列表/详情、高级查询与网络段读取接口在事件循环中处理，数据库访问使用 SQLAlchemy 异步引擎
+（见 init/async_database.py），其余请求转交 Flask 应用（app.py）处理，对外的接口与同步模式一致
+
+需要额外安装: uvicorn、asgiref、greenlet 以及数据库对应的异步驱动（aiomysql / asyncpg / aiosqlite）
+
+用法:
+    uvicorn asgi:app --app-dir src --port 8081 --workers 4
+"""
+import io
+import traceback
+
+from asgiref.wsgi import WsgiToAsgi
+from werkzeug.exceptions import HTTPException
+from werkzeug.routing import Map, Rule
+from werkzeug.wrappers import Request
+
+from app import app as flask_app
+from init import timing
+from init.async_database import ASYNC_DB
+from routes import async_read
+from services.serializer import json_response
+
+# 异步处理的接口，未匹配的请求（包括这些路径上的其他方法）交给 Flask
+ASYNC_ROUTES = Map([
+    Rule('/api/server/', methods=['GET'], endpoint=async_read.list_servers),
+    Rule('/api/server/<int:id>', methods=['GET'], endpoint=async_read.get_server),
+    Rule('/api/server/query', methods=['POST'], endpoint=async_read.query_servers),
+    Rule('/api/network_segment/', methods=['GET'], endpoint=async_read.list_network_segments),
+    Rule('/api/network_segment/<int:network_segment_id>', methods=['GET'], endpoint=async_read.get_network_segment),
+]).bind('')
+
+wsgi_app = WsgiToAsgi(flask_app)
+
+
+def build_request(scope, body: bytes) -> Request:
+    """由 ASGI scope 与请求体构造 werkzeug 请求对象"""
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        'PATH_INFO': scope['path'],
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'SERVER_NAME': (scope.get('server') or ('localhost', 80))[0],
+        'SERVER_PORT': str((scope.get('server') or ('localhost', 80))[1]),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'CONTENT_LENGTH': str(len(body)),
+    }
+    for name, value in scope['headers']:
+        name = name.decode('latin-1').upper().replace('-', '_')
+        key = name if name in ('CONTENT_TYPE', 'CONTENT_LENGTH') else f'HTTP_{name}'
+        value = value.decode('latin-1')
+        environ[key] = f"{environ[key]},{value}" if key in environ and key.startswith('HTTP_') else value
+    return Request(environ)
+
+
+async def read_body(receive) -> bytes:
+    body = b''
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            return body
+
+
+async def send_response(response, send) -> None:
+    await send({
+        'type': 'http.response.start',
+        'status': response.status_code,
+        'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in response.headers.items()],
+    })
+    await send({'type': 'http.response.body', 'body': response.get_data()})
+
+
+async def lifespan(receive, send) -> None:
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await ASYNC_DB.dispose()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+    if scope['type'] == 'http':
+        try:
+            rule, values = ASYNC_ROUTES.match(scope['path'], scope['method'], return_rule=True)
+        except HTTPException:
+            rule = None
+        if rule is not None:
+            token = timing.begin(f"{scope['method']} {rule.rule}")
+            try:
+                response = await rule.endpoint(build_request(scope, await read_body(receive)), **values)
+            except Exception as e:
+                print(f"ERROR in ASGI {scope['method']} {scope['path']}:", str(e))
+                print('TRACEBACK:', traceback.format_exc())
+                response = json_response({'code': 500, 'message': f'请求处理失败: {str(e)}'}, 500)
+            request_timing = timing.end(token, response.status_code)
+            if request_timing is not None and request_timing.sampled:
+                response.headers['Server-Timing'] = request_timing.header()
+            return await send_response(response, send)
+    return await wsgi_app(scope, receive, send)
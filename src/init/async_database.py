@@ -0,0 +1,115 @@
+import logging
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy.engine import make_url
+
+from config import Config
+from init.pool import pool_stats
+from init.routing import PIN_PRIMARY, RoutingSession
+
+logger = logging.getLogger(__name__)
+
+# 同步驱动对应的异步驱动
+ASYNC_DRIVERS = {
+    "pymysql": "aiomysql",
+    "mysqldb": "aiomysql",
+    "psycopg2": "asyncpg",
+    "pysqlite": "aiosqlite",
+}
+
+
+def to_async_url(url: str) -> str:
+    """
+    将同步连接地址换用对应的异步驱动，已是异步驱动时原样返回
+
+    Raises:
+        ValueError: 没有对应的异步驱动时抛出
+    """
+    parsed = make_url(url)
+    driver = parsed.get_driver_name()
+    if driver in ASYNC_DRIVERS.values():
+        return url
+    if driver not in ASYNC_DRIVERS:
+        raise ValueError(f"没有与 {parsed.drivername} 对应的异步驱动，请设置 ASYNC_DATABASE_URL")
+    drivername = f"{parsed.get_backend_name()}+{ASYNC_DRIVERS[driver]}"
+    return parsed.set(drivername=drivername).render_as_string(hide_password=False)
+
+
+class AsyncDatabase:
+    """
+    异步模式的数据库引擎与会话工厂
+    首次使用时创建引擎（需安装 greenlet 与对应的异步驱动），会话类与同步模式相同（RoutingSession），
+    服务层代码通过 AsyncSession.run_sync 在异步连接上执行，读写分离规则不变
+    """
+
+    def __init__(self, url: str, replica_urls: Sequence[str] = ()):
+        self.url = url
+        self.replica_urls = list(replica_urls)
+        self.engine = None
+        self.replicas: List[Any] = []
+        self._sessionmaker = None
+
+    def _create_engine(self, url: str):
+        from sqlalchemy.ext.asyncio import create_async_engine
+
+        url = to_async_url(url)
+        options: Dict[str, Any] = {"echo": Config.DB_ECHO, "pool_pre_ping": Config.DB_POOL_PRE_PING}
+        if make_url(url).get_backend_name() != "sqlite":
+            options.update(
+                pool_size=Config.DB_POOL_SIZE,
+                max_overflow=Config.DB_MAX_OVERFLOW,
+                pool_timeout=Config.DB_POOL_TIMEOUT,
+                pool_recycle=Config.DB_POOL_RECYCLE,
+            )
+        return create_async_engine(url, **options)
+
+    def sessionmaker(self):
+        """异步会话工厂（首次调用时创建引擎）"""
+        if self._sessionmaker is None:
+            from sqlalchemy.ext.asyncio import async_sessionmaker
+
+            self.engine = self._create_engine(self.url)
+            self.replicas = [self._create_engine(url) for url in self.replica_urls]
+            self._sessionmaker = async_sessionmaker(
+                self.engine, sync_session_class=RoutingSession, autoflush=False, expire_on_commit=False,
+                replicas=[replica.sync_engine for replica in self.replicas])
+            logger.info(f"异步数据库引擎已创建: {self.engine.url!r}，从库 {len(self.replicas)} 个")
+        return self._sessionmaker
+
+    def session(self, pin_primary: bool = False):
+        """
+        创建异步会话
+
+        Args:
+            pin_primary: 为 True 时读操作也走主库（客户端持有未过期的一致性令牌）
+
+        Returns:
+            AsyncSession: 异步会话，使用 async with 管理生命周期
+        """
+        session = self.sessionmaker()()
+        if pin_primary:
+            session.sync_session.info[PIN_PRIMARY] = True
+        return session
+
+    async def dispose(self) -> None:
+        """关闭所有连接（进程退出前调用）"""
+        for engine in [self.engine, *self.replicas]:
+            if engine is not None:
+                await engine.dispose()
+        self.engine, self.replicas, self._sessionmaker = None, [], None
+
+    def stats(self) -> Optional[Dict[str, Any]]:
+        """主库连接池状态，配置了从库时在 replicas 中列出各从库的连接池状态；引擎尚未创建时返回 None"""
+        if self.engine is None:
+            return None
+        stats = pool_stats(self.engine.pool)
+        if self.replicas:
+            stats["replicas"] = [pool_stats(replica.pool) for replica in self.replicas]
+        return stats
+
+
+# 创建异步模式的数据库实例（只在 asgi.py 中使用）
+ASYNC_DB = AsyncDatabase(
+    Config.ASYNC_DATABASE_URL or Config.DATABASE_URL,
+    Config.ASYNC_DATABASE_REPLICA_URLS or Config.DATABASE_REPLICA_URLS,
+)
@@ -0,0 +1,317 @@
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from config import Config
+from init import timing
+from init.timing import RequestTiming
+
+logger = logging.getLogger(__name__)
+
+# Prometheus 文本格式的指标（/metrics）
+# 单进程时直接输出进程内的累计值；多进程部署（gunicorn/uvicorn --workers）时设置 METRICS_DIR，
+# 各进程定期把自己的累计值写入该目录下的 <pid>.json，/metrics 合并目录中全部进程的数据后输出：
+# 计数器与直方图累加（包括已退出的进程），连接池等瞬时值只合并仍存活的进程；
+# 与 prometheus_client 的 multiprocess 模式相同，该目录需在启动服务前清空
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ROW_BUCKETS = (0, 1, 10, 50, 100, 500, 1000, 5000, 10000)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50)
+
+# 指标名 -> (类型, 说明, 直方图分桶)
+METRICS: Dict[str, Tuple[str, str, Tuple[float, ...]]] = {
+    "cmdb_http_requests_total": ("counter", "HTTP 请求数", ()),
+    "cmdb_http_request_duration_seconds": ("histogram", "HTTP 请求耗时", LATENCY_BUCKETS),
+    "cmdb_response_rows": ("histogram", "每个请求返回的数据行数", ROW_BUCKETS),
+    "cmdb_sql_statements": ("histogram", "每个请求执行的 SQL 语句数", STATEMENT_BUCKETS),
+    "cmdb_sql_duration_seconds": ("histogram", "每个请求的 SQL 执行耗时", LATENCY_BUCKETS),
+    "cmdb_count_query_duration_seconds": ("histogram", "总数统计耗时", LATENCY_BUCKETS),
+    "cmdb_db_pool_connections": ("gauge", "连接池连接数（state: checked_out/checked_in/overflow/size）", ()),
+    "cmdb_db_pool_checkouts_total": ("counter", "从连接池取连接的次数", ()),
+    "cmdb_db_pool_wait_seconds_total": ("counter", "从连接池取连接的累计等待时间", ()),
+    "cmdb_db_pool_timeouts_total": ("counter", "从连接池取连接超时的次数", ()),
+    "cmdb_cache_hits_total": ("counter", "缓存命中次数", ()),
+    "cmdb_cache_misses_total": ("counter", "缓存未命中次数", ()),
+    "cmdb_cache_hit_ratio": ("gauge", "缓存命中率", ()),
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+# 缓存名 -> 返回 {"hits", "misses"} 的统计函数
+_caches: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+
+def register_cache(name: str, stats: Callable[[], Dict[str, Any]]) -> None:
+    """
+    注册需要输出命中率的缓存
+
+    Args:
+        name: 缓存名（指标的 cache 标签）
+        stats: 返回包含 hits 与 misses 的字典的函数
+    """
+    _caches[name] = stats
+
+
+def _labels(**labels: Any) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+class MetricsRegistry:
+    """进程内的计数器与直方图（直方图存储各分桶的非累计次数、总和与次数）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: Dict[Tuple[str, Labels], float] = {}
+        self.histograms: Dict[Tuple[str, Labels], List[float]] = {}
+
+    def inc(self, name: str, labels: Labels, value: float = 1) -> None:
+        with self._lock:
+            key = (name, labels)
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, labels: Labels, value: float) -> None:
+        buckets = METRICS[name][2]
+        with self._lock:
+            key = (name, labels)
+            entry = self.histograms.get(key)
+            if entry is None:
+                entry = self.histograms[key] = [0] * (len(buckets) + 1) + [0.0, 0]
+            index = next((i for i, bound in enumerate(buckets) if value <= bound), len(buckets))
+            entry[index] += 1
+            entry[-2] += value
+            entry[-1] += 1
+
+    def observe_request(self, request_timing: RequestTiming, status: Optional[int]) -> None:
+        """累计一个请求的指标（注册为 init.timing 的请求结束回调）"""
+        method, _, route = request_timing.route.partition(" ")
+        labels = _labels(method=method, route=route)
+        stages, counts = request_timing.stages, request_timing.counts
+        self.inc("cmdb_http_requests_total", _labels(method=method, route=route, status=status or 0))
+        self.observe("cmdb_http_request_duration_seconds", labels, stages["total"])
+        self.observe("cmdb_sql_statements", labels, counts.get("sql_statements", 0))
+        self.observe("cmdb_sql_duration_seconds", labels, stages.get("sql", 0.0))
+        if "rows" in counts:
+            self.observe("cmdb_response_rows", labels, counts["rows"])
+        if "count" in stages:
+            self.observe("cmdb_count_query_duration_seconds", labels, stages["count"])
+
+    def dump(self) -> Dict[str, Any]:
+        """可写入 JSON 的累计值"""
+        with self._lock:
+            return {
+                "counters": [[name, labels, value] for (name, labels), value in self.counters.items()],
+                "histograms": [[name, labels, list(entry)] for (name, labels), entry in self.histograms.items()],
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+
+def _pool_samples() -> Iterable[Tuple[str, Labels, float]]:
+    """主库/从库/异步模式连接池的状态"""
+    from init.async_database import ASYNC_DB
+    from init.database import get_pool_stats
+
+    pools = []
+    stats = get_pool_stats()
+    pools.append(("primary", stats))
+    pools.extend((f"replica{i}", replica) for i, replica in enumerate(stats.pop("replicas", [])))
+    async_stats = ASYNC_DB.stats()
+    if async_stats is not None:
+        pools.append(("async_primary", async_stats))
+        pools.extend((f"async_replica{i}", replica) for i, replica in enumerate(async_stats.pop("replicas", [])))
+
+    for pool, stats in pools:
+        for state in ("checked_out", "checked_in", "overflow", "size"):
+            if state in stats:
+                yield "cmdb_db_pool_connections", _labels(pool=pool, state=state), stats[state]
+        if "checkouts" in stats:
+            yield "cmdb_db_pool_checkouts_total", _labels(pool=pool), stats["checkouts"]
+            yield "cmdb_db_pool_wait_seconds_total", _labels(pool=pool), stats["wait_ms_total"] / 1000
+            yield "cmdb_db_pool_timeouts_total", _labels(pool=pool), stats["timeouts"]
+
+
+def _cache_samples() -> Iterable[Tuple[str, Labels, float]]:
+    for name, stats in list(_caches.items()):
+        values = stats()
+        yield "cmdb_cache_hits_total", _labels(cache=name), values["hits"]
+        yield "cmdb_cache_misses_total", _labels(cache=name), values["misses"]
+
+
+def collect_state() -> Dict[str, Any]:
+    """
+    连接池与缓存的当前状态（由各组件自身的统计读取，不在请求中累计）
+
+    Returns:
+        dict: {"counters": [...], "gauges": [...]}，累计型的统计（取连接次数、缓存命中次数）作为计数器
+    """
+    counters, gauges = [], []
+    for name, labels, value in [*_pool_samples(), *_cache_samples()]:
+        (gauges if METRICS[name][0] == "gauge" else counters).append([name, labels, value])
+    return {"counters": counters, "gauges": gauges}
+
+
+def _merge(snapshots: Iterable[Dict[str, Any]]) -> Dict[str, Dict[Tuple[str, Labels], Any]]:
+    """合并多个进程的数据: 计数器、直方图与瞬时值均按 (指标, 标签) 累加"""
+    merged: Dict[str, Dict[Tuple[str, Labels], Any]] = {"counters": {}, "histograms": {}, "gauges": {}}
+    for snapshot in snapshots:
+        for kind in ("counters", "gauges"):
+            for name, labels, value in snapshot.get(kind, []):
+                key = (name, tuple(map(tuple, labels)))
+                merged[kind][key] = merged[kind].get(key, 0) + value
+        for name, labels, entry in snapshot.get("histograms", []):
+            key = (name, tuple(map(tuple, labels)))
+            current = merged["histograms"].get(key)
+            merged["histograms"][key] = list(entry) if current is None else [a + b for a, b in zip(current, entry)]
+    return merged
+
+
+def _format_labels(labels: Labels, **extra: str) -> str:
+    items = [*labels, *extra.items()]
+    if not items:
+        return ""
+    escape = lambda value: value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{key}="{escape(value)}"' for key, value in items) + "}"
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def render(merged: Dict[str, Dict[Tuple[str, Labels], Any]]) -> str:
+    """输出 Prometheus 文本格式（0.0.4）"""
+    # 命中率由合并后的命中/未命中次数计算
+    for (name, labels), hits in list(merged["counters"].items()):
+        if name == "cmdb_cache_hits_total":
+            total = hits + merged["counters"].get(("cmdb_cache_misses_total", labels), 0)
+            merged["gauges"][("cmdb_cache_hit_ratio", labels)] = hits / total if total else 0.0
+
+    samples: Dict[str, List[str]] = {}
+    for kind in ("counters", "gauges"):
+        for (name, labels), value in sorted(merged[kind].items()):
+            samples.setdefault(name, []).append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+    for (name, labels), entry in sorted(merged["histograms"].items()):
+        lines = samples.setdefault(name, [])
+        cumulative = 0
+        for bound, count in zip([*METRICS[name][2], "+Inf"], entry[:-2]):
+            cumulative += count
+            le = bound if bound == "+Inf" else _format_value(bound)
+            lines.append(f"{name}_bucket{_format_labels(labels, le=le)} {_format_value(cumulative)}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(entry[-2])}")
+        lines.append(f"{name}_count{_format_labels(labels)} {_format_value(entry[-1])}")
+
+    output = []
+    for name, (kind, help_text, _) in METRICS.items():
+        if name in samples:
+            output.append(f"# HELP {name} {help_text}")
+            output.append(f"# TYPE {name} {kind}")
+            output.extend(samples[name])
+    return "\n".join(output) + "\n"
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class Metrics:
+    """
+    应用指标
+    请求结束时累计到进程内的 MetricsRegistry；配置了共享目录时，每隔 flush_interval 秒（以及输出指标时、
+    进程退出时）把本进程的累计值与连接池/缓存状态写入 <目录>/<pid>.json
+    """
+
+    def __init__(self, directory: str = "", flush_interval: float = 1.0):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.registry = MetricsRegistry()
+        self._last_flush = 0.0
+        self._flush_lock = threading.Lock()
+
+    def observe_request(self, request_timing: RequestTiming, status: Optional[int]) -> None:
+        self.registry.observe_request(request_timing, status)
+        if self.directory and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def _snapshot(self) -> Dict[str, Any]:
+        snapshot = self.registry.dump()
+        state = collect_state()
+        snapshot["counters"].extend(state["counters"])
+        snapshot["gauges"] = state["gauges"]
+        return snapshot
+
+    def flush(self) -> None:
+        """把本进程的数据写入共享目录（先写临时文件再替换，读取方不会读到写了一半的文件）"""
+        if not self.directory or not self._flush_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_flush = time.monotonic()
+            pid = os.getpid()
+            path = os.path.join(self.directory, f"{pid}.json")
+            os.makedirs(self.directory, exist_ok=True)
+            with open(f"{path}.tmp", "w") as f:
+                json.dump({"pid": pid, **self._snapshot()}, f)
+            os.replace(f"{path}.tmp", path)
+        except OSError as e:
+            logger.warning(f"写入指标文件失败: {e}")
+        finally:
+            self._flush_lock.release()
+
+    def _load_directory(self) -> List[Dict[str, Any]]:
+        snapshots = []
+        for filename in os.listdir(self.directory):
+            if not filename.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, filename)) as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"读取指标文件 {filename} 失败: {e}")
+                continue
+            # 已退出的进程只保留累计值
+            if not _pid_alive(snapshot.get("pid", 0)):
+                snapshot["gauges"] = []
+            snapshots.append(snapshot)
+        return snapshots
+
+    def render(self) -> str:
+        """全部进程（未配置共享目录时为本进程）的指标文本"""
+        if self.directory:
+            self.flush()
+            return render(_merge(self._load_directory()))
+        return render(_merge([self._snapshot()]))
+
+    def reset(self) -> None:
+        self.registry.reset()
+
+
+# 创建指标实例
+METRICS_COLLECTOR = Metrics(Config.METRICS_DIR, flush_interval=Config.METRICS_FLUSH_INTERVAL)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def init_app(app) -> None:
+    """注册 /metrics 接口，并在每个请求结束时累计指标"""
+    if not Config.METRICS_ENABLED:
+        return
+    from flask import Response
+
+    timing.add_observer(METRICS_COLLECTOR.observe_request)
+    if METRICS_COLLECTOR.directory:
+        atexit.register(METRICS_COLLECTOR.flush)
+
+    @app.route("/metrics")
+    def metrics():
+        return Response(METRICS_COLLECTOR.render(), mimetype=CONTENT_TYPE)
@@ -0,0 +1,68 @@
+import threading
+import time
+from typing import Any, Dict
+
+from sqlalchemy import exc
+from sqlalchemy.pool import Pool, QueuePool
+
+
+class TimedQueuePool(QueuePool):
+    """
+    记录取连接等待时间的连接池
+    连接池已满时请求会阻塞等待归还的连接，累计的等待时间与超时次数用于评估 worker 数量与连接池大小是否匹配
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.timeouts = 0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            with self._stats_lock:
+                self.checkouts += 1
+                self.wait_total += waited
+                self.wait_max = max(self.wait_max, waited)
+
+
+def pool_stats(pool: Pool) -> Dict[str, Any]:
+    """
+    连接池状态
+
+    Args:
+        pool: 引擎的连接池（engine.pool）
+
+    Returns:
+        dict: 连接池类型、容量、当前借出/空闲/溢出连接数，TimedQueuePool 额外包含取连接等待时间统计
+    """
+    stats: Dict[str, Any] = {"class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "size": pool.size(),
+            "max_overflow": pool._max_overflow,
+            "timeout": pool.timeout(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+        })
+    if isinstance(pool, TimedQueuePool):
+        with pool._stats_lock:
+            stats.update({
+                "checkouts": pool.checkouts,
+                "wait_ms_total": round(pool.wait_total * 1000, 3),
+                "wait_ms_avg": round(pool.wait_total * 1000 / pool.checkouts, 3) if pool.checkouts else 0.0,
+                "wait_ms_max": round(pool.wait_max * 1000, 3),
+                "timeouts": pool.timeouts,
+            })
+    return stats
@@ -0,0 +1,96 @@
+import functools
+import random
+import time
+from contextlib import contextmanager
+from typing import List, Optional
+
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.dml import UpdateBase
+
+# Session.info 中的标记
+REPLICA_READS = "replica_reads"   # 正在执行只读的服务方法（计数，支持嵌套调用）
+PIN_PRIMARY = "pin_primary"       # 客户端持有未过期的一致性令牌，所有读操作走主库
+WROTE = "wrote"                   # 本会话已在主库上执行过写操作
+
+
+class RoutingSession(Session):
+    """
+    读写分离会话
+    只读服务方法（@replica_read）中的查询发往从库，其余操作（写入、flush、SELECT ... FOR UPDATE、
+    未标记为只读的方法中的查询）发往主库；会话写过主库或被一致性令牌固定到主库后，读操作也走主库。
+    每个会话固定使用随机选出的一个从库，同一请求内的多次读取看到一致的数据
+    """
+
+    def __init__(self, *args, replicas: Optional[List] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.replicas = list(replicas or [])
+        self._replica = None
+
+    def get_bind(self, mapper=None, *, clause=None, **kw):
+        writing = self._flushing or isinstance(clause, UpdateBase) or \
+            getattr(clause, "_for_update_arg", None) is not None
+        if writing:
+            self.info[WROTE] = True
+        elif self.replicas and self.info.get(REPLICA_READS) and not self.info.get(PIN_PRIMARY) \
+                and not self.info.get(WROTE):
+            if self._replica is None:
+                self._replica = random.choice(self.replicas)
+            return self._replica
+        return super().get_bind(mapper, clause=clause, **kw)
+
+
+@contextmanager
+def use_replica(db: Session):
+    """在该上下文中把会话的读操作发往从库（非 RoutingSession 时不起作用）"""
+    db.info[REPLICA_READS] = db.info.get(REPLICA_READS, 0) + 1
+    try:
+        yield db
+    finally:
+        db.info[REPLICA_READS] -= 1
+
+
+@contextmanager
+def use_primary(db: Session, pin: bool = True):
+    """
+    在该上下文中把会话的读操作固定到主库（pin 为 False 时不起作用）
+    用于刚失效的共享缓存从数据库重新填充: 从库可能尚未同步触发失效的写入
+    """
+    if not pin:
+        yield db
+        return
+    previous = db.info.get(PIN_PRIMARY)
+    db.info[PIN_PRIMARY] = True
+    try:
+        yield db
+    finally:
+        if previous is None:
+            db.info.pop(PIN_PRIMARY, None)
+        else:
+            db.info[PIN_PRIMARY] = previous
+
+
+def replica_read(method):
+    """标记只读的服务方法（服务对象的 db 属性为会话），方法内的查询发往从库"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with use_replica(self.db):
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def issue_consistency_token(window: float) -> str:
+    """
+    生成一致性令牌: 客户端写入后在 window 秒内带上该令牌，读操作固定走主库（读到自己的写入）
+
+    Returns:
+        str: 令牌（过期时间的毫秒时间戳）
+    """
+    return str(int((time.time() + window) * 1000))
+
+
+def token_pins_primary(token: Optional[str], window: float) -> bool:
+    """令牌是否仍在有效期内（过期时间超出 window 的令牌视为无效，避免客户端长期占用主库）"""
+    if not token or not token.isdigit():
+        return False
+    remaining = int(token) / 1000 - time.time()
+    return 0 < remaining <= window
@@ -0,0 +1,277 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from contextvars import ContextVar
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from config import Config
+from init import timing
+
+logger = logging.getLogger(__name__)
+
+# 慢查询日志: 执行时间超过阈值的 SQL 语句连同发起它的接口查询（QueryGroup）写入按大小轮转的日志文件（每行一个 JSON），
+# 并按查询指纹（查询形态 + 规范化的 SQL）累计，供 /api/system/slow_queries 输出耗时最多的查询
+
+# IN 列表（expanding 参数展开后的占位符个数随取值数量变化）归并为同一形态
+_IN_LIST = re.compile(r"\bIN\s*\((?:[^()]|\([^()]*\))*\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+# 当前请求正在执行的接口查询: (QueryGroup 的 JSON, 查询形态)
+_current_query: ContextVar[Optional[Tuple[Any, Any]]] = ContextVar("slow_query_dsl", default=None)
+
+# 返回结果集的慢语句执行完时还没有读取结果（驱动的 rowcount 为 -1）: 先挂在当前请求上，
+# 下一条语句执行或请求结束时，以期间当前请求读取的行数（timing 的 rows 计数）补全后再写入
+_pending: ContextVar[Optional[Tuple[timing.RequestTiming, List[Tuple[Dict[str, Any], int]]]]] = \
+    ContextVar("slow_query_pending", default=None)
+
+
+def bind_query(query, shape):
+    """
+    标记当前请求正在执行的接口查询，之后的慢 SQL 会记录该查询
+
+    Args:
+        query: QueryGroup / QueryCondition
+        shape: 查询编译器给出的查询形态
+
+    Returns:
+        交给 unbind_query() 的令牌
+    """
+    return _current_query.set((query, shape))
+
+
+def unbind_query(token) -> None:
+    if token is not None:
+        _current_query.reset(token)
+
+
+def normalize_sql(statement: str) -> str:
+    """合并空白并归并 IN 列表，使同一形态的语句得到相同的文本"""
+    return _IN_LIST.sub("IN (...)", _WHITESPACE.sub(" ", statement).strip())
+
+
+def fingerprint(statement: str, shape=None) -> str:
+    """查询指纹: 查询形态与规范化 SQL 的摘要"""
+    source = json.dumps(shape, default=str) + "\n" + normalize_sql(statement)
+    return hashlib.sha1(source.encode("utf-8")).hexdigest()[:16]
+
+
+def _current_route() -> Optional[str]:
+    request_timing = timing.current()
+    if request_timing is not None:
+        return request_timing.route
+    from flask import has_request_context, request
+
+    if has_request_context():
+        return f"{request.method} {request.url_rule.rule if request.url_rule else request.path}"
+    return None
+
+
+class SlowQueryLog:
+    """
+    慢查询记录与按指纹的汇总
+    汇总最多保留 max_fingerprints 个指纹，超出时淘汰累计耗时最少的指纹
+    """
+
+    def __init__(self, threshold_ms: float, path: str = "", max_bytes: int = 10 * 1024 * 1024,
+                 backup_count: int = 5, max_fingerprints: int = 1000):
+        self.threshold_ms = threshold_ms
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.max_fingerprints = max_fingerprints
+        self._lock = threading.Lock()
+        self._summary: Dict[str, Dict[str, Any]] = {}
+        self._file_logger: Optional[logging.Logger] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold_ms > 0
+
+    def _writer(self) -> Optional[logging.Logger]:
+        """日志文件（首次写入时创建，未配置路径时返回 None）"""
+        if not self.path:
+            return None
+        if self._file_logger is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            handler = RotatingFileHandler(self.path, maxBytes=self.max_bytes, backupCount=self.backup_count,
+                                          encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            file_logger = logging.getLogger(f"{__name__}.file")
+            file_logger.handlers = [handler]
+            file_logger.setLevel(logging.INFO)
+            file_logger.propagate = False
+            self._file_logger = file_logger
+        return self._file_logger
+
+    def record(self, statement: str, parameters, executemany: bool, duration_ms: float,
+               rowcount: Optional[int]) -> Dict[str, Any]:
+        """
+        记录一条慢 SQL
+
+        Args:
+            statement: SQL 语句（带参数占位符）
+            parameters: 绑定参数
+            executemany: 是否为批量执行（只记录第一组参数）
+            duration_ms: 执行耗时（毫秒）
+            rowcount: 修改的行数或读取的行数，未知时为 None
+
+        Returns:
+            dict: 写入日志的记录
+        """
+        return self._write(self._entry(statement, parameters, executemany, duration_ms, rowcount))
+
+    def defer(self, request_timing: timing.RequestTiming, statement: str, parameters, executemany: bool,
+              duration_ms: float) -> Dict[str, Any]:
+        """
+        记录一条返回结果集的慢 SQL，读取的行数在下一条语句执行或请求结束时补全（见 flush）
+
+        Returns:
+            dict: 尚未写入的记录
+        """
+        timing.add_observer(self._flush_request)
+        entry = self._entry(statement, parameters, executemany, duration_ms, None)
+        pending = _pending.get()
+        if pending is None or pending[0] is not request_timing:
+            pending = (request_timing, [])
+            _pending.set(pending)
+        pending[1].append((entry, request_timing.counts.get("rows", 0)))
+        return entry
+
+    def flush(self) -> None:
+        """写入当前请求挂起的记录，行数为语句执行后当前请求读取的行数"""
+        pending = _pending.get()
+        if pending is None:
+            return
+        _pending.set(None)
+        request_timing, entries = pending
+        rows = request_timing.counts.get("rows", 0)
+        for entry, start in entries:
+            entry["rowcount"] = rows - start
+            try:
+                self._write(entry)
+            except Exception as e:
+                logger.warning(f"记录慢查询失败: {e}")
+
+    def _flush_request(self, request_timing: timing.RequestTiming, status: Optional[int]) -> None:
+        self.flush()
+
+    def _entry(self, statement: str, parameters, executemany: bool, duration_ms: float,
+               rowcount: Optional[int]) -> Dict[str, Any]:
+        current = _current_query.get()
+        query, shape = current if current is not None else (None, None)
+        if executemany and parameters:
+            parameters = parameters[0]
+        return {
+            "time": datetime.now().isoformat(timespec="milliseconds"),
+            "fingerprint": fingerprint(statement, shape),
+            "route": _current_route(),
+            "duration_ms": round(duration_ms, 3),
+            "rowcount": rowcount,
+            "query": query.model_dump(mode="json") if query is not None else None,
+            "sql": statement,
+            "params": json.loads(json.dumps(parameters, default=str)),
+            "executemany": executemany,
+        }
+
+    def _write(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        """累计到指纹汇总并写入日志文件"""
+        duration_ms = entry["duration_ms"]
+        with self._lock:
+            summary = self._summary.get(entry["fingerprint"])
+            if summary is None:
+                if len(self._summary) >= self.max_fingerprints:
+                    del self._summary[min(self._summary, key=lambda key: self._summary[key]["total_ms"])]
+                summary = self._summary[entry["fingerprint"]] = {
+                    "fingerprint": entry["fingerprint"],
+                    "count": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "routes": {},
+                    "query": entry["query"],
+                    "sql": normalize_sql(entry["sql"]),
+                    "last_seen": None,
+                }
+            summary["count"] += 1
+            summary["total_ms"] += duration_ms
+            summary["max_ms"] = max(summary["max_ms"], duration_ms)
+            summary["routes"][entry["route"]] = summary["routes"].get(entry["route"], 0) + 1
+            summary["last_seen"] = entry["time"]
+
+        writer = self._writer()
+        if writer is not None:
+            writer.info(json.dumps(entry, ensure_ascii=False))
+        return entry
+
+    def top(self, limit: int = 10, order_by: str = "total_ms") -> List[Dict[str, Any]]:
+        """
+        按指纹汇总的慢查询
+
+        Args:
+            limit: 返回的指纹数量
+            order_by: 排序依据（total_ms / count / max_ms / avg_ms），降序
+
+        Returns:
+            list: [{fingerprint, count, total_ms, avg_ms, max_ms, routes, query, sql, last_seen}, ...]
+
+        Raises:
+            ValueError: 排序依据不支持时抛出
+        """
+        if order_by not in ("total_ms", "count", "max_ms", "avg_ms"):
+            raise ValueError(f"不支持的排序依据: {order_by}")
+        with self._lock:
+            items = [
+                {**summary, "routes": dict(summary["routes"]), "total_ms": round(summary["total_ms"], 3),
+                 "max_ms": round(summary["max_ms"], 3), "avg_ms": round(summary["total_ms"] / summary["count"], 3)}
+                for summary in self._summary.values()
+            ]
+        items.sort(key=lambda item: item[order_by], reverse=True)
+        return items[:limit]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._summary.clear()
+
+
+# 创建慢查询日志实例
+SLOW_QUERY_LOG = SlowQueryLog(Config.SLOW_QUERY_THRESHOLD_MS, Config.SLOW_QUERY_LOG_FILE,
+                              max_bytes=Config.SLOW_QUERY_LOG_MAX_BYTES,
+                              backup_count=Config.SLOW_QUERY_LOG_BACKUP_COUNT)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if SLOW_QUERY_LOG.enabled:
+        conn.info.setdefault("slow_query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # 上一条返回结果集的慢语句的结果已读取完
+    SLOW_QUERY_LOG.flush()
+    starts = conn.info.get("slow_query_start")
+    if not starts:
+        return
+    duration_ms = (time.perf_counter() - starts.pop()) * 1000
+    if duration_ms < SLOW_QUERY_LOG.threshold_ms:
+        return
+    request_timing = timing.current()
+    try:
+        if cursor.description is not None and request_timing is not None:
+            SLOW_QUERY_LOG.defer(request_timing, statement, parameters, executemany, duration_ms)
+        else:
+            # 写语句记录驱动返回的修改行数；不在请求中的查询无法统计读取的行数
+            rowcount = getattr(cursor, "rowcount", -1) if cursor.description is None else -1
+            SLOW_QUERY_LOG.record(statement, parameters, executemany, duration_ms,
+                                  rowcount if rowcount >= 0 else None)
+    except Exception as e:
+        # 记录失败不影响查询本身
+        logger.warning(f"记录慢查询失败: {e}")
@@ -0,0 +1,197 @@
+import random
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from config import Config
+
+# 请求各阶段的耗时以 Server-Timing 响应头返回，并按 (路由, 阶段) 累计到进程内统计
+# 阶段: validate 请求校验、compile 查询编译、count 总数统计、fetch 读取数据、serialize 行序列化、
+# encode JSON 编码、snapshot 内存快照查询、sql 所有 SQL 语句的执行时间（与 count/fetch 重叠）、total 请求总耗时
+
+
+class RequestTiming:
+    """单个请求的阶段耗时（秒）与计数（返回行数、SQL 语句数）"""
+    __slots__ = ("route", "start", "stages", "counts", "sampled")
+
+    def __init__(self, route: str, sampled: bool = True):
+        self.route = route
+        self.start = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+        self.sampled = sampled
+
+    def add(self, name: str, seconds: float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def incr(self, name: str, n: int = 1) -> None:
+        self.counts[name] = self.counts.get(name, 0) + n
+
+    def header(self) -> str:
+        """Server-Timing 响应头的值（毫秒）"""
+        return ", ".join(f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.stages.items())
+
+
+class TimingStats:
+    """按 (路由, 阶段) 累计的耗时统计: 次数、总耗时与最大耗时"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data: Dict[str, Dict[str, list]] = defaultdict(lambda: defaultdict(lambda: [0, 0.0, 0.0]))
+
+    def record(self, timing: RequestTiming) -> None:
+        with self._lock:
+            stages = self._data[timing.route]
+            for name, seconds in timing.stages.items():
+                entry = stages[name]
+                entry[0] += 1
+                entry[1] += seconds
+                entry[2] = max(entry[2], seconds)
+
+    def snapshot(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """{路由: {阶段: {count, avg_ms, max_ms, total_ms}}}"""
+        with self._lock:
+            return {
+                route: {
+                    name: {
+                        "count": count,
+                        "avg_ms": round(total * 1000 / count, 3),
+                        "max_ms": round(peak * 1000, 3),
+                        "total_ms": round(total * 1000, 3),
+                    }
+                    for name, (count, total, peak) in stages.items()
+                }
+                for route, stages in self._data.items()
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+_current: ContextVar[Optional[RequestTiming]] = ContextVar("request_timing", default=None)
+
+# 进程内耗时统计实例
+TIMING_STATS = TimingStats()
+
+# 请求结束时的回调 callback(timing, status)
+_observers: List[Callable[[RequestTiming, Optional[int]], None]] = []
+
+
+def add_observer(callback: Callable[[RequestTiming, Optional[int]], None]) -> None:
+    """
+    注册请求结束时的回调（如 init/metrics.py 的指标累计）
+    注册后所有请求都会记录阶段耗时，采样率只决定是否返回 Server-Timing 头并累计到 TIMING_STATS
+    """
+    if callback not in _observers:
+        _observers.append(callback)
+
+
+def begin(route: str, sample_rate: Optional[float] = None):
+    """
+    开始记录当前请求（按采样率决定是否记录）
+
+    Returns:
+        未采样且没有注册回调时返回 None，否则返回交给 end() 的令牌
+    """
+    rate = Config.SERVER_TIMING_SAMPLE_RATE if sample_rate is None else sample_rate
+    sampled = rate >= 1 or (rate > 0 and random.random() < rate)
+    if not sampled and not _observers:
+        return None
+    return _current.set(RequestTiming(route, sampled))
+
+
+def end(token, status: Optional[int] = None) -> Optional[RequestTiming]:
+    """
+    结束记录，被采样的请求累计到 TIMING_STATS，并调用注册的回调
+
+    Args:
+        token: begin() 返回的令牌
+        status: 响应状态码
+
+    Returns:
+        本次请求的耗时，未记录时返回 None；只有 sampled 为 True 时才应返回 Server-Timing 头
+    """
+    if token is None:
+        return None
+    timing = _current.get()
+    _current.reset(token)
+    if timing is None:
+        return None
+    timing.add("total", time.perf_counter() - timing.start)
+    if timing.sampled:
+        TIMING_STATS.record(timing)
+    for callback in _observers:
+        callback(timing, status)
+    return timing
+
+
+def current() -> Optional[RequestTiming]:
+    """当前请求的耗时记录（未记录时返回 None）"""
+    return _current.get()
+
+
+@contextmanager
+def stage(name: str):
+    """记录一个阶段的耗时（当前请求未记录时只有一次 ContextVar 读取的开销）"""
+    timing = _current.get()
+    if timing is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing.add(name, time.perf_counter() - start)
+
+
+def incr(name: str, n: int = 1) -> None:
+    """当前请求的计数加 n（未记录时忽略）"""
+    timing = _current.get()
+    if timing is not None:
+        timing.incr(name, n)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("timing_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    timing = _current.get()
+    starts = conn.info.get("timing_start")
+    if timing is not None and starts:
+        timing.add("sql", time.perf_counter() - starts.pop())
+        timing.incr("sql_statements")
+
+
+def init_app(app) -> None:
+    """为 Flask 应用的每个请求记录阶段耗时，并在响应中加入 Server-Timing 头"""
+    from flask import g, request
+
+    @app.before_request
+    def _begin_timing():
+        rule = request.url_rule.rule if request.url_rule else "<unmatched>"
+        g._timing_token = begin(f"{request.method} {rule}")
+
+    @app.after_request
+    def _end_timing(response):
+        timing = end(g.pop("_timing_token", None), response.status_code)
+        if timing is not None and timing.sampled:
+            response.headers["Server-Timing"] = timing.header()
+        return response
+
+    @app.teardown_request
+    def _discard_timing(exception=None):
+        # 请求异常结束（未经过 after_request）时丢弃未完成的记录，避免线程复用时串到下一个请求
+        token = g.pop("_timing_token", None)
+        if token is not None:
+            _current.reset(token)
@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import BigInteger, Boolean, DateTime, String, Text
+from sqlalchemy import BigInteger, Boolean, DateTime, Integer, String, Text
 from sqlalchemy.orm import Mapped, mapped_column
 from init.database import Base
 
@@ -24,6 +24,10 @@ class NetworkSegment(Base):
     last_modified_by: Mapped[str] = mapped_column(String(20), default="")  # 最后修改人
     last_modified_date: Mapped[datetime] = mapped_column(DateTime, default=datetime.now)  # 最后修改时间
     is_valid: Mapped[bool] = mapped_column(Boolean, default=True)  # 是否有效
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=1, server_default="1")  # 行版本号（ETag / If-Match）
+
+    # ORM 更新与删除时校验并递增版本号
+    __mapper_args__ = {"version_id_col": version}
 
     def __repr__(self):
         return f"<NetworkSegment(id={self.id}, name={self.name})>" 
\ No newline at end of file
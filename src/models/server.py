@@ -12,7 +12,7 @@ class Server(Base):
 
 
     # 基本信息
-    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)  # 主键ID
+    id: Mapped[int] = mapped_column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)  # 主键ID（SQLite 只有 INTEGER 主键自增）
     service_tag: Mapped[str] = mapped_column(String(100), default="")  # 设备序列号
     name: Mapped[str] = mapped_column(String(100), default="")  # 服务器名
     agent_name: Mapped[str] = mapped_column(String(100), default="")  # Agent抓取主机名
@@ -82,6 +82,10 @@ class Server(Base):
     last_modified_by: Mapped[str] = mapped_column(String(20), default="")  # 最后修改人
     last_modified_date: Mapped[datetime] = mapped_column(DateTime, default=datetime.now)  # 最后修改时间
     is_valid: Mapped[bool] = mapped_column(Boolean, default=True)  # 是否有效
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=1, server_default="1")  # 行版本号（ETag / If-Match）
+
+    # ORM 更新与删除时校验并递增版本号，批量写语句需自行设置 version = version + 1
+    __mapper_args__ = {"version_id_col": version}
 
     def __repr__(self):
         return f"<Server(id={self.id}, service_tag={self.service_tag})>"
@@ -0,0 +1,32 @@
+from datetime import datetime
+from sqlalchemy import BigInteger, DateTime, Integer, Numeric, String
+from sqlalchemy.orm import Mapped, mapped_column
+from init.database import Base
+
+class ServerCapacityRollup(Base):
+    """
+    服务器容量汇总
+    按 网段/分组/标签/使用状态 汇总的服务器数量与容量指标，由 ServerService 写操作在同一事务内增量更新；
+    维度为空值时按 0 / 空字符串 统计
+    """
+    __tablename__ = "server_capacity_rollup"  # 数据库表名
+
+    # 汇总维度
+    network_segment_id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=False)  # 网段ID
+    group_id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=False)  # 分组ID
+    label: Mapped[str] = mapped_column(String(100), primary_key=True)  # 服务器标签
+    use_status: Mapped[str] = mapped_column(String(20), primary_key=True)  # 使用状态
+
+    # 汇总指标
+    server_count: Mapped[int] = mapped_column(Integer, default=0)  # 服务器数量
+    cpu_cores: Mapped[int] = mapped_column(BigInteger, default=0)  # CPU物理核总数
+    cpu_kernel_number: Mapped[float] = mapped_column(Numeric(18, 2), default=0)  # CPU线程总数
+    ram_size: Mapped[float] = mapped_column(Numeric(18, 2), default=0)  # 内存总量,单位G
+    storage_amount: Mapped[int] = mapped_column(BigInteger, default=0)  # 硬盘总数
+    filesystem_disk_space: Mapped[int] = mapped_column(BigInteger, default=0)  # 系统磁盘空间总量
+
+    last_modified_date: Mapped[datetime] = mapped_column(DateTime, default=datetime.now)  # 最后更新时间
+
+    def __repr__(self):
+        return (f"<ServerCapacityRollup(network_segment_id={self.network_segment_id}, group_id={self.group_id}, "
+                f"label={self.label}, use_status={self.use_status}, server_count={self.server_count})>")
@@ -0,0 +1,25 @@
+from sqlalchemy import BigInteger, Index, String
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.types import VARBINARY
+from init.database import Base
+
+class ServerIp(Base):
+    """
+    服务器 IP 索引
+    每行表示服务器某个 IP 字段中的一个地址，统一编码为 16 字节大端整数（IPv4 映射为 ::ffff:a.b.c.d），
+    字节序与数值序一致，网段/区间查询可直接使用索引范围扫描
+    """
+    __tablename__ = "server_ip"  # 数据库表名
+
+    field: Mapped[str] = mapped_column(String(50), primary_key=True)  # 字段名
+    ip: Mapped[bytes] = mapped_column(VARBINARY(16).with_variant(postgresql.BYTEA(), "postgresql"),
+                                      primary_key=True)  # 编码后的IP地址
+    server_id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=False)  # 服务器ID
+
+    __table_args__ = (
+        Index("ix_server_ip_server_id", "server_id"),
+    )
+
+    def __repr__(self):
+        return f"<ServerIp(field={self.field}, ip={self.ip.hex()}, server_id={self.server_id})>"
@@ -0,0 +1,21 @@
+from sqlalchemy import BigInteger, Index, String
+from sqlalchemy.orm import Mapped, mapped_column
+from init.database import Base
+
+class ServerNgram(Base):
+    """
+    服务器字符串字段的 n-gram 倒排索引
+    每行表示服务器某个字段的值中包含某个 n-gram（以 64 位哈希存储），用于缩小 like 条件的候选范围
+    """
+    __tablename__ = "server_ngram"  # 数据库表名
+
+    field: Mapped[str] = mapped_column(String(50), primary_key=True)  # 字段名
+    gram: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=False)  # n-gram 哈希
+    server_id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=False)  # 服务器ID
+
+    __table_args__ = (
+        Index("ix_server_ngram_server_id", "server_id"),
+    )
+
+    def __repr__(self):
+        return f"<ServerNgram(field={self.field}, gram={self.gram}, server_id={self.server_id})>"
@@ -0,0 +1,167 @@
+# 异步模式（asgi.py）下的读接口
+# 路径、参数、查询 DSL 与响应格式与 routes/server.py、routes/network_segment.py 中的同名接口一致，
+# 服务层代码通过 AsyncSession.run_sync 在异步连接上执行，等待数据库时不占用线程
+import json
+import traceback
+
+from pydantic import ValidationError
+from werkzeug.wrappers import Request
+
+from config import Config
+from init.async_database import ASYNC_DB
+from init.database import CONSISTENCY_COOKIE, CONSISTENCY_HEADER
+from init.routing import token_pins_primary
+from init.timing import stage
+from routes.conditional import conditional_response, is_not_modified, not_modified_response, resource_etag
+from routes.network_segment import parse_pagination
+from routes.server import page_info, parse_fields, parse_list_args, serialize_server, serialize_servers
+from schemas.query import Pagination, QueryCondition, QueryGroup
+from schemas.requests import ServerQueryRequest
+from services.network_segment_service import NetworkSegmentService
+from services.serializer import NETWORK_SEGMENT_SERIALIZER, json_response
+from services.server_service import ServerService
+
+
+def _session(req: Request):
+    """请求的异步会话，携带未过期的一致性令牌时读操作走主库"""
+    token = req.headers.get(CONSISTENCY_HEADER) or req.cookies.get(CONSISTENCY_COOKIE)
+    return ASYNC_DB.session(pin_primary=token_pins_primary(token, Config.CONSISTENCY_WINDOW))
+
+
+async def list_servers(req: Request):
+    """GET /api/server/"""
+    try:
+        with stage('validate'):
+            server_query = parse_list_args(req.args)
+        async with _session(req) as db:
+            result = await db.run_sync(lambda session: ServerService(session).get_servers(server_query, as_rows=True))
+        return conditional_response({
+            'code': 200,
+            'message': 'success',
+            'data': serialize_servers(result['items'], server_query.fields),
+            'total': result['total'],
+            'count_mode': result['count_mode'],
+            **page_info(result, server_query.pagination)
+        }, req=req)
+    except ValueError as e:
+        print('ERROR in GET /api/server/ (Value Error):', str(e))
+        return json_response({'code': 400, 'message': str(e)}, 400)
+    except Exception as e:
+        print('ERROR in GET /api/server/:', str(e))
+        print('TRACEBACK:', traceback.format_exc())
+        return json_response({'code': 500, 'message': f'获取服务器列表失败: {str(e)}'}, 500)
+
+
+async def get_server(req: Request, id: int):
+    """GET /api/server/<id>"""
+    try:
+        fields = parse_fields(req.args.get('fields'))
+        variant = ','.join(ServerService.resolve_fields(fields)) if fields else None
+        server_query = ServerQueryRequest(
+            query=QueryGroup(operator="AND", conditions=[QueryCondition(field='id', operator='=', value=id)]),
+            pagination=Pagination(page=1, page_size=1),
+            fields=fields
+        )
+
+        def load(session):
+            server_service = ServerService(session)
+            # 条件请求: 只查询版本号，未修改时不加载整行
+            if req.if_none_match:
+                version = server_service.get_server_version(id)
+                if version is None or is_not_modified(resource_etag(id, version, variant), req):
+                    return version, None
+            items = server_service.get_servers(server_query, as_rows=True)['items']
+            return (items[0].version, items[0]) if items else (None, None)
+
+        async with _session(req) as db:
+            version, server = await db.run_sync(load)
+        if version is None:
+            return json_response({'code': 404, 'message': '服务器不存在'}, 404)
+        if server is None:
+            return not_modified_response(resource_etag(id, version, variant))
+        return conditional_response({
+            'code': 200,
+            'message': 'success',
+            'data': serialize_server(server, fields)
+        }, resource_etag(id, version, variant), req=req)
+    except ValueError as e:
+        print('ERROR in GET /api/server/<int:id> (Value Error):', str(e))
+        return json_response({'code': 400, 'message': str(e)}, 400)
+    except Exception as e:
+        print('ERROR in GET /api/server/<int:id>:', str(e))
+        print('TRACEBACK:', traceback.format_exc())
+        return json_response({'code': 500, 'message': f'获取服务器详情失败: {str(e)}'}, 500)
+
+
+async def query_servers(req: Request):
+    """POST /api/server/query"""
+    try:
+        with stage('validate'):
+            query_request = ServerQueryRequest(**json.loads(req.get_data() or b'{}'))
+        async with _session(req) as db:
+            result = await db.run_sync(lambda session: ServerService(session).get_servers(query_request, as_rows=True))
+        return json_response({
+            'code': 200,
+            'message': 'success',
+            'data': serialize_servers(result['items'], query_request.fields),
+            'total': result['total'],
+            'count_mode': result['count_mode'],
+            **page_info(result, query_request.pagination)
+        })
+    except ValidationError as e:
+        print('ERROR in POST /api/server/query (Validation Error):', str(e))
+        return json_response({'code': 400, 'message': f'请求数据验证失败: {e}'}, 400)
+    except ValueError as e:
+        # 请求体不是合法 JSON、查询条件或游标错误
+        print('ERROR in POST /api/server/query (Value Error):', str(e))
+        return json_response({'code': 400, 'message': str(e)}, 400)
+    except Exception as e:
+        print('ERROR in POST /api/server/query (Unexpected Error):', str(e))
+        print('TRACEBACK:', traceback.format_exc())
+        return json_response({'code': 500, 'message': f'高级查询失败: {str(e)}'}, 500)
+
+
+async def list_network_segments(req: Request):
+    """GET /api/network_segment/"""
+    try:
+        page, page_size = parse_pagination(req.args)
+    except ValueError as e:
+        return json_response({"code": 400, "message": str(e)}, 400)
+
+    async with _session(req) as db:
+        data = await db.run_sync(lambda session: NETWORK_SEGMENT_SERIALIZER.from_objects(
+            NetworkSegmentService(session).get_network_segments(skip=(page - 1) * page_size, limit=page_size)))
+    return conditional_response({
+        "code": 200,
+        "message": "success",
+        "data": data,
+        "page": page,
+        "page_size": page_size
+    }, req=req)
+
+
+async def get_network_segment(req: Request, network_segment_id: int):
+    """GET /api/network_segment/<network_segment_id>"""
+
+    def load(session):
+        network_segment_service = NetworkSegmentService(session)
+        # 条件请求: 只查询版本号，未修改时不加载整行
+        if req.if_none_match:
+            version = network_segment_service.get_network_segment_version(network_segment_id)
+            if version is not None and is_not_modified(resource_etag(network_segment_id, version), req):
+                return version, None
+        network_segment = network_segment_service.get_network_segment(network_segment_id)
+        return network_segment.version, NETWORK_SEGMENT_SERIALIZER.from_objects([network_segment])[0]
+
+    try:
+        async with _session(req) as db:
+            version, data = await db.run_sync(load)
+    except ValueError as e:
+        return json_response({"code": 400, "message": str(e)}, 400)
+    if data is None:
+        return not_modified_response(resource_etag(network_segment_id, version))
+    return conditional_response({
+        "code": 200,
+        "message": "success",
+        "data": data
+    }, resource_etag(network_segment_id, version), req=req)
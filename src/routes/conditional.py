@@ -0,0 +1,73 @@
+import hashlib
+from typing import Any, Optional, Set
+
+from flask import Response, request
+from werkzeug.http import quote_etag
+
+from services.serializer import dumps
+
+
+def resource_etag(resource_id: int, version: int, variant: Optional[str] = None) -> str:
+    """
+    单个资源的强 ETag（未加引号）
+
+    Args:
+        resource_id: 资源ID
+        version: 行版本号
+        variant: 同一版本的不同表示（如 fields 字段投影），为空表示完整表示
+
+    Returns:
+        str: 形如 "<id>-<version>" 或 "<id>-<version>-<variant 摘要>"
+    """
+    tag = f"{resource_id}-{version}"
+    if variant:
+        tag += "-" + hashlib.sha1(variant.encode()).hexdigest()[:8]
+    return tag
+
+
+def is_not_modified(etag: str, req=None) -> bool:
+    """If-None-Match 是否命中（按弱比较，* 匹配任意版本），req 为空时使用当前 Flask 请求"""
+    return (req or request).if_none_match.contains_weak(etag)
+
+
+def not_modified_response(etag: str) -> Response:
+    """304 响应（无响应体）"""
+    return Response(status=304, headers={'ETag': quote_etag(etag)})
+
+
+def conditional_response(payload: Any, etag: Optional[str] = None, code: int = 200, req=None) -> Response:
+    """
+    带 ETag 的 JSON 响应，If-None-Match 命中时返回 304
+
+    Args:
+        payload: 响应内容
+        etag: 资源 ETag（未加引号），为空时按编码后的响应体计算（列表等没有单一版本号的响应）
+        code: 状态码
+        req: 请求对象（werkzeug Request），为空时使用当前 Flask 请求
+
+    Returns:
+        Response: JSON 响应或 304 响应
+    """
+    body = dumps(payload)
+    if etag is None:
+        etag = hashlib.sha1(body).hexdigest()
+    if is_not_modified(etag, req):
+        return not_modified_response(etag)
+    return Response(body, status=code, mimetype='application/json', headers={'ETag': quote_etag(etag)})
+
+
+def if_match_versions(resource_id: int) -> Optional[Set[int]]:
+    """
+    解析 If-Match 请求头中属于该资源的版本号（强比较，忽略弱 ETag）
+
+    Returns:
+        set: 请求方持有的版本号；未提供 If-Match 或为 * 时返回 None（不做检查）
+    """
+    if not request.if_match or request.if_match.star_tag:
+        return None
+    versions = set()
+    for tag in request.if_match.as_set():
+        parts = tag.split('-')
+        if len(parts) >= 2 and parts[0] == str(resource_id) and parts[1].isdigit():
+            versions.add(int(parts[1]))
+    return versions
@@ -1,7 +1,12 @@
 from flask import Blueprint, jsonify, request
 from init.database import get_db
 from services.network_segment_service import NetworkSegmentService
-from schemas.network_segment import NetworkSegmentCreate, NetworkSegmentUpdate, NetworkSegment as NetworkSegmentSchema
+from schemas.network_segment import NetworkSegmentCreate, NetworkSegmentUpdate
+from schemas.server import PreconditionFailedError
+from routes.conditional import conditional_response, if_match_versions, is_not_modified, not_modified_response, resource_etag
+from services.serializer import NETWORK_SEGMENT_SERIALIZER, json_response
+from init.timing import stage
+from werkzeug.http import quote_etag
 
 router = Blueprint('network_segment', __name__)
 
@@ -23,7 +28,8 @@ def create_network_segment():
         data = request.get_json()
         
         # 创建网络段数据模型
-        network_segment_data = NetworkSegmentCreate(**data)
+        with stage('validate'):
+            network_segment_data = NetworkSegmentCreate(**data)
         
         # 创建网络段
         db = get_db()
@@ -32,10 +38,10 @@ def create_network_segment():
             network_segment = network_segment_service.create_network_segment(network_segment_data)
             
             # 返回创建结果
-            return jsonify({
+            return json_response({
                 "code": 200,
                 "message": "创建成功",
-                "data": NetworkSegmentSchema.model_validate(network_segment).model_dump()
+                "data": NETWORK_SEGMENT_SERIALIZER.from_objects([network_segment])[0]
             })
         finally:
             db.close()
@@ -54,17 +60,9 @@ def get_network_segments():
     """
     # 分页参数
     try:
-        page = int(request.args.get('page', 1))
-        page_size = int(request.args.get('page_size', 20))
-    except Exception:
-        return jsonify({"code": 400, "message": "分页参数格式错误"}), 400
-    
-    if page < 1:
-        page = 1
-    if page_size < 1:
-        page_size = 20
-    if page_size > 1000:
-        page_size = 1000
+        page, page_size = parse_pagination(request.args)
+    except ValueError as e:
+        return jsonify({"code": 400, "message": str(e)}), 400
     
     # 计算偏移量
     skip = (page - 1) * page_size
@@ -75,33 +73,41 @@ def get_network_segments():
         network_segment_service = NetworkSegmentService(db)
         network_segments = network_segment_service.get_network_segments(skip=skip, limit=page_size)
         
-        # 返回结果
-        return jsonify({
+        # 返回结果（带 ETag，支持 If-None-Match）
+        payload = {
             "code": 200,
             "message": "success",
-            "data": [NetworkSegmentSchema.model_validate(ns).model_dump() for ns in network_segments],
+            "data": NETWORK_SEGMENT_SERIALIZER.from_objects(network_segments),
             "page": page,
             "page_size": page_size
-        })
+        }
+        return conditional_response(payload)
     finally:
         db.close()
 
 @router.route('/<int:network_segment_id>', methods=['GET'])
 def get_network_segment(network_segment_id: int):
     """
-    获取指定网络段
+    获取指定网络段（响应带 ETag，支持 If-None-Match）
     """
     db = get_db()
     try:
         network_segment_service = NetworkSegmentService(db)
+
+        # 条件请求: 只查询版本号，未修改时不加载整行
+        if request.if_none_match:
+            version = network_segment_service.get_network_segment_version(network_segment_id)
+            if version is not None and is_not_modified(resource_etag(network_segment_id, version)):
+                return not_modified_response(resource_etag(network_segment_id, version))
+
         network_segment = network_segment_service.get_network_segment(network_segment_id)
         
         # 返回结果
-        return jsonify({
+        return conditional_response({
             "code": 200,
             "message": "success",
-            "data": NetworkSegmentSchema.model_validate(network_segment).model_dump()
-        })
+            "data": NETWORK_SEGMENT_SERIALIZER.from_objects([network_segment])[0]
+        }, resource_etag(network_segment_id, network_segment.version))
     except ValueError as e:
         return jsonify({
             "code": 400,
@@ -136,7 +142,8 @@ def update_network_segment(network_segment_id: int):
             
         # 创建更新数据模型
         try:
-            network_segment_data = NetworkSegmentUpdate(**data)
+            with stage('validate'):
+                network_segment_data = NetworkSegmentUpdate(**data)
         except Exception as e:
             return jsonify({
                 "code": 400,
@@ -147,17 +154,24 @@ def update_network_segment(network_segment_id: int):
         db = get_db()
         try:
             network_segment_service = NetworkSegmentService(db)
-            network_segment = network_segment_service.update_network_segment(network_segment_id, network_segment_data)
+            network_segment = network_segment_service.update_network_segment(
+                network_segment_id, network_segment_data, if_match_versions(network_segment_id))
             
             # 返回更新结果
-            return jsonify({
+            return json_response({
                 "code": 200,
                 "message": "更新成功",
-                "data": NetworkSegmentSchema.model_validate(network_segment).model_dump()
-            })
+                "data": NETWORK_SEGMENT_SERIALIZER.from_objects([network_segment])[0]
+            }, headers={"ETag": quote_etag(resource_etag(network_segment_id, network_segment.version))})
         finally:
             db.close()
             
+    except PreconditionFailedError as e:
+        # If-Match 与当前版本不一致
+        return jsonify({
+            "code": 412,
+            "message": str(e)
+        }), 412
     except ValueError as e:
         # 处理网络段不存在的错误
         return jsonify({
@@ -178,16 +192,45 @@ def delete_network_segment(network_segment_id: int):
     db = get_db()
     try:
         network_segment_service = NetworkSegmentService(db)
-        network_segment_service.delete_network_segment(network_segment_id)
+        network_segment_service.delete_network_segment(network_segment_id, if_match_versions(network_segment_id))
         
         return jsonify({
             "code": 200,
             "message": "删除成功"
         })
+    except PreconditionFailedError as e:
+        return jsonify({
+            "code": 412,
+            "message": str(e)
+        }), 412
     except ValueError as e:
         return jsonify({
             "code": 400,
             "message": str(e)
         }), 400
     finally:
-        db.close() 
\ No newline at end of file
+        db.close() 
+
+def parse_pagination(args):
+    """
+    解析网络段列表的分页参数，超出范围时取默认值或上限
+
+    Returns:
+        tuple: (page, page_size)
+
+    Raises:
+        ValueError: 参数不是整数时抛出
+    """
+    try:
+        page = int(args.get('page', 1))
+        page_size = int(args.get('page_size', 20))
+    except (TypeError, ValueError):
+        raise ValueError("分页参数格式错误")
+
+    if page < 1:
+        page = 1
+    if page_size < 1:
+        page_size = 20
+    if page_size > 1000:
+        page_size = 1000
+    return page, page_size
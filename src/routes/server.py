@@ -1,13 +1,25 @@
-from flask import Blueprint, request
+from flask import Blueprint, Response, request, stream_with_context
 from flask_restx import Resource, fields, Namespace
 from init.database import get_db
 from services.server_service import ServerService
-from schemas.server import ServerCreate, ServerUpdate, Server as ServerSchema
-from schemas.query import QueryCondition, QueryGroup, Pagination, ServerQueryConfig
-from schemas.requests import ServerQueryRequest
+from services.query_compiler import SERVER_QUERY_COMPILER
+from services.inventory_snapshot import INVENTORY_SNAPSHOT
+from services.agent_report_buffer import AGENT_REPORT_BUFFER, BufferFull
+from routes.conditional import conditional_response, if_match_versions, is_not_modified, not_modified_response, resource_etag
+from services.serializer import SERVER_SERIALIZER, json_response
+from init.timing import stage
+from werkzeug.http import quote_etag
+from sqlalchemy.engine import Row
+from services.export_service import ExportService, EXPORT_MEDIA_TYPES
+from services.facet_service import FacetService
+from services.capacity_rollup import ROLLUP_DIMENSIONS, SERVER_CAPACITY_ROLLUP
+from schemas.server import ServerCreate, ServerUpdate, PreconditionFailedError
+from schemas.query import QueryCondition, QueryGroup, Pagination, SortField, ServerQueryConfig
+from schemas.requests import ServerQueryRequest, ServerExportRequest, ServerFacetRequest, ServerBatchGetRequest, \
+    ServerBulkCreateRequest, ServerUpdateByQueryRequest, ServerDeleteByQueryRequest, \
+    AgentReportRequest
 from pydantic import BaseModel, ValidationError
 import traceback
-from datetime import datetime
 
 class Sort(BaseModel):
     field: str
@@ -78,52 +90,42 @@ class ServerList(Resource):
     @api.doc('获取服务器列表')
     @api.param('page', '页码', type=int, default=1)
     @api.param('page_size', '每页数量', type=int, default=10)
-    @api.param('sort_field', '排序字段')
-    @api.param('sort_order', '排序顺序', enum=['asc', 'desc'])
+    @api.param('sort_field', '排序字段，多个字段用逗号分隔')
+    @api.param('sort_order', '排序顺序，多个用逗号分隔，与 sort_field 一一对应', enum=['asc', 'desc'])
+    @api.param('cursor', '游标，传入后使用游标分页（空字符串表示第一页）')
+    @api.param('count_mode', '总数统计方式', enum=['exact', 'none', 'estimate', 'cached'], default='exact')
+    @api.param('fields', '需要返回的字段，多个字段用逗号分隔，默认返回全部字段')
     @api.response(200, '成功')
     def get(self):
         """获取服务器列表"""
         try:
-            page = int(request.args.get('page', 1))
-            page_size = int(request.args.get('page_size', 10))
-            sort_field = request.args.get('sort_field')
-            sort_order = request.args.get('sort_order', 'asc')
-
-            # 构建查询条件 (从URL参数中提取简单过滤条件)
-            conditions = []
-            for key, value in request.args.items():
-                if key not in ['page', 'page_size', 'sort_field', 'sort_order']:
-                    conditions.append(QueryCondition(field=key, operator='=', value=value))
-
-            query_group = QueryGroup(operator='AND', conditions=conditions)
-            pagination = Pagination(page=page, page_size=page_size)
-
-            # 构建 ServerQueryRequest 对象
-            server_query_obj = ServerQueryRequest(
-                query=query_group,
-                pagination=pagination,
-            )
+            with stage('validate'):
+                server_query_obj = parse_list_args(request.args)
 
             db = get_db()
             try:
                 server_service = ServerService(db)
-                # 将 ServerQueryRequest 对象以及 sort_field 和 sort_order 传给 service
-                # Note: The get_servers method in service layer might need to be updated
-                # to accept ServerQueryRequest instead of ServerQueryConfig.
-                result = server_service.get_servers(server_query_obj, sort_field=sort_field, sort_order=sort_order)
+                result = server_service.get_servers(server_query_obj, as_rows=True)
 
-                return {
+                payload = {
                     'code': 200,
                     'message': 'success',
-                    'data': to_serializable([ServerSchema.model_validate(server).model_dump() for server in result['items']]),
+                    'data': serialize_servers(result['items'], server_query_obj.fields),
                     'total': result['total'],
-                    'page': page,
-                    'page_size': page_size
+                    'count_mode': result['count_mode'],
+                    **page_info(result, server_query_obj.pagination)
                 }
+                return conditional_response(payload)
             finally:
                 # 恢复数据库连接关闭
                 db.close()
 
+        except ValueError as e:
+            print('ERROR in GET /api/server/ (Value Error):', str(e))
+            return {
+                'code': 400,
+                'message': str(e)
+            }, 400
         except Exception as e:
             # 打印详细错误信息
             print('ERROR in GET /api/server/query:', str(e))
@@ -141,7 +143,8 @@ class ServerList(Resource):
         try:
             data = request.get_json()
             # 使用 ServerCreate 模型验证和解析输入数据
-            server_data = ServerCreate(**data)
+            with stage('validate'):
+                server_data = ServerCreate(**data)
 
             db = get_db()
             try:
@@ -149,11 +152,11 @@ class ServerList(Resource):
                 # 将解析后的 ServerCreate 模型实例传递给 service 层
                 server = server_service.create_server(server_data)
                 db.commit() # 在这里提交事务
-                return {
+                return json_response({
                     'code': 201,
                     'message': '创建成功',
-                    'data': to_serializable(ServerSchema.model_validate(server).model_dump())
-                }, 201
+                    'data': serialize_server(server)
+                }, 201)
             except Exception as e:
                 db.rollback() # 回滚事务
                 # 记录详细错误日志
@@ -195,34 +198,51 @@ class ServerList(Resource):
 @api.param('id', '服务器ID')
 class Server(Resource):
     @api.doc('获取服务器详情')
+    @api.param('fields', '需要返回的字段，多个字段用逗号分隔，默认返回全部字段')
     @api.response(200, '成功')
+    @api.response(304, '未修改（If-None-Match 命中）')
     @api.response(404, '服务器不存在')
     def get(self, id):
-        """获取服务器详情"""
+        """获取服务器详情（响应带 ETag，支持 If-None-Match）"""
         try:
+            fields = parse_fields(request.args.get('fields'))
+            variant = ','.join(ServerService.resolve_fields(fields)) if fields else None
             db = get_db()
             try:
                 server_service = ServerService(db)
+
+                # 条件请求: 只查询版本号，未修改时不加载整行
+                if request.if_none_match:
+                    version = server_service.get_server_version(id)
+                    if version is None:
+                        return {
+                            'code': 404,
+                            'message': '服务器不存在'
+                        }, 404
+                    etag = resource_etag(id, version, variant)
+                    if is_not_modified(etag):
+                        return not_modified_response(etag)
                 
                 # 构建 ServerQueryRequest 对象 for fetching by ID
                 query_condition = QueryCondition(field='id', operator='=', value=id)
                 server_query_obj = ServerQueryRequest(
                     query=QueryGroup(operator="AND", conditions=[query_condition]), # Wrap condition in QueryGroup
-                    pagination=Pagination(page=1, page_size=1)
+                    pagination=Pagination(page=1, page_size=1),
+                    fields=fields
                 )
                 
                 # 调用 get_servers 方法，并期望返回一条记录
                 # Note: The get_servers method in service layer might need to be updated
                 # to accept ServerQueryRequest instead of ServerQueryConfig.
-                result = server_service.get_servers(server_query_obj)
+                result = server_service.get_servers(server_query_obj, as_rows=True)
                 server = result['items'][0] if result['items'] else None
                 
                 if server:
-                    return {
+                    return conditional_response({
                         'code': 200,
                         'message': 'success',
-                        'data': to_serializable(ServerSchema.model_validate(server).model_dump())
-                    }
+                        'data': serialize_server(server, fields)
+                    }, resource_etag(id, server.version, variant))
                 else:
                     return {
                         'code': 404,
@@ -231,6 +251,12 @@ class Server(Resource):
             finally:
                 db.close()
                 
+        except ValueError as e:
+            print('ERROR in GET /api/server/<int:id> (Value Error):', str(e))
+            return {
+                'code': 400,
+                'message': str(e)
+            }, 400
         except Exception as e:
             # 打印详细错误信息
             print('ERROR in GET /api/server/<int:id>:', str(e))
@@ -244,24 +270,26 @@ class Server(Resource):
     @api.expect(server_update_model)
     @api.response(200, '更新成功')
     @api.response(404, '服务器不存在')
+    @api.response(412, 'If-Match 与服务器当前版本不一致')
     def put(self, id):
-        """更新服务器"""
+        """更新服务器（支持 If-Match 条件更新，提交的值没有变化时不写入）"""
         try:
             data = request.get_json()
             # 使用 ServerUpdate 模型验证和解析输入数据
-            server_data = ServerUpdate(**data)
+            with stage('validate'):
+                server_data = ServerUpdate(**data)
             
             db = get_db()
             try:
                 server_service = ServerService(db)
-                server = server_service.update_server(id, server_data)
+                server = server_service.update_server(id, server_data, if_match_versions(id))
                 
                 if server:
-                    return {
+                    return json_response({
                         'code': 200,
                         'message': '更新成功',
-                        'data': to_serializable(ServerSchema.model_validate(server).model_dump())
-                    }
+                        'data': serialize_server(server)
+                    }, headers={'ETag': quote_etag(resource_etag(id, server.version))})
                 else:
                     return {
                         'code': 404,
@@ -278,6 +306,12 @@ class Server(Resource):
                 'code': 400,
                 'message': f'请求数据验证失败: {e}'
             }, 400
+        except PreconditionFailedError as e:
+            print('ERROR updating server (Precondition Failed):', str(e))
+            return {
+                'code': 412,
+                'message': str(e)
+            }, 412
         except ValueError as e:
             # 业务逻辑错误
             print('ERROR updating server (Value Error):', str(e))
@@ -298,17 +332,24 @@ class Server(Resource):
     @api.doc('删除服务器')
     @api.response(200, '删除成功')
     @api.response(404, '服务器不存在')
+    @api.response(412, 'If-Match 与服务器当前版本不一致')
     @api.response(500, '删除失败')
     def delete(self, id):
-        """删除服务器"""
+        """删除服务器（支持 If-Match 条件删除）"""
         db = get_db()
         try:
             server_service = ServerService(db)
-            server_service.delete_server(id)
+            server_service.delete_server(id, if_match_versions(id))
             return {
                 'code': 200,
                 'message': '删除成功'
             }
+        except PreconditionFailedError as e:
+            print('ERROR deleting server (Precondition Failed):', str(e))
+            return {
+                'code': 412,
+                'message': str(e)
+            }, 412
         except ValueError as e:
             print('ERROR deleting server (Value Error):', str(e))
             print('TRACEBACK:', traceback.format_exc())
@@ -347,6 +388,25 @@ class ServerFields(Resource):
             "data": serialized_fields
         }, 200
 
+@api.route('/query/stats')
+class ServerQueryStats(Resource):
+    @api.doc('获取查询编译缓存统计')
+    @api.param('usage_limit', '返回的查询形态使用统计条数', type=int, default=100)
+    @api.response(200, '获取成功')
+    def get(self):
+        """获取查询编译缓存命中统计、查询形态使用统计（可保存后交给 scripts/index_advisor.py 使用）、内存快照及 Agent 上报缓冲状态"""
+        usage_limit = request.args.get('usage_limit', 100, type=int)
+        return {
+            "code": 200,
+            "message": "成功",
+            "data": {
+                **SERVER_QUERY_COMPILER.stats(),
+                "usage": SERVER_QUERY_COMPILER.usage_stats(usage_limit),
+                "snapshot": INVENTORY_SNAPSHOT.stats(),
+                "agent_report": AGENT_REPORT_BUFFER.stats()
+            }
+        }, 200
+
 @api.route('/query')
 class ServerQueryResource(Resource):
     @api.doc('高级查询')
@@ -362,8 +422,15 @@ class ServerQueryResource(Resource):
         })),
         'pagination': fields.Nested(api.model('Pagination', {
             'page': fields.Integer(required=True, description='页码'),
-            'page_size': fields.Integer(required=True, description='每页条数')
-        }))
+            'page_size': fields.Integer(required=True, description='每页条数'),
+            'cursor': fields.String(description='游标，传入后使用游标分页（空字符串表示第一页）')
+        })),
+        'sort': fields.List(fields.Nested(api.model('SortField', {
+            'field': fields.String(required=True, description='排序字段'),
+            'order': fields.String(description='排序顺序', enum=['asc', 'desc'])
+        })), description='排序字段列表，id 作为最后的排序键'),
+        'count_mode': fields.String(description='总数统计方式', enum=['exact', 'none', 'estimate', 'cached'], default='exact'),
+        'fields': fields.List(fields.String, description='需要返回的字段列表，默认返回全部字段')
     })) # Keep flask_restx model for API documentation
     @api.response(200, '查询成功')
     @api.response(500, '查询失败')
@@ -372,7 +439,8 @@ class ServerQueryResource(Resource):
         try:
             data = request.get_json()
             # Validate input data using the Pydantic model
-            query_request = ServerQueryRequest(**data)
+            with stage('validate'):
+                query_request = ServerQueryRequest(**data)
 
             db = get_db()
             try:
@@ -380,16 +448,16 @@ class ServerQueryResource(Resource):
                 # Pass the validated ServerQueryRequest object to the service
                 # Note: The get_servers method in service layer might need to be updated
                 # to accept ServerQueryRequest instead of ServerQueryConfig.
-                result = server_service.get_servers(query_request)
+                result = server_service.get_servers(query_request, as_rows=True)
 
-                return {
+                return json_response({
                     'code': 200,
                     'message': 'success',
-                    'data': to_serializable([ServerSchema.model_validate(server).model_dump() for server in result['items']]),
+                    'data': serialize_servers(result['items'], query_request.fields),
                     'total': result['total'],
-                    'page': query_request.pagination.page,
-                    'page_size': query_request.pagination.page_size
-                }
+                    'count_mode': result['count_mode'],
+                    **page_info(result, query_request.pagination)
+                })
             finally:
                 db.close()
                 
@@ -401,6 +469,13 @@ class ServerQueryResource(Resource):
                 'code': 400,
                 'message': f'请求数据验证失败: {e}'
             }, 400
+        except ValueError as e:
+            # 查询条件或游标错误
+            print('ERROR in POST /api/server/query (Value Error):', str(e))
+            return {
+                'code': 400,
+                'message': str(e)
+            }, 400
         except Exception as e:
             # 捕获其他潜在的异常
             print('ERROR in POST /api/server/query (Unexpected Error):', str(e))
@@ -410,14 +485,479 @@ class ServerQueryResource(Resource):
                 'message': f'高级查询失败: {str(e)}'
             }, 500
 
-def to_serializable(obj):
-    if isinstance(obj, dict):
-        return {k: to_serializable(v) for k, v in obj.items()}
-    elif isinstance(obj, list):
-        return [to_serializable(i) for i in obj]
-    elif isinstance(obj, datetime):
-        return obj.isoformat()
-    else:
-        return obj
+@api.route('/bulk')
+class ServerBulkCreateResource(Resource):
+    @api.doc('批量创建服务器')
+    @api.expect(api.model('ServerBulkCreate', {
+        'items': fields.List(fields.Raw, required=True, description='服务器创建数据列表（字段同创建服务器，最多 10000 条）')
+    }))
+    @api.response(201, '全部创建成功')
+    @api.response(207, '部分数据创建失败，见 results 中每条数据的状态')
+    @api.response(400, '请求数据验证失败')
+    def post(self):
+        """批量创建服务器，逐条返回创建结果（created / invalid / conflict / error）"""
+        try:
+            data = request.get_json()
+            with stage('validate'):
+                bulk_request = ServerBulkCreateRequest(**data)
+
+            db = get_db()
+            try:
+                server_service = ServerService(db)
+                results = server_service.bulk_create_servers(bulk_request.items)
+            except Exception:
+                db.rollback()
+                raise
+            finally:
+                db.close()
+
+            created = sum(1 for result in results if result['status'] == 'created')
+            code = 201 if created == len(results) else 207
+            return {
+                'code': code,
+                'message': '创建成功' if code == 201 else f'{len(results) - created} 条数据创建失败',
+                'data': {
+                    'created': created,
+                    'failed': len(results) - created,
+                    'results': results
+                }
+            }, code
+
+        except ValidationError as e:
+            print('ERROR in POST /api/server/bulk (Validation Error):', str(e))
+            return {
+                'code': 400,
+                'message': f'请求数据验证失败: {e}'
+            }, 400
+        except Exception as e:
+            print('ERROR in POST /api/server/bulk (Unexpected Error):', str(e))
+            print('TRACEBACK:', traceback.format_exc())
+            return {
+                'code': 500,
+                'message': f'批量创建失败: {str(e)}'
+            }, 500
+
+by_query_options = {
+    'query': fields.Raw(required=True, description='查询条件，格式同高级查询'),
+    'dry_run': fields.Boolean(description='只返回匹配数量，不做修改', default=False),
+    'max_rows': fields.Integer(description='允许修改的最大行数，超过时拒绝执行，默认 1000，不能超过 BY_QUERY_MAX_ROWS_LIMIT')
+}
+
+@api.route('/by_query')
+class ServerByQueryResource(Resource):
+    @api.doc('按条件批量更新服务器')
+    @api.expect(api.model('ServerUpdateByQuery', {
+        **by_query_options,
+        'changes': fields.Raw(required=True, description='修改的字段及新值，字段同更新服务器（不支持 service_tag）')
+    }))
+    @api.response(200, '更新成功')
+    @api.response(400, '请求数据验证失败或匹配数量超过上限')
+    def patch(self):
+        """按高级查询条件批量更新服务器，自动写入最后修改人与修改时间"""
+        try:
+            data = request.get_json()
+            with stage('validate'):
+                update_request = ServerUpdateByQueryRequest(**data)
+
+            db = get_db()
+            try:
+                server_service = ServerService(db)
+                result = server_service.update_servers_by_query(
+                    update_request.query, update_request.changes, update_request.dry_run, update_request.max_rows)
+                return {
+                    'code': 200,
+                    'message': '试运行成功' if result['dry_run'] else '更新成功',
+                    'data': result
+                }
+            finally:
+                db.close()
+
+        except ValidationError as e:
+            print('ERROR in PATCH /api/server/by_query (Validation Error):', str(e))
+            return {
+                'code': 400,
+                'message': f'请求数据验证失败: {e}'
+            }, 400
+        except ValueError as e:
+            print('ERROR in PATCH /api/server/by_query (Value Error):', str(e))
+            return {
+                'code': 400,
+                'message': str(e)
+            }, 400
+        except Exception as e:
+            print('ERROR in PATCH /api/server/by_query (Unexpected Error):', str(e))
+            print('TRACEBACK:', traceback.format_exc())
+            return {
+                'code': 500,
+                'message': f'批量更新失败: {str(e)}'
+            }, 500
+
+    @api.doc('按条件批量删除服务器')
+    @api.expect(api.model('ServerDeleteByQuery', by_query_options))
+    @api.response(200, '删除成功')
+    @api.response(400, '请求数据验证失败或匹配数量超过上限')
+    def delete(self):
+        """按高级查询条件批量删除服务器（物理删除）"""
+        try:
+            data = request.get_json()
+            with stage('validate'):
+                delete_request = ServerDeleteByQueryRequest(**data)
+
+            db = get_db()
+            try:
+                server_service = ServerService(db)
+                result = server_service.delete_servers_by_query(
+                    delete_request.query, delete_request.dry_run, delete_request.max_rows)
+                return {
+                    'code': 200,
+                    'message': '试运行成功' if result['dry_run'] else '删除成功',
+                    'data': result
+                }
+            finally:
+                db.close()
+
+        except ValidationError as e:
+            print('ERROR in DELETE /api/server/by_query (Validation Error):', str(e))
+            return {
+                'code': 400,
+                'message': f'请求数据验证失败: {e}'
+            }, 400
+        except ValueError as e:
+            print('ERROR in DELETE /api/server/by_query (Value Error):', str(e))
+            return {
+                'code': 400,
+                'message': str(e)
+            }, 400
+        except Exception as e:
+            print('ERROR in DELETE /api/server/by_query (Unexpected Error):', str(e))
+            print('TRACEBACK:', traceback.format_exc())
+            return {
+                'code': 500,
+                'message': f'批量删除失败: {str(e)}'
+            }, 500
+
+@api.route('/agent_report')
+class AgentReportResource(Resource):
+    @api.doc('Agent 上报')
+    @api.expect(api.model('AgentReport', {
+        'reports': fields.List(fields.Raw, required=True,
+                               description='上报数据列表，每条包含 service_tag 及 agent_name、agent_ip、agent_version、'
+                                           'agent_kernel、agent_os_id、bios_version、raid_fw_version 中的部分字段')
+    }))
+    @api.response(202, '已接收，等待批量写入')
+    @api.response(400, '请求数据验证失败')
+    @api.response(503, '上报缓冲区已满，请稍后重试')
+    def post(self):
+        """接收 Agent 上报，按 service_tag 合并后异步批量写入（不存在的主机自动新建）"""
+        try:
+            data = request.get_json()
+            with stage('validate'):
+                report_request = AgentReportRequest(**data)
+            reports = [report.model_dump(exclude_none=True) for report in report_request.reports]
+            pending = AGENT_REPORT_BUFFER.submit(reports)
+            return {
+                'code': 202,
+                'message': '已接收',
+                'data': {'accepted': len(reports), 'pending': pending}
+            }, 202
+
+        except ValidationError as e:
+            print('ERROR in POST /api/server/agent_report (Validation Error):', str(e))
+            return {
+                'code': 400,
+                'message': f'请求数据验证失败: {e}'
+            }, 400
+        except BufferFull as e:
+            print('ERROR in POST /api/server/agent_report (Buffer Full):', str(e))
+            return {
+                'code': 503,
+                'message': str(e)
+            }, 503, {'Retry-After': str(max(1, int(AGENT_REPORT_BUFFER.flush_interval)))}
+        except Exception as e:
+            print('ERROR in POST /api/server/agent_report (Unexpected Error):', str(e))
+            print('TRACEBACK:', traceback.format_exc())
+            return {
+                'code': 500,
+                'message': f'上报失败: {str(e)}'
+            }, 500
+
+@api.route('/batch_get')
+class ServerBatchGetResource(Resource):
+    @api.doc('批量获取服务器')
+    @api.expect(api.model('ServerBatchGet', {
+        'ids': fields.List(fields.Integer, description='服务器ID列表（与 service_tags 二选一，最多 50000 个）'),
+        'service_tags': fields.List(fields.String, description='设备序列号列表（与 ids 二选一，最多 50000 个）'),
+        'fields': fields.List(fields.String, description='需要返回的字段列表，为空时返回全部字段')
+    }))
+    @api.response(200, '获取成功')
+    @api.response(400, '请求数据验证失败')
+    def post(self):
+        """按ID或设备序列号批量获取服务器，结果以输入的键为索引，并返回不存在的键"""
+        try:
+            data = request.get_json()
+            with stage('validate'):
+                batch_request = ServerBatchGetRequest(**data)
+            key_field = 'id' if batch_request.ids is not None else 'service_tag'
+            keys = batch_request.ids if batch_request.ids is not None else batch_request.service_tags
+
+            db = get_db()
+            try:
+                server_service = ServerService(db)
+                servers, missing = server_service.get_servers_by_keys(key_field, keys, batch_request.fields)
+                items = serialize_servers(list(servers.values()), batch_request.fields)
+                return json_response({
+                    'code': 200,
+                    'message': 'success',
+                    'data': {str(key): item for key, item in zip(servers, items)},
+                    'missing': missing
+                })
+            finally:
+                db.close()
+
+        except ValidationError as e:
+            print('ERROR in POST /api/server/batch_get (Validation Error):', str(e))
+            return {
+                'code': 400,
+                'message': f'请求数据验证失败: {e}'
+            }, 400
+        except ValueError as e:
+            print('ERROR in POST /api/server/batch_get (Value Error):', str(e))
+            return {
+                'code': 400,
+                'message': str(e)
+            }, 400
+        except Exception as e:
+            print('ERROR in POST /api/server/batch_get (Unexpected Error):', str(e))
+            print('TRACEBACK:', traceback.format_exc())
+            return {
+                'code': 500,
+                'message': f'批量获取失败: {str(e)}'
+            }, 500
+
+@api.route('/facets')
+class ServerFacetResource(Resource):
+    @api.doc('分面统计')
+    @api.expect(api.model('ServerFacet', {
+        'query': fields.Raw(description='查询条件，格式同高级查询，为空时统计全部服务器'),
+        'fields': fields.List(fields.String, required=True, description='需要统计取值分布的字段列表'),
+        'limit': fields.Integer(description='每个字段最多返回的取值个数')
+    }))
+    @api.response(200, '统计成功')
+    @api.response(400, '请求数据验证失败')
+    def post(self):
+        """按高级查询条件一次返回多个字段的取值分布"""
+        try:
+            data = request.get_json()
+            with stage('validate'):
+                facet_request = ServerFacetRequest(**data)
+
+            db = get_db()
+            try:
+                facet_service = FacetService(db)
+                facets = facet_service.get_facets(facet_request.query, facet_request.fields, facet_request.limit)
+                return json_response({
+                    'code': 200,
+                    'message': 'success',
+                    'data': facets
+                })
+            finally:
+                db.close()
+
+        except ValidationError as e:
+            print('ERROR in POST /api/server/facets (Validation Error):', str(e))
+            return {
+                'code': 400,
+                'message': f'请求数据验证失败: {e}'
+            }, 400
+        except ValueError as e:
+            print('ERROR in POST /api/server/facets (Value Error):', str(e))
+            return {
+                'code': 400,
+                'message': str(e)
+            }, 400
+        except Exception as e:
+            print('ERROR in POST /api/server/facets (Unexpected Error):', str(e))
+            print('TRACEBACK:', traceback.format_exc())
+            return {
+                'code': 500,
+                'message': f'分面统计失败: {str(e)}'
+            }, 500
+
+@api.route('/capacity')
+class ServerCapacityResource(Resource):
+    @api.doc('容量汇总')
+    @api.param('group_by', '分组维度，逗号分隔: network_segment_id, group_id, label, use_status', type=str)
+    @api.param('network_segment_id', '按网段过滤', type=int)
+    @api.param('group_id', '按分组过滤', type=int)
+    @api.param('label', '按标签过滤', type=str)
+    @api.param('use_status', '按使用状态过滤', type=str)
+    @api.response(200, '获取成功')
+    @api.response(400, '参数错误')
+    def get(self):
+        """按网段/分组/标签/使用状态汇总服务器数量与 CPU、内存、存储容量"""
+        try:
+            group_by = [name.strip() for name in request.args.get('group_by', '').split(',') if name.strip()]
+            filters = {}
+            for name in ROLLUP_DIMENSIONS:
+                if name in request.args:
+                    value = request.args.get(name)
+                    filters[name] = int(value) if name in ('network_segment_id', 'group_id') else value
+
+            db = get_db()
+            try:
+                rows = SERVER_CAPACITY_ROLLUP.summary(db, group_by, filters)
+                return json_response({
+                    'code': 200,
+                    'message': 'success',
+                    'data': rows
+                })
+            finally:
+                db.close()
+
+        except ValueError as e:
+            print('ERROR in GET /api/server/capacity (Value Error):', str(e))
+            return {
+                'code': 400,
+                'message': str(e)
+            }, 400
+        except Exception as e:
+            print('ERROR in GET /api/server/capacity (Unexpected Error):', str(e))
+            print('TRACEBACK:', traceback.format_exc())
+            return {
+                'code': 500,
+                'message': f'容量汇总失败: {str(e)}'
+            }, 500
+
+@api.route('/export')
+class ServerExportResource(Resource):
+    @api.doc('流式导出')
+    @api.expect(api.model('ServerExport', {
+        'query': fields.Raw(required=True, description='查询条件，格式同高级查询'),
+        'format': fields.String(description='导出格式', enum=['ndjson', 'csv'], default='ndjson'),
+        'sort': fields.Raw(description='排序字段列表，格式同高级查询'),
+        'batch_size': fields.Integer(description='每批从数据库读取的行数', default=1000)
+    }))
+    @api.response(200, '导出成功')
+    @api.response(400, '请求数据验证失败')
+    def post(self):
+        """按高级查询条件流式导出全部服务器（NDJSON 或 CSV）"""
+        try:
+            data = request.get_json()
+            with stage('validate'):
+                export_request = ServerExportRequest(**data)
+
+            db = get_db()
+            try:
+                export_service = ExportService(db)
+                chunks = export_service.export(
+                    export_request.query,
+                    fmt=export_request.format,
+                    sort=export_request.sort,
+                    batch_size=export_request.batch_size
+                )
+            except Exception:
+                db.close()
+                raise
+
+            def generate():
+                # 数据库会话在数据全部输出后再关闭
+                try:
+                    yield from chunks
+                finally:
+                    db.close()
+
+            return Response(
+                stream_with_context(generate()),
+                mimetype=EXPORT_MEDIA_TYPES[export_request.format],
+                headers={'Content-Disposition': f'attachment; filename=servers.{export_request.format}'}
+            )
+
+        except ValidationError as e:
+            print('ERROR in POST /api/server/export (Validation Error):', str(e))
+            return {
+                'code': 400,
+                'message': f'请求数据验证失败: {e}'
+            }, 400
+        except ValueError as e:
+            print('ERROR in POST /api/server/export (Value Error):', str(e))
+            return {
+                'code': 400,
+                'message': str(e)
+            }, 400
+        except Exception as e:
+            print('ERROR in POST /api/server/export (Unexpected Error):', str(e))
+            print('TRACEBACK:', traceback.format_exc())
+            return {
+                'code': 500,
+                'message': f'导出失败: {str(e)}'
+            }, 500
+
+def parse_list_args(args):
+    """
+    将列表接口的URL参数转换为 ServerQueryRequest
+    page/page_size/sort_field/sort_order/cursor/count_mode/fields 以外的参数均作为等值过滤条件
+
+    Raises:
+        ValueError: 参数格式错误时抛出（包括 pydantic 校验错误）
+    """
+    page = int(args.get('page', 1))
+    page_size = int(args.get('page_size', 10))
+
+    # 构建查询条件 (从URL参数中提取简单过滤条件)
+    conditions = []
+    for key, value in args.items():
+        if key not in ['page', 'page_size', 'sort_field', 'sort_order', 'cursor', 'count_mode', 'fields']:
+            conditions.append(QueryCondition(field=key, operator='=', value=value))
+
+    return ServerQueryRequest(
+        query=QueryGroup(operator='AND', conditions=conditions),
+        pagination=Pagination(page=page, page_size=page_size, cursor=args.get('cursor')),
+        sort=parse_sort(args.get('sort_field'), args.get('sort_order', 'asc')),
+        count_mode=args.get('count_mode', 'exact'),
+        fields=parse_fields(args.get('fields')),
+    )
+
+def parse_sort(sort_field, sort_order):
+    """
+    解析URL中的排序参数，例如 sort_field=use_status,name&sort_order=asc,desc
+    排序顺序个数不足时沿用最后一个
+    """
+    if not sort_field:
+        return None
+    names = [name.strip() for name in sort_field.split(',') if name.strip()]
+    orders = [order.strip().lower() for order in (sort_order or 'asc').split(',') if order.strip()] or ['asc']
+    return [
+        SortField(field=name, order='desc' if orders[min(i, len(orders) - 1)] == 'desc' else 'asc')
+        for i, name in enumerate(names)
+    ]
+
+def page_info(result, pagination):
+    """生成响应中的分页信息：页码模式返回 page/page_size，游标模式返回 next_cursor/prev_cursor"""
+    if 'next_cursor' in result:
+        return {
+            'page_size': pagination.page_size,
+            'next_cursor': result['next_cursor'],
+            'prev_cursor': result['prev_cursor']
+        }
+    return {
+        'page': pagination.page,
+        'page_size': pagination.page_size
+    }
+
+def parse_fields(fields):
+    """解析URL中逗号分隔的字段列表"""
+    if not fields:
+        return None
+    return [name.strip() for name in fields.split(',') if name.strip()]
 
+def serialize_server(server, fields=None):
+    """序列化单个服务器，指定 fields 时只输出这些字段（id 总是包含在内）"""
+    return serialize_servers([server], fields)[0]
 
+def serialize_servers(servers, fields=None):
+    """序列化服务器列表，指定 fields 时只输出这些字段（id 总是包含在内）"""
+    fields = ServerService.resolve_fields(fields)
+    if servers and isinstance(servers[0], Row):
+        # get_servers(as_rows=True) 返回的 Row 以输出字段开头，按位置取值
+        return SERVER_SERIALIZER.from_rows(servers, fields)
+    return SERVER_SERIALIZER.from_objects(servers, fields)
@@ -0,0 +1,61 @@
+from flask import Blueprint, request
+from flask_restx import Resource, Namespace
+from init.database import get_pool_stats
+from init.slow_query_log import SLOW_QUERY_LOG
+from init.timing import TIMING_STATS
+
+router = Blueprint('system', __name__)
+api = Namespace('system', description='系统状态接口')
+
+@api.route('/pool')
+class PoolStats(Resource):
+    @api.doc('获取数据库连接池状态')
+    @api.response(200, '获取成功')
+    def get(self):
+        """获取数据库连接池状态（借出/空闲/溢出连接数，取连接的等待时间与超时次数）"""
+        return {
+            'code': 200,
+            'message': '成功',
+            'data': get_pool_stats()
+        }, 200
+
+@api.route('/timing')
+class RequestTimingStats(Resource):
+    @api.doc('获取请求阶段耗时统计')
+    @api.param('reset', '返回后清空统计', type=bool, default=False)
+    @api.response(200, '获取成功')
+    def get(self):
+        """按路由与阶段（validate/compile/count/fetch/serialize/encode/sql/total）累计的耗时统计，仅包含被采样的请求"""
+        data = TIMING_STATS.snapshot()
+        if request.args.get('reset', 'false').lower() == 'true':
+            TIMING_STATS.reset()
+        return {
+            'code': 200,
+            'message': '成功',
+            'data': data
+        }, 200
+
+@api.route('/slow_queries')
+class SlowQueries(Resource):
+    @api.doc('获取慢查询汇总')
+    @api.param('limit', '返回的查询指纹数量', type=int, default=10)
+    @api.param('order_by', '排序依据: total_ms/count/max_ms/avg_ms', default='total_ms')
+    @api.param('reset', '返回后清空汇总', type=bool, default=False)
+    @api.response(200, '获取成功')
+    @api.response(400, '参数错误')
+    def get(self):
+        """按查询指纹汇总的慢查询（次数、累计/平均/最大耗时、调用接口、查询条件与规范化 SQL），按耗时降序"""
+        try:
+            limit = int(request.args.get('limit', 10))
+            data = SLOW_QUERY_LOG.top(limit, request.args.get('order_by', 'total_ms'))
+        except ValueError as e:
+            print('ERROR in GET /api/system/slow_queries (Value Error):', str(e))
+            return {'code': 400, 'message': str(e)}, 400
+        if request.args.get('reset', 'false').lower() == 'true':
+            SLOW_QUERY_LOG.reset()
+        return {
+            'code': 200,
+            'message': '成功',
+            'threshold_ms': SLOW_QUERY_LOG.threshold_ms,
+            'data': data
+        }, 200
@@ -30,6 +30,7 @@ class NetworkSegment(NetworkSegmentBase):
     last_modified_by: str
     last_modified_date: datetime
     is_valid: bool
+    version: int = Field(default=1, description="行版本号")
 
     class Config:
         from_attributes = True 
\ No newline at end of file
@@ -5,6 +5,7 @@ from .base import (
     QueryCondition,
     QueryGroup,
     Pagination,
+    SortField,
     BaseQuery
 )
 from .server import ServerQueryConfig, SERVER_QUERY_CONFIG
@@ -19,6 +20,7 @@ __all__ = [
     'QueryCondition',
     'QueryGroup',
     'Pagination',
+    'SortField',
     'BaseQuery',
     'ServerQueryConfig',
     'SERVER_QUERY_CONFIG',
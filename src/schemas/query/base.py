@@ -4,7 +4,7 @@ from pydantic import BaseModel, Field
 from datetime import datetime
 
 class FieldType(str, Enum):
-    STRING = "string"      # 字符串，支持 =, !=, like, in
+    STRING = "string"      # 字符串，支持 =, !=, like, in（IP 字段另外支持 in_cidr, ip_range）
     INTEGER = "integer"    # 整数，支持 =, !=, >, <, >=, <=, in
     FLOAT = "float"        # 浮点数，支持 =, !=, >, <, >=, <=, in
     BOOLEAN = "boolean"    # 布尔值，只支持 =, !=
@@ -82,6 +82,12 @@ class Pagination(BaseModel):
     """分页参数"""
     page: int = Field(default=1, ge=1)
     page_size: int = Field(default=20, ge=1, le=1000)
+    cursor: Optional[str] = Field(default=None, description="游标，传入后使用游标分页并忽略 page，空字符串表示第一页")
+
+class SortField(BaseModel):
+    """排序字段"""
+    field: str
+    order: Literal["asc", "desc"] = "asc"
 
 class BaseQuery(BaseModel):
     """基础查询参数"""
@@ -50,21 +50,21 @@ class ServerQueryConfig(BaseQueryConfig):
             name="primary_ip",
             type=FieldType.STRING,
             description="主IP",
-            operators=["=", "!=", "like", "in"]
+            operators=["=", "!=", "like", "in", "in_cidr", "ip_range"]
         ))
 
         self.add_field("agent_ip", FieldConfig(
             name="agent_ip",
             type=FieldType.STRING,
             description="Agent抓取ip",
-            operators=["=", "!=", "like", "in"]
+            operators=["=", "!=", "like", "in", "in_cidr", "ip_range"]
         ))
 
         self.add_field("other_ip", FieldConfig(
             name="other_ip",
             type=FieldType.STRING,
             description="其他ip地址",
-            operators=["=", "!=", "like", "in"]
+            operators=["=", "!=", "like", "in", "in_cidr", "ip_range"]
         ))
 
         self.add_field("port", FieldConfig(
@@ -79,7 +79,7 @@ class ServerQueryConfig(BaseQueryConfig):
             name="manage_card_ip",
             type=FieldType.STRING,
             description="管理卡IP地址",
-            operators=["=", "!=", "like", "in"]
+            operators=["=", "!=", "like", "in", "in_cidr", "ip_range"]
         ))
 
         self.add_field("manage_card_mac", FieldConfig(
@@ -1,9 +1,71 @@
-from pydantic import BaseModel, Field
-from typing import Optional
-from .query import QueryGroup, Pagination
+from pydantic import BaseModel, Field, model_validator
+from typing import Any, Dict, List, Literal, Optional
+from .query import QueryGroup, Pagination, SortField
+from .server import ServerUpdate
 
 class ServerQueryRequest(BaseModel):
     query: QueryGroup
     pagination: Pagination
     query_all: Optional[bool] = Field(default=False, description="是否查询全部数据，忽略分页")
-    # Add other fields if necessary, like sort_field and sort_order if they are part of the payload 
\ No newline at end of file
+    count_mode: Literal["exact", "none", "estimate", "cached"] = Field(
+        default="exact", description="总数统计方式: exact 精确统计, none 不统计, estimate 估算, cached 缓存的精确总数")
+    sort: Optional[List[SortField]] = Field(default=None, description="排序字段列表，按顺序依次排序，id 作为最后的排序键")
+    fields: Optional[List[str]] = Field(default=None, description="需要返回的字段列表，为空时返回全部字段")
+    # Add other fields if necessary, like sort_field and sort_order if they are part of the payload
+
+class ServerExportRequest(BaseModel):
+    """服务器流式导出请求"""
+    query: QueryGroup
+    format: Literal["ndjson", "csv"] = Field(default="ndjson", description="导出格式")
+    sort: Optional[List[SortField]] = Field(default=None, description="排序字段列表，id 作为最后的排序键")
+    batch_size: int = Field(default=1000, ge=1, le=10000, description="每批从数据库读取的行数")
+
+class ServerFacetRequest(BaseModel):
+    """服务器分面统计请求"""
+    query: Optional[QueryGroup] = Field(default=None, description="查询条件，为空时统计全部服务器")
+    fields: List[str] = Field(min_length=1, description="需要统计取值分布的字段列表")
+    limit: Optional[int] = Field(default=None, ge=1, le=1000, description="每个字段最多返回的取值个数")
+
+class ServerBulkCreateRequest(BaseModel):
+    """批量创建服务器请求（每条数据单独校验，不合法的数据在结果中逐条返回）"""
+    items: List[Dict[str, Any]] = Field(min_length=1, max_length=10000, description="服务器创建数据列表")
+
+class ServerDeleteByQueryRequest(BaseModel):
+    """按查询条件批量删除服务器请求"""
+    query: QueryGroup = Field(description="查询条件")
+    dry_run: bool = Field(default=False, description="只返回匹配数量，不做修改")
+    max_rows: Optional[int] = Field(default=None, ge=1, description="允许修改的最大行数，超过时拒绝执行")
+
+class ServerUpdateByQueryRequest(ServerDeleteByQueryRequest):
+    """按查询条件批量更新服务器请求"""
+    changes: ServerUpdate = Field(description="修改的字段及新值")
+
+class AgentReport(BaseModel):
+    """Agent 上报数据（未上报的字段保持不变）"""
+    # 长度与取值范围与 servers 表的列一致，超出的上报在入缓冲区前被拒绝
+    service_tag: str = Field(min_length=1, max_length=100, description="设备序列号")
+    agent_name: Optional[str] = Field(default=None, max_length=100, description="Agent抓取主机名")
+    agent_ip: Optional[str] = Field(default=None, max_length=100, description="Agent抓取ip")
+    agent_version: Optional[str] = Field(default=None, max_length=200, description="Agent版本")
+    agent_kernel: Optional[str] = Field(default=None, max_length=200, description="agent内核")
+    agent_os_id: Optional[int] = Field(default=None, ge=0, le=2 ** 63 - 1, description="agent采集的操作系统ID")
+    bios_version: Optional[str] = Field(default=None, max_length=256, description="BIOS版本号")
+    raid_fw_version: Optional[str] = Field(default=None, max_length=256, description="RAID卡固件版本")
+    network_segment_id: Optional[int] = Field(default=None, ge=0, le=2 ** 63 - 1,
+                                              description="网段ID，仅在主机不存在需要新建时使用")
+
+class AgentReportRequest(BaseModel):
+    """Agent 上报请求（单台主机上报或批量转发）"""
+    reports: List[AgentReport] = Field(min_length=1, max_length=10000, description="上报数据列表")
+
+class ServerBatchGetRequest(BaseModel):
+    """按主键或 service_tag 批量获取服务器请求（ids 与 service_tags 二选一）"""
+    ids: Optional[List[int]] = Field(default=None, max_length=50000, description="服务器ID列表")
+    service_tags: Optional[List[str]] = Field(default=None, max_length=50000, description="设备序列号列表")
+    fields: Optional[List[str]] = Field(default=None, description="需要返回的字段列表，为空时返回全部字段")
+
+    @model_validator(mode="after")
+    def check_keys(self):
+        if (self.ids is None) == (self.service_tags is None):
+            raise ValueError("ids 与 service_tags 必须且只能提供一个")
+        return self
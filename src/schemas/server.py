@@ -6,6 +6,10 @@ class ConflictError(Exception):
     """资源冲突异常"""
     pass
 
+class PreconditionFailedError(Exception):
+    """条件请求失败异常（If-Match 与资源当前版本不一致）"""
+    pass
+
 class ServerBase(BaseModel):
     """服务器基本信息"""
     # 必填字段
@@ -126,6 +130,7 @@ class Server(ServerBase):
     created_date: datetime
     last_modified_by: str
     last_modified_date: datetime
+    version: int = Field(default=1, description="行版本号")
 
     class Config:
         from_attributes = True
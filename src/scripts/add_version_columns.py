@@ -0,0 +1,28 @@
+"""
+为 server 与 network_segment 表添加行版本号列 version（ETag / If-Match 条件请求）
+已存在的行版本号为 1，重复执行时跳过已有该列的表
+
+用法:
+    python src/scripts/add_version_columns.py
+"""
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import inspect, text
+
+from init.database import engine
+from models.network_segment import NetworkSegment
+from models.server import Server
+
+if __name__ == "__main__":
+    inspector = inspect(engine)
+    for model in (Server, NetworkSegment):
+        table = model.__tablename__
+        if "version" in {column["name"] for column in inspector.get_columns(table)}:
+            print(f"{table}: 已存在 version 列，跳过")
+            continue
+        with engine.begin() as connection:
+            connection.execute(text(f"ALTER TABLE {table} ADD COLUMN version INTEGER NOT NULL DEFAULT 1"))
+        print(f"{table}: 已添加 version 列")
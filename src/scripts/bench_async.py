@@ -0,0 +1,124 @@
+"""
+同步（Flask + 线程池）与异步（asgi.py + SQLAlchemy 异步引擎）模式的并发基准测试
+在进程内直接调用 WSGI / ASGI 应用（不经过 HTTP 服务器），按不同并发数发送 POST /api/server/query，
+统计吞吐量与延迟分位数；同步模式的并发受线程数限制，超出部分在队列中等待
+
+默认在临时 SQLite 文件上生成合成数据；数据库往返延迟越大，异步模式的优势越明显，
+可通过 --database-url 指定已导入数据的 MySQL/PostgreSQL（需安装对应的同步与异步驱动）
+
+用法:
+    python src/scripts/bench_async.py --rows 20000 --requests 400 --concurrency 1,16,64,256 --threads 16
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+QUERY = {
+    "query": {"operator": "AND", "conditions": [{"field": "cpu_cores", "operator": ">", "value": 16}]},
+    "pagination": {"page": 1, "page_size": 50},
+    "sort": [{"field": "ram_size", "order": "desc"}],
+    "count_mode": "exact",
+}
+
+
+def summarize(latencies, elapsed):
+    latencies = sorted(latencies)
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50": statistics.median(latencies) * 1000,
+        "p95": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+    }
+
+
+def run_sync(flask_app, total: int, concurrency: int, threads: int):
+    """concurrency 个客户端同时发送请求，由 threads 个工作线程处理（排队时间计入延迟）"""
+    body = json.dumps(QUERY)
+    client = flask_app.test_client()
+
+    def one(submitted):
+        response = client.post("/api/server/query", data=body, content_type="application/json")
+        assert response.status_code == 200, response.data
+        return time.perf_counter() - submitted
+
+    latencies = []
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        for offset in range(0, total, concurrency):
+            batch = [pool.submit(one, time.perf_counter()) for _ in range(min(concurrency, total - offset))]
+            latencies.extend(future.result() for future in batch)
+    return summarize(latencies, time.perf_counter() - start)
+
+
+async def run_async(asgi_app, total: int, concurrency: int):
+    """concurrency 个协程同时发送请求"""
+    body = json.dumps(QUERY).encode()
+    scope = {
+        "type": "http", "method": "POST", "path": "/api/server/query", "query_string": b"", "root_path": "",
+        "headers": [(b"content-type", b"application/json")], "http_version": "1.1", "scheme": "http",
+    }
+
+    async def one():
+        messages = []
+
+        async def receive():
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        async def send(message):
+            messages.append(message)
+
+        submitted = time.perf_counter()
+        await asgi_app(scope, receive, send)
+        assert messages[0]["status"] == 200, messages
+        return time.perf_counter() - submitted
+
+    latencies = []
+    start = time.perf_counter()
+    for offset in range(0, total, concurrency):
+        latencies.extend(await asyncio.gather(*[one() for _ in range(min(concurrency, total - offset))]))
+    return summarize(latencies, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="同步与异步模式的并发基准测试")
+    parser.add_argument("--rows", type=int, default=20000, help="合成数据行数（未指定 --database-url 时）")
+    parser.add_argument("--database-url", help="已导入数据的数据库连接地址（同步驱动）")
+    parser.add_argument("--requests", type=int, default=400, help="每个并发级别发送的请求数")
+    parser.add_argument("--concurrency", default="1,16,64,256", help="逗号分隔的并发数")
+    parser.add_argument("--threads", type=int, default=16, help="同步模式的工作线程数")
+    args = parser.parse_args()
+
+    # 引擎在导入 init.database 时按环境变量创建，需在导入应用模块之前设置
+    database_url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_async.db')}"
+    os.environ["DATABASE_URL"] = database_url
+    os.environ.pop("DATABASE_REPLICA_URLS", None)
+    if not args.database_url:
+        from sqlalchemy import create_engine
+        from scripts.synthetic_data import load_dataset
+
+        load_dataset(create_engine(database_url), args.rows)
+
+    from app import app as flask_app
+    from asgi import app as asgi_app
+    from init.async_database import ASYNC_DB
+
+    levels = [int(level) for level in args.concurrency.split(",") if level]
+    print(f"数据库: {database_url}，每级 {args.requests} 个请求，同步模式 {args.threads} 个线程")
+    print(f"{'并发':>6}{'同步 req/s':>12}{'p50(ms)':>10}{'p95(ms)':>10}{'异步 req/s':>12}{'p50(ms)':>10}{'p95(ms)':>10}")
+
+    async def main():
+        for level in levels:
+            sync = run_sync(flask_app, args.requests, level, args.threads)
+            result = await run_async(asgi_app, args.requests, level)
+            print(f"{level:>6}{sync['rps']:>12.1f}{sync['p50']:>10.1f}{sync['p95']:>10.1f}"
+                  f"{result['rps']:>12.1f}{result['p50']:>10.1f}{result['p95']:>10.1f}")
+        await ASYNC_DB.dispose()
+
+    asyncio.run(main())
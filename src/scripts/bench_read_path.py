@@ -0,0 +1,64 @@
+"""
+服务器列表读路径基准测试
+对比 get_servers 返回 ORM 对象与 as_rows=True（Core select 返回 Row）两种方式，
+分别统计查询耗时与查询 + 序列化编码的总耗时
+
+用法:
+    python src/scripts/bench_read_path.py --rows 20000 --page-size 1000 --repeat 10
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from routes.server import serialize_servers
+from schemas.requests import ServerQueryRequest
+from scripts.synthetic_data import load_dataset
+from services.serializer import dumps
+from services.server_service import ServerService
+
+CASES = {
+    "全部字段": {},
+    "fields=name,cpu_cores,ram_size": {"fields": ["name", "cpu_cores", "ram_size"]},
+}
+
+
+def measure(engine, request: ServerQueryRequest, as_rows: bool, encode: bool, repeat: int) -> float:
+    """返回多次执行中的最短耗时（毫秒），每次使用新会话"""
+    best = float("inf")
+    for _ in range(repeat):
+        with Session(engine) as db:
+            start = time.perf_counter()
+            items = ServerService(db).get_servers(request, as_rows=as_rows)['items']
+            if encode:
+                dumps(serialize_servers(items, request.fields))
+            best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="服务器列表读路径基准测试")
+    parser.add_argument("--rows", type=int, default=20000, help="合成数据行数")
+    parser.add_argument("--page-size", type=int, default=1000, help="每页行数")
+    parser.add_argument("--repeat", type=int, default=10, help="每种方式的重复次数（取最短耗时）")
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    load_dataset(engine, args.rows)
+
+    print(f"{args.rows} 行数据，每页 {args.page_size} 行，count_mode=none")
+    print(f"{'场景':<34}{'ORM(ms)':>10}{'Core(ms)':>10}{'加速比':>8}")
+    for name, extra in CASES.items():
+        request = ServerQueryRequest(query={"operator": "AND", "conditions": []},
+                                     pagination={"page": 2, "page_size": args.page_size},
+                                     sort=[{"field": "name", "order": "asc"}], count_mode="none", **extra)
+        for encode in (False, True):
+            orm = measure(engine, request, False, encode, args.repeat)
+            core = measure(engine, request, True, encode, args.repeat)
+            label = f"{name}{' + 编码' if encode else ''}"
+            print(f"{label:<34}{orm:>10.2f}{core:>10.2f}{orm / core:>8.1f}x")
@@ -0,0 +1,89 @@
+"""
+服务器响应序列化基准测试
+对比原有路径（pydantic model_validate -> model_dump -> to_serializable -> json 编码）
+与 SERVER_SERIALIZER 单次遍历 + dumps 的耗时，并校验两者输出一致
+
+用法:
+    python src/scripts/bench_serializer.py --rows 1000 --repeat 20
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from decimal import Decimal
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from models.server import Server
+from schemas.server import Server as ServerSchema
+from scripts.synthetic_data import load_dataset
+from services.serializer import SERVER_SERIALIZER, dumps, orjson
+
+
+def to_serializable(obj):
+    """原接口中的递归转换（保留一份用于对比）"""
+    if isinstance(obj, list):
+        return [to_serializable(item) for item in obj]
+    elif isinstance(obj, dict):
+        return {k: to_serializable(v) for k, v in obj.items()}
+    elif isinstance(obj, datetime):
+        return obj.isoformat()
+    elif isinstance(obj, Decimal):
+        return float(obj)
+    else:
+        return obj
+
+
+def legacy_encode(servers) -> bytes:
+    data = to_serializable([ServerSchema.model_validate(server).model_dump() for server in servers])
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def serializer_encode(servers) -> bytes:
+    return dumps(SERVER_SERIALIZER.from_objects(servers))
+
+
+def core_encode(rows) -> bytes:
+    return dumps(SERVER_SERIALIZER.from_rows(rows))
+
+
+def measure(func, arg, repeat: int) -> float:
+    """返回多次执行中的最短耗时（毫秒）"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(arg)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="服务器响应序列化基准测试")
+    parser.add_argument("--rows", type=int, default=1000, help="单页行数")
+    parser.add_argument("--repeat", type=int, default=20, help="每种方式的重复次数（取最短耗时）")
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    load_dataset(engine, args.rows)
+    with Session(engine) as db:
+        servers = db.scalars(select(Server).order_by(Server.id).limit(args.rows)).all()
+        rows = db.execute(select(*SERVER_SERIALIZER.select_columns()).order_by(Server.id).limit(args.rows)).all()
+
+    if json.loads(legacy_encode(servers)) != json.loads(serializer_encode(servers)) \
+            or json.loads(core_encode(rows)) != json.loads(serializer_encode(servers)):
+        sys.exit("输出不一致")
+
+    results = [(name, measure(func, arg, args.repeat)) for name, func, arg in (
+        ("pydantic + to_serializable", legacy_encode, servers),
+        ("RowSerializer (ORM)", serializer_encode, servers),
+        ("RowSerializer (Core)", core_encode, rows),
+    )]
+    print(f"{len(servers)} 行，orjson: {'是' if orjson is not None else '否'}")
+    print(f"{'方式':<28}{'耗时(ms)':>10}{'加速比':>8}")
+    for name, elapsed in results:
+        print(f"{name:<28}{elapsed:>10.2f}{results[0][1] / elapsed:>8.1f}x")
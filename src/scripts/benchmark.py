@@ -0,0 +1,324 @@
+"""
+基准测试套件
+在 SQLite 上按 synthetic_data.py 的取值分布生成不同规模的 Server / NetworkSegment 数据集，依次测量:
+    build_query   查询条件编译（简单、嵌套、like、in）
+    get_servers   分页（首页/深分页，ORM 与 Core 读路径）、排序、query_all
+    write         单条创建、更新、删除（每次使用新会话并提交）
+    http          经 Flask 测试客户端的列表、详情、高级查询（含序列化与 JSON 编码）
+    serialize     网络段列表的序列化与编码（网络段接口未注册到应用，直接调用序列化器）
+每项记录最短/中位数/p95/最大/平均耗时（毫秒），结果写入 JSON，可用 --compare 与之前的结果对比
+
+数据库文件按 (行数, 随机种子) 缓存在 --data-dir 中，加 --reuse 时直接使用已有文件（写操作测试会还原增删的行）
+
+用法:
+    python src/scripts/benchmark.py --sizes 10000,100000,1000000 --output bench.json
+    python src/scripts/benchmark.py --sizes 10000 --only http,get_servers --compare bench.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+GROUPS = ["build_query", "get_servers", "write", "http", "serialize"]
+
+QUERIES = {
+    "simple": {"operator": "AND", "conditions": [{"field": "use_status", "operator": "=", "value": "in_use"}]},
+    "nested": {"operator": "AND", "conditions": [
+        {"field": "cpu_cores", "operator": ">", "value": 32},
+        {"operator": "OR", "conditions": [
+            {"field": "label", "operator": "=", "value": "bu-01"},
+            {"field": "owner", "operator": "like", "value": "%user00%"},
+        ]},
+    ]},
+    "like": {"operator": "AND", "conditions": [{"field": "name", "operator": "like", "value": "%db-sh1%"}]},
+    "in": {"operator": "AND", "conditions": [
+        {"field": "network_segment_id", "operator": "in", "value": list(range(1, 21))}]},
+}
+
+# query_all 使用选择性较高的条件（约 1% 的行）
+SELECTIVE = {"operator": "AND", "conditions": [
+    {"field": "use_status", "operator": "=", "value": "maintenance"},
+    {"field": "service_level", "operator": "=", "value": 3},
+]}
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """耗时统计（毫秒）"""
+    ordered = sorted(samples)
+    return {
+        "min_ms": round(ordered[0] * 1000, 4),
+        "median_ms": round(statistics.median(ordered) * 1000, 4),
+        "p95_ms": round(ordered[max(0, int(len(ordered) * 0.95) - 1)] * 1000, 4),
+        "max_ms": round(ordered[-1] * 1000, 4),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 4),
+    }
+
+
+class Runner:
+    """执行测量并收集结果"""
+
+    def __init__(self, repeat: int, warmup: int):
+        self.repeat = repeat
+        self.warmup = warmup
+        self.results: List[Dict[str, Any]] = []
+
+    def measure(self, rows: int, name: str, func: Callable[[], Any], repeat: Optional[int] = None) -> None:
+        """
+        预热后重复执行 func 并记录耗时
+
+        Args:
+            rows: 数据集行数
+            name: 测试项名称（组名.场景）
+            func: 被测函数，每次调用测一次耗时
+            repeat: 覆盖默认的重复次数
+        """
+        for _ in range(self.warmup):
+            func()
+        samples = []
+        for _ in range(repeat or self.repeat):
+            start = time.perf_counter()
+            func()
+            samples.append(time.perf_counter() - start)
+        result = {"dataset_rows": rows, "name": name, "repeat": len(samples), **summarize(samples)}
+        self.results.append(result)
+        print(f"{rows:>9} {name:<40}{result['median_ms']:>12.3f}{result['p95_ms']:>12.3f}")
+
+
+def prepare_dataset(data_dir: str, rows: int, seed: int, reuse: bool) -> str:
+    """生成（或复用）数据集，返回数据库连接地址"""
+    from sqlalchemy import create_engine, func, select
+    from models.server import Server
+    from scripts.synthetic_data import load_dataset
+
+    path = os.path.join(data_dir, f"cmdb_bench_{rows}_{seed}.db")
+    url = f"sqlite:///{path}"
+    if reuse and os.path.exists(path):
+        engine = create_engine(url)
+        with engine.connect() as conn:
+            existing = conn.scalar(select(func.count()).select_from(Server))
+        engine.dispose()
+        if existing == rows:
+            return url
+    if os.path.exists(path):
+        os.remove(path)
+    start = time.perf_counter()
+    engine = create_engine(url)
+    load_dataset(engine, rows, seed)
+    engine.dispose()
+    print(f"生成 {rows} 行数据集: {time.perf_counter() - start:.1f}s ({path})")
+    return url
+
+
+def bench_build_query(runner: Runner, rows: int, session_factory) -> None:
+    from schemas.query import QueryGroup
+    from services.server_service import ServerService
+
+    with session_factory() as db:
+        service = ServerService(db)
+        for name, query in QUERIES.items():
+            group = QueryGroup(**query)
+            runner.measure(rows, f"build_query.{name}", lambda: service.build_query(group), repeat=runner.repeat * 50)
+
+
+def bench_get_servers(runner: Runner, rows: int, session_factory) -> None:
+    from schemas.requests import ServerQueryRequest
+    from services.server_service import ServerService
+
+    def run(request: ServerQueryRequest, as_rows: bool = True):
+        def call():
+            with session_factory() as db:
+                ServerService(db).get_servers(request, as_rows=as_rows)
+        return call
+
+    paged = ServerQueryRequest(query=QUERIES["simple"], pagination={"page": 1, "page_size": 50})
+    deep = ServerQueryRequest(query=QUERIES["simple"], pagination={"page": max(1, rows // 2 // 50), "page_size": 50},
+                              count_mode="none")
+    sorted_page = ServerQueryRequest(query=QUERIES["nested"], pagination={"page": 1, "page_size": 100},
+                                     sort=[{"field": "ram_size", "order": "desc"}, {"field": "name", "order": "asc"}])
+    query_all = ServerQueryRequest(query=SELECTIVE, pagination={"page": 1, "page_size": 50}, query_all=True,
+                                   count_mode="none")
+
+    runner.measure(rows, "get_servers.paged", run(paged))
+    runner.measure(rows, "get_servers.paged.orm", run(paged, as_rows=False))
+    runner.measure(rows, "get_servers.paged_deep", run(deep))
+    runner.measure(rows, "get_servers.sorted", run(sorted_page))
+    runner.measure(rows, "get_servers.query_all", run(query_all), repeat=max(3, runner.repeat // 4))
+
+
+def bench_write(runner: Runner, rows: int, session_factory) -> None:
+    from schemas.server import ServerCreate, ServerUpdate
+    from services.server_service import ServerService
+
+    created: List[int] = []
+    counter = iter(range(10 ** 9))
+
+    def create():
+        with session_factory() as db:
+            server = ServerService(db).create_server(ServerCreate(
+                network_segment_id=1, service_tag=f"BENCH-{time.time_ns()}-{next(counter)}",
+                name="bench-server", primary_ip="10.250.0.1", cpu_cores=32, ram_size=256))
+            created.append(server.id)
+
+    def update():
+        server_id = created[next(counter) % len(created)]
+        # update_server 会打印更新过程，不输出到终端
+        with session_factory() as db, contextlib.redirect_stdout(io.StringIO()):
+            ServerService(db).update_server(server_id, ServerUpdate(owner=f"bench-{next(counter)}"))
+
+    def delete():
+        with session_factory() as db:
+            ServerService(db).delete_server(created.pop())
+
+    # 删除次数与创建次数相同，结束后数据集还原
+    runner.measure(rows, "write.create", create)
+    runner.measure(rows, "write.update", update)
+    runner.measure(rows, "write.delete", delete, repeat=len(created) - runner.warmup)
+
+
+def bench_http(runner: Runner, rows: int, session_factory) -> None:
+    from app import app
+
+    client = app.test_client()
+    detail_id = max(1, rows // 3)
+
+    def get(url: str):
+        def call():
+            response = client.get(url)
+            assert response.status_code == 200, response.data
+        return call
+
+    def post(url: str, body: Dict[str, Any]):
+        payload = json.dumps(body)
+
+        def call():
+            response = client.post(url, data=payload, content_type="application/json")
+            assert response.status_code == 200, response.data
+        return call
+
+    runner.measure(rows, "http.list", get("/api/server/?page=1&page_size=50&use_status=in_use"))
+    runner.measure(rows, "http.detail", get(f"/api/server/{detail_id}"))
+    runner.measure(rows, "http.query", post("/api/server/query", {
+        "query": QUERIES["nested"], "pagination": {"page": 1, "page_size": 500},
+        "sort": [{"field": "ram_size", "order": "desc"}]}))
+    runner.measure(rows, "http.query.fields", post("/api/server/query", {
+        "query": QUERIES["nested"], "pagination": {"page": 1, "page_size": 500},
+        "fields": ["name", "primary_ip", "cpu_cores", "ram_size"], "count_mode": "none"}))
+
+
+def bench_serialize(runner: Runner, rows: int, session_factory) -> None:
+    from services.network_segment_service import NetworkSegmentService
+    from services.serializer import NETWORK_SEGMENT_SERIALIZER, dumps
+
+    with session_factory() as db:
+        segments = NetworkSegmentService(db).get_network_segments(limit=1000)
+        runner.measure(rows, f"serialize.network_segments[{len(segments)}]",
+                       lambda: dumps(NETWORK_SEGMENT_SERIALIZER.from_objects(segments)))
+
+
+BENCHMARKS = {
+    "build_query": bench_build_query,
+    "get_servers": bench_get_servers,
+    "write": bench_write,
+    "http": bench_http,
+    "serialize": bench_serialize,
+}
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: List[Dict[str, Any]], baseline_path: str) -> None:
+    """按 (数据集, 测试项) 对比中位数耗时"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(item["dataset_rows"], item["name"]): item for item in json.load(f)["results"]}
+    print(f"\n与 {baseline_path} 对比（中位数，比值 < 1 表示变快）")
+    print(f"{'行数':>9} {'测试项':<40}{'之前(ms)':>12}{'现在(ms)':>12}{'比值':>8}")
+    for item in results:
+        before = baseline.get((item["dataset_rows"], item["name"]))
+        if before is None:
+            continue
+        ratio = item["median_ms"] / before["median_ms"] if before["median_ms"] else float("inf")
+        print(f"{item['dataset_rows']:>9} {item['name']:<40}{before['median_ms']:>12.3f}"
+              f"{item['median_ms']:>12.3f}{ratio:>8.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="基准测试套件")
+    parser.add_argument("--sizes", default="10000,100000", help="逗号分隔的服务器行数（如 10000,100000,1000000）")
+    parser.add_argument("--only", default=",".join(GROUPS), help=f"逗号分隔的测试组: {','.join(GROUPS)}")
+    parser.add_argument("--repeat", type=int, default=20, help="每项的重复次数")
+    parser.add_argument("--warmup", type=int, default=2, help="每项的预热次数")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "cmdb_bench"),
+                        help="数据集文件目录")
+    parser.add_argument("--reuse", action="store_true", help="复用已生成的数据集")
+    parser.add_argument("--output", default="benchmark.json", help="结果 JSON 文件")
+    parser.add_argument("--compare", help="与之前的结果 JSON 对比")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+    groups = [group for group in args.only.split(",") if group]
+    unknown = set(groups) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"未知的测试组: {','.join(sorted(unknown))}")
+    os.makedirs(args.data_dir, exist_ok=True)
+
+    # 引擎在导入 init.database 时按环境变量创建，需在导入应用模块之前设置；之后按数据集切换会话工厂的连接
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(args.data_dir, 'cmdb_bench_placeholder.db')}"
+    os.environ.pop("DATABASE_REPLICA_URLS", None)
+
+    import sqlalchemy
+    from sqlalchemy import create_engine
+    from init.database import SessionLocal
+    from services.count_strategy import COUNT_CACHE
+    from services.facet_service import FACET_CACHE
+
+    runner = Runner(args.repeat, args.warmup)
+    started = datetime.now()
+    print(f"{'行数':>9} {'测试项':<40}{'中位数(ms)':>12}{'p95(ms)':>12}")
+    for rows in sizes:
+        engine = create_engine(prepare_dataset(args.data_dir, rows, args.seed, args.reuse))
+        SessionLocal.configure(bind=engine, replicas=[])
+        COUNT_CACHE.invalidate()
+        FACET_CACHE.invalidate()
+        for group in groups:
+            BENCHMARKS[group](runner, rows, SessionLocal)
+        engine.dispose()
+
+    report = {
+        "meta": {
+            "started": started.isoformat(timespec="seconds"),
+            "duration_s": round((datetime.now() - started).total_seconds(), 1),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "sqlalchemy": sqlalchemy.__version__,
+            "platform": platform.platform(),
+            "sizes": sizes,
+            "groups": groups,
+            "repeat": args.repeat,
+            "warmup": args.warmup,
+            "seed": args.seed,
+        },
+        "results": runner.results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n结果已写入 {args.output}")
+    if args.compare:
+        compare(runner.results, args.compare)
@@ -0,0 +1,40 @@
+"""
+容量汇总一致性检查
+用服务器表全量重算的结果与汇总表比对，建议由定时任务周期执行；--repair 时用重算结果重写汇总表
+（首次启用 CAPACITY_ROLLUP_ENABLED 前用 --repair 生成汇总数据，表不存在时自动创建）
+
+用法:
+    python src/scripts/check_capacity_rollup.py            # 存在差异时退出码为 1
+    python src/scripts/check_capacity_rollup.py --repair
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from init.database import Base, SessionLocal, engine
+from models.server_capacity_rollup import ServerCapacityRollup
+from services.capacity_rollup import SERVER_CAPACITY_ROLLUP
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="容量汇总一致性检查")
+    parser.add_argument("--repair", action="store_true", help="存在差异时用全量重算结果重写汇总表")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(engine, tables=[ServerCapacityRollup.__table__])
+    db = SessionLocal()
+    try:
+        differences = SERVER_CAPACITY_ROLLUP.check(db, repair=args.repair)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    for difference in differences:
+        print(json.dumps(difference, ensure_ascii=False, default=str))
+    print(f"差异分组数: {len(differences)}{'，已修复' if args.repair and differences else ''}")
+    sys.exit(1 if differences and not args.repair else 0)
@@ -0,0 +1,437 @@
+"""
+索引建议工具
+根据 QueryConfigFactory 中的查询配置与线上记录的查询形态使用统计，给出 B-tree 单列/联合索引建议，
+生成 Flask-Migrate (Alembic) 迁移脚本，并在合成数据集上对比建索引前后的查询耗时
+
+用法:
+    # 1. 导出线上查询形态使用统计
+    curl -s http://localhost:8081/api/server/query/stats?usage_limit=500 > usage.json
+    # 2. 生成建议、迁移脚本与效果报告
+    python src/scripts/index_advisor.py --usage usage.json --migration-dir migrations/versions --report-rows 50000
+    # 迁移目录中已有迁移创建的索引不会重复建议；加 --database-url 时同时跳过线上数据库中已存在的索引
+"""
+import argparse
+import json
+import os
+import random
+import re
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import Index, Text, create_engine, func, inspect, select, text
+from sqlalchemy.orm import Session
+
+from models.server import Server
+from schemas.query import FieldType, QueryCondition, QueryConfigFactory, QueryGroup
+from schemas.requests import ServerQueryRequest
+from scripts.synthetic_data import load_dataset
+from services.server_service import ServerService
+
+# 查询配置名称到 ORM 模型的映射
+MODEL_REGISTRY = {
+    "server": Server,
+}
+
+EQUALITY_OPERATORS = {"=", "in"}
+RANGE_OPERATORS = {">", "<", ">=", "<="}
+LOW_CARDINALITY_TYPES = {FieldType.BOOLEAN, FieldType.ENUM}
+MAX_INDEX_COLUMNS = 4
+MAX_INDEX_NAME_LENGTH = 64
+
+# 写路径上固定存在的查询: create_server/update_server 按 service_tag 检查唯一性
+WRITE_PATH_QUERIES = {
+    "server": [(("service_tag",), "create_server/update_server 按 service_tag 检查唯一性")],
+}
+
+
+class IndexProposal:
+    """索引建议"""
+
+    def __init__(self, table: str, columns: Tuple[str, ...]):
+        self.table = table
+        self.columns = columns
+        self.score = 0
+        self.reasons: List[str] = []
+        self.paths: List[Tuple[int, List[Tuple[str, str]]]] = []
+
+    @property
+    def name(self) -> str:
+        return f"ix_{self.table}_{'_'.join(self.columns)}"[:MAX_INDEX_NAME_LENGTH]
+
+    def to_dict(self) -> Dict:
+        return {"name": self.name, "table": self.table, "columns": list(self.columns),
+                "score": self.score, "reasons": self.reasons}
+
+
+def load_usage(path: Optional[str]) -> List[Dict]:
+    """
+    读取查询形态使用统计，兼容 /api/server/query/stats 的完整响应、data 字段或 usage 列表本身
+    """
+    if not path:
+        return []
+    with open(path, encoding="utf-8") as f:
+        payload = json.load(f)
+    if isinstance(payload, dict):
+        payload = payload.get("data", payload)
+        payload = payload.get("usage", []) if isinstance(payload, dict) else payload
+    return [{"model": entry.get("model", "server"), "shape": entry["shape"], "count": int(entry["count"])}
+            for entry in payload]
+
+
+def access_paths(shape, limit: int = 32) -> List[List[Tuple[str, str]]]:
+    """
+    将查询形态展开为访问路径：每条路径是一组以 AND 连接的 (字段, 操作符)，OR 的各分支分别成为路径
+    """
+    if len(shape) == 3:
+        return [[(shape[0], shape[1])]]
+    operator, children = shape
+    child_paths = [paths for paths in (access_paths(child, limit) for child in children) if paths]
+    if not child_paths:
+        return []
+    if operator == "OR":
+        return [path for paths in child_paths for path in paths][:limit]
+    result = [[]]
+    for paths in child_paths:
+        result = [left + right for left in result for right in paths][:limit]
+    return result
+
+
+def _cardinality_rank(field_config) -> int:
+    """粗略估计字段基数，用于决定联合索引中等值列的顺序"""
+    if field_config.type == FieldType.BOOLEAN:
+        return 0
+    if field_config.type == FieldType.ENUM:
+        return 1
+    return 2
+
+
+def candidate_columns(path: Sequence[Tuple[str, str]], query_config, table) -> Optional[Tuple[str, ...]]:
+    """
+    根据一条访问路径生成候选索引列：等值条件列（高基数在前）+ 至多一个范围条件列；
+    like（前导通配符）与 != 无法利用 B-tree 索引，Text 列无法直接建立 B-tree 索引
+    """
+    equality, ranges = [], []
+    for field, operator in path:
+        column = table.c.get(field)
+        if column is None or isinstance(column.type, Text):
+            continue
+        if operator in EQUALITY_OPERATORS and field not in equality:
+            equality.append(field)
+        elif operator in RANGE_OPERATORS and field not in ranges:
+            ranges.append(field)
+
+    equality.sort(key=lambda name: -_cardinality_rank(query_config.get_field(name)))
+    ranges = [name for name in ranges if name not in equality]
+    columns = equality[:MAX_INDEX_COLUMNS - 1] + ranges[:1]
+    if not columns:
+        return None
+    if not ranges and all(query_config.get_field(name).type in LOW_CARDINALITY_TYPES for name in columns):
+        return None
+    return tuple(columns)
+
+
+def existing_indexes(table, extra: Optional[Dict[str, List[Tuple[str, ...]]]] = None) -> List[Tuple[str, ...]]:
+    """已有索引（含主键）的列组合: 模型中声明的索引，加上 extra 中按表名给出的索引（迁移脚本或线上数据库）"""
+    indexes = [tuple(column.name for column in table.primary_key.columns)]
+    indexes += [tuple(column.name for column in index.columns) for index in table.indexes]
+    indexes += (extra or {}).get(table.name, [])
+    return indexes
+
+
+_CREATE_INDEX = re.compile(
+    r"op\.create_index\(\s*(['\"])[^'\"]+\1\s*,\s*(['\"])(?P<table>[^'\"]+)\2\s*,\s*\[(?P<columns>[^\]]*)\]")
+
+
+def migration_indexes(migration_dir: Optional[str]) -> Dict[str, List[Tuple[str, ...]]]:
+    """
+    已有迁移脚本 upgrade() 中创建的索引（包括本工具之前生成的迁移）
+
+    Returns:
+        dict: {表名: [列组合, ...]}
+    """
+    indexes: Dict[str, List[Tuple[str, ...]]] = {}
+    if not migration_dir or not os.path.isdir(migration_dir):
+        return indexes
+    for filename in sorted(os.listdir(migration_dir)):
+        if not filename.endswith(".py"):
+            continue
+        with open(os.path.join(migration_dir, filename), encoding="utf-8") as f:
+            upgrade = f.read().split("def downgrade", 1)[0]
+        for match in _CREATE_INDEX.finditer(upgrade):
+            columns = tuple(column.strip().strip("'\"") for column in match.group("columns").split(",") if column.strip())
+            indexes.setdefault(match.group("table"), []).append(columns)
+    return indexes
+
+
+def database_indexes(url: Optional[str]) -> Dict[str, List[Tuple[str, ...]]]:
+    """
+    从线上数据库反射已有索引
+
+    Returns:
+        dict: {表名: [列组合, ...]}
+    """
+    if not url:
+        return {}
+    engine = create_engine(url)
+    try:
+        inspector = inspect(engine)
+        return {
+            model.__table__.name: [tuple(index["column_names"]) for index in inspector.get_indexes(model.__table__.name)]
+            for model in MODEL_REGISTRY.values() if inspector.has_table(model.__table__.name)
+        }
+    finally:
+        engine.dispose()
+
+
+def propose_indexes(usage: List[Dict], min_share: float = 0.01, limit: int = 10,
+                    known_indexes: Optional[Dict[str, List[Tuple[str, ...]]]] = None) -> List[IndexProposal]:
+    """
+    生成索引建议
+
+    Args:
+        usage: 查询形态使用统计
+        min_share: 候选索引覆盖的查询次数占比下限
+        limit: 每张表最多建议的索引数量
+        known_indexes: 模型之外已存在的索引 {表名: [列组合, ...]}（迁移脚本与线上数据库中的索引）
+
+    Returns:
+        list: 按得分降序排列的索引建议
+    """
+    proposals: List[IndexProposal] = []
+    for model_name, query_config in QueryConfigFactory.get_all_configs().items():
+        model = MODEL_REGISTRY.get(model_name)
+        if model is None:
+            continue
+        table = model.__table__
+        candidates: Dict[Tuple[str, ...], IndexProposal] = {}
+        total = 0
+        for entry in usage:
+            if entry["model"] != model_name:
+                continue
+            total += entry["count"]
+            for path in access_paths(entry["shape"]):
+                columns = candidate_columns(path, query_config, table)
+                if columns is None:
+                    continue
+                proposal = candidates.setdefault(columns, IndexProposal(table.name, columns))
+                proposal.score += entry["count"]
+                proposal.paths.append((entry["count"], path))
+
+        # 被更长联合索引的前缀覆盖的候选合并到长索引中
+        for columns in sorted(candidates, key=len):
+            for other in sorted(candidates, key=len, reverse=True):
+                if len(other) > len(columns) and other[:len(columns)] == columns:
+                    candidates[other].score += candidates[columns].score
+                    candidates[other].paths += candidates[columns].paths
+                    del candidates[columns]
+                    break
+
+        existing = existing_indexes(table, known_indexes)
+        selected = [proposal for proposal in candidates.values()
+                    if not any(index[:len(proposal.columns)] == proposal.columns for index in existing)
+                    and (not total or proposal.score / total >= min_share)]
+        selected.sort(key=lambda proposal: -proposal.score)
+        selected = selected[:limit]
+        for proposal in selected:
+            share = proposal.score / total if total else 0
+            proposal.reasons.append(f"覆盖 {proposal.score} 次查询（占 {share:.1%}）")
+
+        for columns, reason in WRITE_PATH_QUERIES.get(model_name, []):
+            if any(index[:len(columns)] == columns for index in existing):
+                continue
+            proposal = next((p for p in selected if p.columns[:len(columns)] == columns), None)
+            if proposal is None:
+                proposal = IndexProposal(table.name, columns)
+                selected.insert(0, proposal)
+            proposal.reasons.append(reason)
+        proposals += selected
+    return proposals
+
+
+def find_head_revision(migration_dir: str) -> Optional[str]:
+    """从已有迁移脚本中找出当前 head 版本"""
+    if not os.path.isdir(migration_dir):
+        return None
+    revisions, parents = set(), set()
+    for filename in os.listdir(migration_dir):
+        if not filename.endswith(".py"):
+            continue
+        with open(os.path.join(migration_dir, filename), encoding="utf-8") as f:
+            content = f.read()
+        revision = re.search(r"^revision\s*=\s*['\"]([^'\"]+)['\"]", content, re.M)
+        down = re.search(r"^down_revision\s*=\s*['\"]([^'\"]+)['\"]", content, re.M)
+        if revision:
+            revisions.add(revision.group(1))
+        if down:
+            parents.add(down.group(1))
+    heads = sorted(revisions - parents)
+    if len(heads) > 1:
+        print(f"WARNING: 存在多个 head 版本 {heads}，使用 {heads[0]}")
+    return heads[0] if heads else None
+
+
+def render_migration(proposals: List[IndexProposal], revision: str, down_revision: Optional[str]) -> str:
+    """生成 Alembic 迁移脚本内容"""
+    upgrade = [f"    op.create_index({p.name!r}, {p.table!r}, {list(p.columns)!r}, unique=False)  # {'; '.join(p.reasons)}"
+               for p in proposals] or ["    pass"]
+    downgrade = [f"    op.drop_index({p.name!r}, table_name={p.table!r})" for p in reversed(proposals)] or ["    pass"]
+    return "\n".join([
+        '"""index advisor: add secondary indexes',
+        "",
+        f"Revision ID: {revision}",
+        f"Revises: {down_revision or ''}",
+        f"Create Date: {datetime.now().isoformat(sep=' ', timespec='seconds')}",
+        "",
+        '"""',
+        "from alembic import op",
+        "",
+        "",
+        "# revision identifiers, used by Alembic.",
+        f"revision = {revision!r}",
+        f"down_revision = {down_revision!r}",
+        "branch_labels = None",
+        "depends_on = None",
+        "",
+        "",
+        "def upgrade():",
+        *upgrade,
+        "",
+        "",
+        "def downgrade():",
+        *downgrade,
+        "",
+    ])
+
+
+def write_migration(proposals: List[IndexProposal], migration_dir: str) -> str:
+    """在迁移目录中写入新的迁移脚本，返回文件路径"""
+    os.makedirs(migration_dir, exist_ok=True)
+    revision = uuid.uuid4().hex[:12]
+    path = os.path.join(migration_dir, f"{revision}_index_advisor.py")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(render_migration(proposals, revision, find_head_revision(migration_dir)))
+    return path
+
+
+def _sample_condition(field: str, operator: str, row, query_config) -> QueryCondition:
+    """用数据集中的一行生成条件取值，保证查询有结果"""
+    value = getattr(row, field)
+    field_config = query_config.get_field(field)
+    if field_config.type == FieldType.FLOAT:
+        value = float(value)
+    if operator == "like":
+        value = str(value)[len(str(value)) // 3:][:4]
+    elif operator == "in":
+        value = [value] if field_config.is_multi_select else value
+        operator = "in" if field_config.is_multi_select else "="
+    # 取值来自数据集本身，跳过校验以便直接传入 datetime（SQLite 的 DateTime 列不接受字符串）
+    return QueryCondition.model_construct(field=field, operator=operator, value=value)
+
+
+def _time_it(func_, repeat: int) -> float:
+    """多次执行取中位数耗时（毫秒）"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func_()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def benchmark(proposals: List[IndexProposal], rows: int, repeat: int = 5, seed: int = 42) -> List[Dict]:
+    """
+    在合成数据集（SQLite 内存库）上对比建索引前后的耗时
+    每个建议索引取其覆盖次数最多的访问路径，按 get_servers 的方式执行（精确总数 + 第一页 20 条）
+    """
+    engine = create_engine("sqlite://")
+    load_dataset(engine, rows, seed)
+    rng = random.Random(seed)
+    query_config = QueryConfigFactory.get_config("server")
+    results = []
+    with Session(engine) as db:
+        service = ServerService(db)
+        sample = db.query(Server).offset(rng.randrange(rows)).limit(1).one()
+        cases = []
+        for proposal in proposals:
+            if proposal.paths:
+                _, path = max(proposal.paths, key=lambda item: item[0])
+                conditions = [_sample_condition(field, operator, sample, query_config) for field, operator in path]
+                request = ServerQueryRequest(query=QueryGroup(operator="AND", conditions=conditions),
+                                             pagination={"page": 1, "page_size": 20})
+                label = " AND ".join(f"{c.field} {c.operator}" for c in conditions)
+                cases.append((proposal, label, lambda request=request: service.get_servers(request)))
+            else:
+                statement = select(Server.id).where(*[getattr(Server, column) == getattr(sample, column)
+                                                      for column in proposal.columns]).limit(1)
+                label = " AND ".join(f"{column} =" for column in proposal.columns)
+                cases.append((proposal, label, lambda statement=statement: db.execute(statement).all()))
+
+        before = {proposal.name: _time_it(run, repeat) for proposal, _, run in cases}
+        for proposal in proposals:
+            Index(proposal.name, *[Server.__table__.c[column] for column in proposal.columns]).create(engine)
+        db.execute(text("ANALYZE"))
+        for proposal, label, run in cases:
+            after = _time_it(run, repeat)
+            results.append({
+                "index": proposal.name,
+                "query": label,
+                "before_ms": round(before[proposal.name], 3),
+                "after_ms": round(after, 3),
+                "speedup": round(before[proposal.name] / after, 1) if after else None,
+            })
+        results.append({"rows": db.execute(select(func.count()).select_from(Server)).scalar()})
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="根据查询配置与使用统计生成索引建议")
+    parser.add_argument("--usage", help="查询形态使用统计文件（/api/server/query/stats 的输出）")
+    parser.add_argument("--min-share", type=float, default=0.01, help="候选索引覆盖的查询次数占比下限")
+    parser.add_argument("--limit", type=int, default=10, help="每张表最多建议的索引数量")
+    parser.add_argument("--migration-dir", help="Flask-Migrate 迁移脚本目录（如 migrations/versions），指定后生成迁移脚本")
+    parser.add_argument("--database-url", help="线上数据库连接地址，指定后跳过其中已存在的索引")
+    parser.add_argument("--report-rows", type=int, default=0, help="合成数据集行数，大于 0 时输出建索引前后的耗时对比")
+    parser.add_argument("--repeat", type=int, default=5, help="每个查询的执行次数")
+    parser.add_argument("--json", action="store_true", help="以 JSON 格式输出")
+    args = parser.parse_args(argv)
+
+    # 已有迁移脚本与线上数据库中的索引不再重复建议
+    known_indexes = migration_indexes(args.migration_dir)
+    for table, indexes in database_indexes(args.database_url).items():
+        known_indexes.setdefault(table, []).extend(indexes)
+    proposals = propose_indexes(load_usage(args.usage), args.min_share, args.limit, known_indexes)
+    output = {"proposals": [proposal.to_dict() for proposal in proposals]}
+    if args.migration_dir and proposals:
+        output["migration"] = write_migration(proposals, args.migration_dir)
+    if args.report_rows > 0 and proposals:
+        output["report"] = benchmark(proposals, args.report_rows, args.repeat)
+
+    if args.json:
+        print(json.dumps(output, ensure_ascii=False, indent=2))
+        return
+    print("索引建议：")
+    print("-" * 80)
+    for proposal in proposals:
+        print(f"{proposal.name:<48} ({', '.join(proposal.columns)})")
+        for reason in proposal.reasons:
+            print(f"    - {reason}")
+    if "migration" in output:
+        print("-" * 80)
+        print(f"迁移脚本: {output['migration']}")
+    if "report" in output:
+        print("-" * 80)
+        print(f"合成数据集效果对比（{output['report'][-1]['rows']} 行, 中位数耗时）：")
+        print(f"{'索引':<40}{'查询':<40}{'建索引前(ms)':>14}{'建索引后(ms)':>14}{'提升':>8}")
+        for item in output["report"][:-1]:
+            print(f"{item['index']:<40}{item['query'][:38]:<40}{item['before_ms']:>14}{item['after_ms']:>14}"
+                  f"{str(item['speedup']) + 'x':>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""
+全量重建服务器 IP 索引
+首次启用 IP_INDEX_ENABLED 前执行一次（表不存在时自动创建），之后由 ServerService 写操作增量维护
+
+用法:
+    python src/scripts/rebuild_ip_index.py --batch-size 1000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from init.database import Base, SessionLocal, engine
+from models.server_ip import ServerIp
+from services.ip_index import SERVER_IP_INDEX
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="全量重建服务器 IP 索引")
+    parser.add_argument("--batch-size", type=int, default=1000, help="每批读取/写入的行数")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(engine, tables=[ServerIp.__table__])
+    start = time.perf_counter()
+    db = SessionLocal()
+    try:
+        rows = SERVER_IP_INDEX.rebuild(db, args.batch_size)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    print(f"已索引字段: {', '.join(SERVER_IP_INDEX.fields)}")
+    print(f"写入 {rows} 行，耗时 {time.perf_counter() - start:.1f} 秒")
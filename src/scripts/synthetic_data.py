@@ -0,0 +1,195 @@
+"""
+合成 CMDB 数据集
+按接近生产环境的取值分布生成 Server / NetworkSegment 数据，供索引建议、基准测试等工具使用
+
+用法:
+    python src/scripts/synthetic_data.py --rows 100000 --url sqlite:///cmdb_synthetic.db
+"""
+import argparse
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, insert
+
+from init.database import Base
+from models.network_segment import NetworkSegment
+from models.server import Server
+
+ROLES = ["web", "app", "db", "cache", "mq", "batch", "k8s-node", "gpu", "storage", "proxy"]
+ROLE_WEIGHTS = [25, 25, 8, 8, 4, 6, 15, 3, 3, 3]
+DATACENTERS = ["bj1", "bj2", "sh1", "gz1", "hk1"]
+BUSINESS_LINES = [f"bu-{i:02d}" for i in range(30)]
+WORDS = ["primary", "backup", "online", "offline", "legacy", "migrated", "cluster", "node", "shard", "replica",
+         "frontend", "backend", "payment", "search", "recommend", "logging", "monitor", "gateway", "ssd", "hdd"]
+BIOS_VERSIONS = ["1.2.3", "1.4.0", "2.0.1", "2.1.7", "U30 v2.42", "P89 v1.80"]
+RAID_VERSIONS = ["24.21.0-0067", "25.5.8-0001", "51.13.0-3624", "4.680.00-8527"]
+KERNELS = ["3.10.0-1160.el7.x86_64", "4.18.0-348.el8.x86_64", "5.10.0-136.el9.x86_64", "5.15.0-91-generic"]
+AGENT_VERSIONS = ["1.8.2", "1.9.0", "2.0.3", "2.1.0"]
+
+
+def _weighted(rng: random.Random, values: List, weights: List):
+    return rng.choices(values, weights=weights, k=1)[0]
+
+
+def _zipf_index(rng: random.Random, size: int, skew: float = 1.2) -> int:
+    """近似 Zipf 分布的下标，少数取值占大多数行"""
+    return min(size - 1, int(size * (rng.random() ** (skew * 2))))
+
+
+def generate_network_segments(count: int, seed: int = 42) -> List[Dict]:
+    """
+    生成网络段数据
+
+    Args:
+        count: 网络段数量
+        seed: 随机种子
+
+    Returns:
+        list: 网络段字典列表（键为列名）
+    """
+    rng = random.Random(seed)
+    now = datetime(2024, 1, 1)
+    segments = []
+    for i in range(1, count + 1):
+        second, third = divmod(i, 256)
+        segments.append({
+            "id": i,
+            "name": f"{DATACENTERS[i % len(DATACENTERS)]}-vlan{100 + i}",
+            "network": f"10.{second}.{third}.0/24",
+            "gateway": f"10.{second}.{third}.1",
+            "dns": "10.0.0.53,10.0.1.53",
+            "description": f"{rng.choice(WORDS)} segment",
+            "created_by": "system",
+            "created_date": now,
+            "last_modified_by": "system",
+            "last_modified_date": now,
+            "is_valid": True,
+        })
+    return segments
+
+
+def generate_servers(count: int, segment_count: int, seed: int = 42, start_id: int = 1) -> Iterator[Dict]:
+    """
+    生成服务器数据
+
+    Args:
+        count: 服务器数量
+        segment_count: 网络段数量（network_segment_id 取值范围）
+        seed: 随机种子
+        start_id: 起始ID
+
+    Returns:
+        Iterator[dict]: 服务器字典（键为列名）
+    """
+    rng = random.Random(seed)
+    epoch = datetime(2021, 1, 1)
+    physical_ids = []
+    for server_id in range(start_id, start_id + count):
+        role = _weighted(rng, ROLES, ROLE_WEIGHTS)
+        dc = DATACENTERS[_zipf_index(rng, len(DATACENTERS), 0.6)]
+        segment_id = _zipf_index(rng, segment_count, 0.8) + 1
+        second, third = divmod(segment_id, 256)
+        primary_ip = f"10.{second}.{third}.{rng.randint(2, 254)}"
+        name = f"{role}-{dc}-{server_id:06d}"
+        is_vm = 1 if physical_ids and rng.random() < 0.4 else 0
+        if not is_vm:
+            physical_ids.append(server_id)
+        created = epoch + timedelta(minutes=rng.randint(0, 3 * 365 * 24 * 60))
+        modified = created + timedelta(minutes=rng.randint(0, 180 * 24 * 60))
+        other_ip = ",".join(f"192.168.{rng.randint(0, 255)}.{rng.randint(1, 254)}"
+                            for _ in range(rng.choice([0, 0, 0, 1, 2, 3])))
+        yield {
+            "id": server_id,
+            "service_tag": f"SN{server_id:08d}{rng.randint(0, 0xFFFF):04X}",
+            "name": name,
+            "agent_name": name if rng.random() < 0.95 else f"localhost-{server_id}",
+            "primary_ip": primary_ip,
+            "agent_ip": primary_ip if rng.random() < 0.9 else f"10.{second}.{third}.{rng.randint(2, 254)}",
+            "other_ip": other_ip,
+            "port": "" if not is_vm else str(rng.choice([22, 2222, 8080, 30022])),
+            "manage_card_ip": "" if is_vm else f"172.16.{rng.randint(0, 255)}.{rng.randint(1, 254)}",
+            "manage_card_mac": "" if is_vm else ":".join(f"{rng.randint(0, 255):02x}" for _ in range(6)),
+            "manage_card_version": "" if is_vm else rng.choice(["iDRAC 4.40", "iLO 5 2.72", "BMC 3.10"]),
+            "bios_version": rng.choice(BIOS_VERSIONS),
+            "raid_fw_version": "" if is_vm else rng.choice(RAID_VERSIONS),
+            "agent_version": _weighted(rng, AGENT_VERSIONS, [5, 15, 30, 50]),
+            "agent_kernel": rng.choice(KERNELS),
+            "use_status": _weighted(rng, ["ready", "in_use", "maintenance"], [10, 82, 8]),
+            "service_level": _weighted(rng, [0, 1, 2, 3], [40, 30, 20, 10]),
+            "is_installing": 1 if rng.random() < 0.01 else 0,
+            "install_status": _weighted(rng, ["uninstall", "installing", "installed", "failed"], [8, 1, 89, 2]),
+            "lock_status": "locked" if rng.random() < 0.05 else "unlocked",
+            "due_date": created + timedelta(days=rng.choice([365, 730, 1095, 1825])),
+            "using_date": created,
+            "is_vm": is_vm,
+            "real_server_id": rng.choice(physical_ids[-1000:]) if is_vm else 0,
+            "vm_type": rng.choice(["kvm", "vmware", "docker"]) if is_vm else "undefined",
+            "vm_network_type": rng.choice(["bridge", "nat", "host"]) if is_vm else "undefined",
+            "instance_name": f"i-{rng.randint(0, 16 ** 8):08x}" if is_vm else "",
+            "cpu_amount": 1 if is_vm else rng.choice([1, 2, 2, 2, 4]),
+            "cpu_cores": rng.choice([2, 4, 8]) if is_vm else rng.choice([16, 32, 48, 64, 96, 128]),
+            "cpu_kernel_number": float(rng.choice([4, 8, 16] if is_vm else [32, 64, 96, 128, 192, 256])),
+            "ram_amount": 1 if is_vm else rng.choice([4, 8, 12, 16, 24]),
+            "ram_size": float(rng.choice([4, 8, 16, 32] if is_vm else [128, 256, 384, 512, 768, 1024])),
+            "nic_amount": 1 if is_vm else rng.choice([2, 4]),
+            "storage_amount": 1 if is_vm else rng.choice([2, 4, 8, 12, 24]),
+            "storage_info": "virtio" if is_vm else rng.choice(["2*480G SSD", "2*960G SSD+4*4T HDD", "12*8T HDD",
+                                                                 "4*3.84T NVMe", "2*480G SSD+10*16T HDD"]),
+            "filesystem_disk_space": rng.choice([50, 100, 200]) if is_vm else rng.choice([480, 960, 3840, 96000]),
+            "device_id": server_id,
+            "group_id": _zipf_index(rng, 200) + 1,
+            "agent_os_id": rng.randint(1, 12),
+            "template_id": rng.randint(1, 20),
+            "image_id": rng.randint(1, 50),
+            "network_segment_id": segment_id,
+            "owner": f"user{_zipf_index(rng, 500):03d}",
+            "label": BUSINESS_LINES[_zipf_index(rng, len(BUSINESS_LINES))],
+            "description": " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 12))),
+            "created_by": "system",
+            "created_date": created,
+            "last_modified_by": "system",
+            "last_modified_date": modified,
+            "is_valid": rng.random() > 0.02,
+        }
+
+
+def load_dataset(engine, rows: int, seed: int = 42, batch_size: int = 5000) -> Dict[str, int]:
+    """
+    建表并写入合成数据
+
+    Args:
+        engine: 目标数据库引擎
+        rows: 服务器数量
+        seed: 随机种子
+        batch_size: 每批写入的行数
+
+    Returns:
+        dict: 写入的服务器与网络段数量
+    """
+    Base.metadata.create_all(engine, tables=[Server.__table__, NetworkSegment.__table__])
+    segment_count = max(10, rows // 200)
+    with engine.begin() as conn:
+        conn.execute(insert(NetworkSegment.__table__), generate_network_segments(segment_count, seed))
+        batch = []
+        for server in generate_servers(rows, segment_count, seed):
+            batch.append(server)
+            if len(batch) >= batch_size:
+                conn.execute(insert(Server.__table__), batch)
+                batch = []
+        if batch:
+            conn.execute(insert(Server.__table__), batch)
+    return {"servers": rows, "network_segments": segment_count}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="生成合成 CMDB 数据集")
+    parser.add_argument("--rows", type=int, default=10000, help="服务器数量")
+    parser.add_argument("--url", default="sqlite:///cmdb_synthetic.db", help="目标数据库连接串")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    args = parser.parse_args()
+    print(load_dataset(create_engine(args.url), args.rows, args.seed))
@@ -0,0 +1,179 @@
+import atexit
+import threading
+import time
+import traceback
+from typing import Any, Callable, Dict, Optional, Sequence
+
+from sqlalchemy.orm import Session
+
+from config import Config
+from init.database import SessionLocal
+from services.server_service import ServerService
+
+
+class BufferFull(Exception):
+    """上报缓冲区已满，调用方应稍后重试"""
+    pass
+
+
+class AgentReportBuffer:
+    """
+    Agent 上报缓冲
+    上报先写入进程内缓冲区，同一主机在写入周期内的多次上报按字段合并；后台线程每个周期
+    （或缓冲区达到一批的数量时）取出全部数据交给 ServerService.apply_agent_reports 批量写入。
+    缓冲区有容量上限，已满时上报请求阻塞等待写入，超时后拒绝（背压）。
+    autostart 为 False 时不启动后台线程，由调用方自行调用 flush()（脚本与测试）
+    """
+
+    def __init__(self, session_factory: Callable[[], Session], max_pending: int = 50000,
+                 flush_interval: float = 5.0, block_timeout: float = 1.0, flush_batch: int = 1000,
+                 autostart: bool = True):
+        self.session_factory = session_factory
+        self.max_pending = max_pending
+        self.flush_interval = flush_interval
+        self.block_timeout = block_timeout
+        self.flush_batch = flush_batch
+        self.autostart = autostart
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._not_full = threading.Condition(self._lock)
+        self._wakeup = threading.Condition(self._lock)
+        self._flush_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self._stats = {"received": 0, "merged": 0, "rejected": 0, "updated": 0, "inserted": 0, "unchanged": 0,
+                       "failed": 0, "flushes": 0, "failed_flushes": 0}
+        self._last_flush: Dict[str, Any] = {}
+
+    def submit(self, reports: Sequence[Dict[str, Any]]) -> int:
+        """
+        写入缓冲区
+
+        Args:
+            reports: 上报数据列表，每条必须包含 service_tag
+
+        Returns:
+            int: 缓冲区中等待写入的主机数
+
+        Raises:
+            BufferFull: 等待 block_timeout 秒后缓冲区仍没有足够空间
+        """
+        if self.autostart:
+            self._ensure_started()
+        with self._lock:
+            deadline = time.monotonic() + self.block_timeout
+            while True:
+                new_hosts = len({report["service_tag"] for report in reports} - self._pending.keys())
+                if len(self._pending) + new_hosts <= self.max_pending:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or new_hosts > self.max_pending:
+                    self._stats["rejected"] += len(reports)
+                    raise BufferFull(f"上报缓冲区已满（{len(self._pending)}/{self.max_pending}），请稍后重试")
+                # 提前触发写入腾出空间
+                self._wakeup.notify()
+                self._not_full.wait(remaining)
+
+            for report in reports:
+                pending = self._pending.get(report["service_tag"])
+                if pending is None:
+                    self._pending[report["service_tag"]] = dict(report)
+                else:
+                    pending.update(report)
+                    self._stats["merged"] += 1
+            self._stats["received"] += len(reports)
+            if len(self._pending) >= self.flush_batch:
+                self._wakeup.notify()
+            return len(self._pending)
+
+    def flush(self, db: Optional[Session] = None) -> Dict[str, int]:
+        """
+        立即写入缓冲区中的全部数据
+        单台主机的上报写入失败时被丢弃并计入 failed（不放回缓冲区，避免一条坏数据阻塞所有写入）；
+        整体失败（如数据库不可用）时数据放回缓冲区（缓冲区中更新的上报优先）
+
+        Args:
+            db: 数据库会话，为空时新建并在写入后关闭
+
+        Returns:
+            dict: 本次写入的 updated / inserted / unchanged 行数与丢弃的 failed 主机数
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+                self._not_full.notify_all()
+            if not batch:
+                return {"updated": 0, "inserted": 0, "unchanged": 0}
+
+            started = time.perf_counter()
+            session = db or self.session_factory()
+            try:
+                result = ServerService(session).apply_agent_reports(batch)
+            except Exception:
+                with self._lock:
+                    self._stats["failed_flushes"] += 1
+                    for tag, report in batch.items():
+                        self._pending[tag] = {**report, **self._pending.get(tag, {})}
+                raise
+            finally:
+                if db is None:
+                    session.close()
+
+            with self._lock:
+                self._stats["flushes"] += 1
+                for name, value in result.items():
+                    self._stats[name] += value
+                self._last_flush = {"hosts": len(batch), "seconds": round(time.perf_counter() - started, 4),
+                                    "at": time.time()}
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        """缓冲区状态与累计写入统计"""
+        with self._lock:
+            return {**self._stats, "pending": len(self._pending), "max_pending": self.max_pending,
+                    "running": self._thread is not None and self._thread.is_alive(), "last_flush": self._last_flush}
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="agent-report-flush", daemon=True)
+                self._thread.start()
+                atexit.register(self.stop)
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                if not self._stopping and len(self._pending) < self.flush_batch:
+                    self._wakeup.wait(self.flush_interval)
+                stopping = self._stopping
+            try:
+                self.flush()
+            except Exception as e:
+                print('ERROR flushing agent reports:', str(e))
+                print('TRACEBACK:', traceback.format_exc())
+                if not stopping:
+                    # 数据库不可用时避免立即重试
+                    time.sleep(self.flush_interval)
+            if stopping:
+                return
+
+    def stop(self) -> None:
+        """停止后台线程并写入剩余数据（进程退出时自动调用）"""
+        with self._lock:
+            self._stopping = True
+            self._wakeup.notify()
+            thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=self.flush_interval + 30)
+
+
+# 创建 Agent 上报缓冲实例
+AGENT_REPORT_BUFFER = AgentReportBuffer(
+    SessionLocal,
+    max_pending=Config.AGENT_REPORT_BUFFER_SIZE,
+    flush_interval=Config.AGENT_REPORT_FLUSH_INTERVAL,
+    block_timeout=Config.AGENT_REPORT_BLOCK_TIMEOUT,
+    flush_batch=Config.AGENT_REPORT_FLUSH_CHUNK_SIZE,
+)
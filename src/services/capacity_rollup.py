@@ -0,0 +1,250 @@
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, delete, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from config import Config
+from models.server import Server
+from models.server_capacity_rollup import ServerCapacityRollup
+
+# 汇总维度及其空值的统计口径
+ROLLUP_DIMENSIONS = ("network_segment_id", "group_id", "label", "use_status")
+DIMENSION_DEFAULTS = {"network_segment_id": 0, "group_id": 0, "label": "", "use_status": ""}
+
+# 汇总指标
+ROLLUP_MEASURES = ("cpu_cores", "cpu_kernel_number", "ram_size", "storage_amount", "filesystem_disk_space")
+DECIMAL_MEASURES = ("cpu_kernel_number", "ram_size")
+
+# 汇总值: (维度取值, 各指标取值)
+Contribution = Tuple[Tuple[Any, ...], Dict[str, Any]]
+
+
+class CapacityRollup:
+    """
+    服务器容量汇总
+    ServerService 写操作在同一事务内以增量方式更新汇总表；check() 与全量重算结果比对，可选修复
+    """
+
+    def __init__(self, model, rollup_model, enabled: bool = False):
+        self.model = model
+        self.rollup_model = rollup_model
+        self.enabled = enabled
+
+    @staticmethod
+    def contribution(obj) -> Contribution:
+        """单台服务器对汇总表的贡献（更新前调用可得到旧值）"""
+        key = tuple(DIMENSION_DEFAULTS[name] if getattr(obj, name) is None else getattr(obj, name)
+                    for name in ROLLUP_DIMENSIONS)
+        return key, {name: CapacityRollup._measure(name, getattr(obj, name)) for name in ROLLUP_MEASURES}
+
+    @staticmethod
+    def _measure(name: str, value) -> Any:
+        value = value or 0
+        return Decimal(str(value)) if name in DECIMAL_MEASURES else int(value)
+
+    def add(self, db: Session, obj) -> None:
+        """新增服务器，需在对象写入后、事务提交前调用"""
+        if not self.enabled:
+            return
+        key, measures = self.contribution(obj)
+        self._apply(db, key, measures, 1)
+
+    def add_many(self, db: Session, objs) -> None:
+        """批量新增服务器: 按分组合并后每个分组只写一次"""
+        if not self.enabled:
+            return
+        groups: Dict[Tuple[Any, ...], List[Any]] = {}
+        for obj in objs:
+            key, measures = self.contribution(obj)
+            totals = groups.setdefault(key, [dict.fromkeys(ROLLUP_MEASURES, 0), 0])
+            for name, value in measures.items():
+                totals[0][name] += value
+            totals[1] += 1
+        for key, (measures, count) in groups.items():
+            self._apply(db, key, measures, count)
+
+    def remove(self, db: Session, obj) -> None:
+        """删除服务器，需在事务提交前调用"""
+        if not self.enabled:
+            return
+        key, measures = self.contribution(obj)
+        self._apply(db, key, {name: -value for name, value in measures.items()}, -1)
+
+    def move(self, db: Session, before: Contribution, obj) -> None:
+        """
+        更新服务器: 维度不变时只写指标差值，维度变化时从旧分组减去旧值、向新分组加上新值
+
+        Args:
+            db: 数据库会话
+            before: 更新前的贡献（contribution 的返回值）
+            obj: 更新后的服务器对象
+        """
+        if not self.enabled:
+            return
+        after = self.contribution(obj)
+        if after == before:
+            return
+        (old_key, old), (new_key, new) = before, after
+        if old_key == new_key:
+            self._apply(db, new_key, {name: new[name] - old[name] for name in ROLLUP_MEASURES}, 0)
+            return
+        self._apply(db, old_key, {name: -value for name, value in old.items()}, -1)
+        self._apply(db, new_key, new, 1)
+
+    def remove_where(self, db: Session, where) -> None:
+        """
+        按条件批量删除服务器: 按分组汇总匹配行后每个分组只写一次，需在 DELETE 之前调用
+
+        Args:
+            db: 数据库会话
+            where: 匹配服务器的条件（已绑定参数值）
+        """
+        if not self.enabled:
+            return
+        for key, measures, count in self._group_totals(db, where):
+            self._apply(db, key, {name: -value for name, value in measures.items()}, -count)
+
+    def move_where(self, db: Session, where, changes: Dict[str, Any]) -> None:
+        """
+        按条件批量更新服务器: 各分组的新取值由更新前的汇总与修改的字段推算，需在 UPDATE 之前调用
+
+        Args:
+            db: 数据库会话
+            where: 匹配服务器的条件（已绑定参数值）
+            changes: 修改的字段及新值
+        """
+        if not self.enabled or not self.affected_by(changes):
+            return
+        for key, old, count in self._group_totals(db, where):
+            new_key = tuple(
+                (DIMENSION_DEFAULTS[name] if changes[name] is None else changes[name]) if name in changes else value
+                for name, value in zip(ROLLUP_DIMENSIONS, key)
+            )
+            new = {name: self._measure(name, changes[name]) * count if name in changes else old[name]
+                   for name in ROLLUP_MEASURES}
+            if new_key == key:
+                self._apply(db, key, {name: new[name] - old[name] for name in ROLLUP_MEASURES}, 0)
+            else:
+                self._apply(db, key, {name: -value for name, value in old.items()}, -count)
+                self._apply(db, new_key, new, count)
+
+    @staticmethod
+    def affected_by(changes: Dict[str, Any]) -> bool:
+        """修改的字段是否涉及汇总维度或指标"""
+        return any(name in changes for name in ROLLUP_DIMENSIONS + ROLLUP_MEASURES)
+
+    def _group_totals(self, db: Session, where) -> List[Tuple[Tuple[Any, ...], Dict[str, Any], int]]:
+        """匹配条件的服务器按汇总维度分组的数量与指标合计"""
+        table = self.model.__table__
+        dimensions = [func.coalesce(table.c[name], DIMENSION_DEFAULTS[name]) for name in ROLLUP_DIMENSIONS]
+        statement = select(
+            *dimensions, func.count(), *[func.coalesce(func.sum(table.c[name]), 0) for name in ROLLUP_MEASURES]
+        ).where(where).group_by(*dimensions)
+        totals = []
+        for row in db.execute(statement):
+            key, count, sums = tuple(row[:len(dimensions)]), row[len(dimensions)], row[len(dimensions) + 1:]
+            totals.append((key, {name: self._measure(name, value) for name, value in zip(ROLLUP_MEASURES, sums)},
+                           count))
+        return totals
+
+    def _apply(self, db: Session, key: Tuple[Any, ...], deltas: Dict[str, Any], count: int) -> None:
+        """对单个分组累加差值，分组不存在时插入；服务器数量减为 0 的分组删除"""
+        table = self.rollup_model.__table__
+        where = and_(*[table.c[name] == value for name, value in zip(ROLLUP_DIMENSIONS, key)])
+        changes = {name: table.c[name] + value for name, value in deltas.items()}
+        changes.update(server_count=table.c.server_count + count, last_modified_date=datetime.now())
+        statement = update(table).where(where).values(**changes)
+
+        if db.execute(statement).rowcount == 0:
+            try:
+                with db.begin_nested():
+                    db.execute(insert(table).values(**dict(zip(ROLLUP_DIMENSIONS, key)), **deltas,
+                                                    server_count=count, last_modified_date=datetime.now()))
+            except IntegrityError:
+                # 并发事务已插入该分组
+                db.execute(statement)
+        if count < 0:
+            db.execute(delete(table).where(where, table.c.server_count <= 0))
+
+    def summary(self, db: Session, group_by: Sequence[str], filters: Optional[Dict[str, Any]] = None,
+                source: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        按维度汇总容量
+
+        Args:
+            db: 数据库会话
+            group_by: 分组维度（ROLLUP_DIMENSIONS 的子集，可为空表示总计）
+            filters: 维度等值过滤条件
+            source: 数据来源 rollup（汇总表）或 server（服务器表实时计算），默认启用汇总时使用汇总表
+
+        Returns:
+            list: 每个分组的维度取值、服务器数量与各指标合计
+
+        Raises:
+            ValueError: 维度不合法时抛出
+        """
+        filters = filters or {}
+        for name in list(group_by) + list(filters):
+            if name not in ROLLUP_DIMENSIONS:
+                raise ValueError(f"不支持的汇总维度: {name}，可选: {', '.join(ROLLUP_DIMENSIONS)}")
+        source = source or ("rollup" if self.enabled else "server")
+
+        if source == "rollup":
+            table = self.rollup_model.__table__
+            dimensions = {name: table.c[name] for name in ROLLUP_DIMENSIONS}
+            server_count = func.coalesce(func.sum(table.c.server_count), 0)
+        else:
+            table = self.model.__table__
+            dimensions = {name: func.coalesce(table.c[name], DIMENSION_DEFAULTS[name]) for name in ROLLUP_DIMENSIONS}
+            server_count = func.count()
+
+        columns = [dimensions[name] for name in group_by]
+        statement = select(
+            *[column.label(name) for name, column in zip(group_by, columns)],
+            server_count.label("server_count"),
+            *[func.coalesce(func.sum(table.c[name]), 0).label(name) for name in ROLLUP_MEASURES],
+        ).where(*[dimensions[name] == value for name, value in filters.items()])
+        if columns:
+            statement = statement.group_by(*columns).order_by(*columns)
+        return [dict(row._mapping) for row in db.execute(statement)]
+
+    def check(self, db: Session, repair: bool = False) -> List[Dict[str, Any]]:
+        """
+        与服务器表全量重算的结果比对
+
+        Args:
+            db: 数据库会话
+            repair: 存在差异时用重算结果重写汇总表（不提交事务）
+
+        Returns:
+            list: 有差异的分组 [{"key": 维度取值, "expected": 重算结果, "actual": 汇总表结果}, ...]
+        """
+        def by_key(rows):
+            return {tuple(row[name] for name in ROLLUP_DIMENSIONS): row for row in rows}
+
+        def normalize(row):
+            return {name: Decimal(str(row[name])) for name in ("server_count",) + ROLLUP_MEASURES} if row else None
+
+        expected = by_key(self.summary(db, ROLLUP_DIMENSIONS, source="server"))
+        actual = by_key(self.summary(db, ROLLUP_DIMENSIONS, source="rollup"))
+        differences = []
+        for key in sorted(set(expected) | set(actual), key=str):
+            if normalize(expected.get(key)) != normalize(actual.get(key)):
+                differences.append({"key": dict(zip(ROLLUP_DIMENSIONS, key)),
+                                    "expected": normalize(expected.get(key)), "actual": normalize(actual.get(key))})
+
+        if repair and differences:
+            table = self.rollup_model.__table__
+            db.execute(delete(table))
+            now = datetime.now()
+            rows = [{**row, "last_modified_date": now} for row in expected.values()]
+            if rows:
+                db.execute(insert(table), rows)
+        return differences
+
+
+# 创建服务器容量汇总实例
+SERVER_CAPACITY_ROLLUP = CapacityRollup(Server, ServerCapacityRollup, enabled=Config.CAPACITY_ROLLUP_ENABLED)
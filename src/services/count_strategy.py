@@ -0,0 +1,172 @@
+import json
+import logging
+import random
+from abc import ABC, abstractmethod
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import Query, Session
+
+from config import Config
+from init.metrics import register_cache
+from init.routing import use_primary
+from models.server import Server
+from services.result_cache import ResultCache
+
+logger = logging.getLogger(__name__)
+
+# 缓存的精确总数，ServerService 写操作后失效
+COUNT_CACHE = ResultCache("count", ttl=Config.COUNT_CACHE_TTL, max_size=Config.COUNT_CACHE_SIZE)
+register_cache(COUNT_CACHE.name, COUNT_CACHE.stats)
+
+
+class CountStrategy(ABC):
+    """
+    总数统计策略
+    count() 返回 (总数, 实际使用的统计方式)，总数为 None 表示未统计
+    """
+    name = ""
+
+    @abstractmethod
+    def count(self, db: Session, db_query: Query, count_key: Optional[str]) -> Tuple[Optional[int], str]:
+        """
+        统计过滤后的总数
+
+        Args:
+            db: 数据库会话
+            db_query: 已应用过滤条件（及绑定参数）的查询
+            count_key: 规范化的过滤条件，无过滤条件时为 None
+
+        Returns:
+            tuple: (总数, 实际使用的统计方式)
+        """
+
+
+class ExactCount(CountStrategy):
+    """精确统计: SELECT COUNT(*) FROM (过滤后的查询)"""
+    name = "exact"
+
+    def count(self, db, db_query, count_key):
+        return db_query.count(), self.name
+
+
+class NoCount(CountStrategy):
+    """不统计总数"""
+    name = "none"
+
+    def count(self, db, db_query, count_key):
+        return None, self.name
+
+
+class EstimateCount(CountStrategy):
+    """
+    估算总数
+    无过滤条件时读取数据库统计信息（PostgreSQL pg_class / MySQL information_schema）；
+    有过滤条件时 PostgreSQL 使用执行计划的行数估算，其他数据库对一段连续主键区间抽样后按比例估算；
+    数据量小于抽样大小时直接精确统计
+    """
+    name = "estimate"
+
+    def __init__(self, sample_size: int = 10000):
+        self.sample_size = sample_size
+
+    def count(self, db, db_query, count_key):
+        dialect = db.get_bind().dialect.name
+        table_rows = self._table_rows(db, dialect)
+        if table_rows is None or table_rows <= self.sample_size:
+            return db_query.count(), ExactCount.name
+        if count_key is None:
+            return table_rows, self.name
+
+        if dialect == "postgresql":
+            planned = self._planner_rows(db, db_query)
+            if planned is not None:
+                return planned, self.name
+        return self._sampled(db, db_query, table_rows), self.name
+
+    def _table_rows(self, db: Session, dialect: str) -> Optional[int]:
+        """读取表行数统计信息，不支持的数据库返回主键跨度作为上限估计"""
+        table = Server.__tablename__
+        try:
+            if dialect == "postgresql":
+                rows = db.execute(text("SELECT reltuples::bigint FROM pg_class WHERE relname = :t"), {"t": table}).scalar()
+                if rows is not None and rows >= 0:
+                    return int(rows)
+            elif dialect == "mysql":
+                rows = db.execute(text(
+                    "SELECT table_rows FROM information_schema.tables "
+                    "WHERE table_schema = DATABASE() AND table_name = :t"), {"t": table}).scalar()
+                if rows is not None:
+                    return int(rows)
+        except Exception as e:
+            logger.warning(f"读取表统计信息失败: {e}")
+        low, high = db.execute(select(func.min(Server.id), func.max(Server.id))).one()
+        return 0 if low is None else int(high - low + 1)
+
+    def _planner_rows(self, db: Session, db_query: Query) -> Optional[int]:
+        """读取 PostgreSQL 执行计划中的行数估算"""
+        try:
+            # Query.statement 已带上 Query.params() 绑定的参数
+            compiled = db_query.statement.compile(dialect=db.get_bind().dialect,
+                                                  compile_kwargs={"render_postcompile": True})
+            plan = db.connection().exec_driver_sql("EXPLAIN (FORMAT JSON) " + compiled.string, compiled.params).scalar()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return int(plan[0]["Plan"]["Plan Rows"])
+        except Exception as e:
+            logger.warning(f"读取执行计划估算失败: {e}")
+            return None
+
+    def _sampled(self, db: Session, db_query: Query, table_rows: int) -> int:
+        """从随机起点取一段连续主键作为样本，按样本命中率估算总数"""
+        low, high = db.execute(select(func.min(Server.id), func.max(Server.id))).one()
+        start = random.randint(low, max(low, high - self.sample_size))
+        sample_ids = select(Server.id).where(Server.id >= start).order_by(Server.id).limit(self.sample_size).subquery()
+        sample_rows = db.execute(select(func.count()).select_from(sample_ids)).scalar()
+        if not sample_rows:
+            return 0
+        matched = db_query.filter(Server.id.in_(select(sample_ids.c.id))).count()
+        return int(round(matched * table_rows / sample_rows))
+
+
+class CachedCount(CountStrategy):
+    """
+    按规范化过滤条件缓存精确总数，ServerService 写操作后失效；
+    失效后 CONSISTENCY_WINDOW 秒内从主库重新统计，避免把从库上的旧总数写回缓存
+    """
+    name = "cached"
+
+    def __init__(self, cache: ResultCache):
+        self.cache = cache
+
+    def count(self, db, db_query, count_key):
+        key = count_key or ""
+        total = self.cache.get(key)
+        if total is not None:
+            return total, self.name
+        generation = self.cache.generation
+        with use_primary(db, self.cache.recently_invalidated(Config.CONSISTENCY_WINDOW)):
+            total = db_query.count()
+        self.cache.set(key, total, generation)
+        return total, ExactCount.name
+
+
+COUNT_STRATEGIES: Dict[str, CountStrategy] = {}
+
+
+def register_count_strategy(strategy: CountStrategy) -> None:
+    """注册总数统计策略"""
+    COUNT_STRATEGIES[strategy.name] = strategy
+
+
+def get_count_strategy(name: str) -> CountStrategy:
+    """获取总数统计策略"""
+    if name not in COUNT_STRATEGIES:
+        raise ValueError(f"不支持的总数统计方式: {name}")
+    return COUNT_STRATEGIES[name]
+
+
+register_count_strategy(ExactCount())
+register_count_strategy(NoCount())
+register_count_strategy(EstimateCount(sample_size=Config.COUNT_ESTIMATE_SAMPLE_SIZE))
+register_count_strategy(CachedCount(COUNT_CACHE))
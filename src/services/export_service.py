@@ -0,0 +1,122 @@
+import csv
+import io
+from datetime import datetime
+from decimal import Decimal
+from typing import Iterator, List, Optional, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from init.slow_query_log import bind_query, unbind_query
+from models.server import Server
+from schemas.query import QueryGroup, SortField
+from services.keyset import order_by_clauses, resolve_sort
+from services.query_compiler import SERVER_QUERY_COMPILER
+from services.serializer import SERVER_SERIALIZER, dumps
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _export_value(value):
+    """转换为可导出的基础类型，与接口返回的 JSON 保持一致"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+class ExportService:
+    """
+    服务器流式导出
+    通过服务端游标按批读取数据（yield_per），逐批编码为 NDJSON 或 CSV，内存占用与总行数无关
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.columns: List[str] = SERVER_SERIALIZER.columns
+
+    def prepare(self, query: QueryGroup, sort: Optional[Sequence[SortField]] = None):
+        """
+        编译查询语句，在开始输出前暴露查询条件错误
+
+        Returns:
+            tuple: (查询语句, 绑定参数, 查询形态)
+
+        Raises:
+            ValueError: 查询条件不合法时抛出
+        """
+        table = Server.__table__
+        statement = select(*[table.c[name] for name in self.columns])
+        plan, params = SERVER_QUERY_COMPILER.compile(query)
+        if plan.clause is not None:
+            statement = statement.where(plan.clause)
+        if sort:
+            statement = statement.order_by(*order_by_clauses(Server, resolve_sort(Server, sort)))
+        return statement, params, plan.shape
+
+    def iter_batches(self, statement, params: dict, batch_size: int) -> Iterator[list]:
+        """按批读取查询结果"""
+        result = self.db.execute(
+            statement, params,
+            execution_options={"stream_results": True, "yield_per": batch_size}
+        )
+        try:
+            for partition in result.partitions():
+                yield partition
+        finally:
+            result.close()
+
+    def export(self, query: QueryGroup, fmt: str = "ndjson", sort: Optional[Sequence[SortField]] = None,
+               batch_size: int = 1000) -> Iterator[str]:
+        """
+        导出服务器数据
+
+        Args:
+            query: 查询条件
+            fmt: 导出格式 ndjson/csv
+            sort: 排序字段列表
+            batch_size: 每批读取的行数
+
+        Returns:
+            Iterator[str]: 每批数据编码后的文本块
+        """
+        statement, params, shape = self.prepare(query, sort)
+        batches = self.iter_batches(statement, params, batch_size)
+        chunks = self._csv_chunks(batches) if fmt == "csv" else self._ndjson_chunks(batches)
+        return self._bound(chunks, query, shape)
+
+    @staticmethod
+    def _bound(chunks: Iterator[str], query: QueryGroup, shape) -> Iterator[str]:
+        """
+        导出语句在响应流中逐块执行: 每读取一块期间标记当前查询，慢 SQL 记录本次导出的查询条件
+        （只在 next() 期间标记，不跨越 yield，避免标记泄漏到输出之间执行的其他代码）
+        """
+        while True:
+            query_token = bind_query(query, shape)
+            try:
+                chunk = next(chunks, None)
+            finally:
+                unbind_query(query_token)
+            if chunk is None:
+                return
+            yield chunk
+
+    def _ndjson_chunks(self, batches) -> Iterator[str]:
+        # 查询列与 SERVER_SERIALIZER 的默认输出列一致，逐行按列编码后直接输出 JSON
+        for rows in batches:
+            yield "".join(dumps(item).decode() + "\n" for item in SERVER_SERIALIZER.from_rows(rows))
+
+    def _csv_chunks(self, batches) -> Iterator[str]:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(self.columns)
+        yield buffer.getvalue()
+        for rows in batches:
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows([_export_value(value) for value in row] for row in rows)
+            yield buffer.getvalue()
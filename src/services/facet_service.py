@@ -0,0 +1,141 @@
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import Boolean, DateTime, Integer, Numeric, String, Text, cast, func, literal, select, union_all
+from sqlalchemy.orm import Session
+
+from config import Config
+from init.metrics import register_cache
+from init.routing import replica_read, use_primary
+from init.slow_query_log import bind_query, unbind_query
+from init.timing import incr
+from models.server import Server
+from schemas.query import QueryGroup, SERVER_QUERY_CONFIG
+from services.query_compiler import SERVER_QUERY_COMPILER
+from services.result_cache import ResultCache
+
+# 分面统计结果缓存，ServerService 写操作后失效
+FACET_CACHE = ResultCache("facet", ttl=Config.FACET_CACHE_TTL, max_size=Config.FACET_CACHE_SIZE)
+register_cache(FACET_CACHE.name, FACET_CACHE.stats)
+
+
+def _restore(column, value):
+    """UNION ALL 中统一转换为字符串的取值还原为列的类型"""
+    if value is None or isinstance(column.type, String):
+        return value
+    if isinstance(column.type, Boolean):
+        return str(value).lower() in ("1", "true", "t")
+    if isinstance(column.type, Integer):
+        return int(value)
+    if isinstance(column.type, Numeric):
+        return Decimal(str(value))
+    return value
+
+
+class FacetService:
+    """
+    分面统计
+    一次请求返回多个字段在过滤结果上的取值分布: PostgreSQL 使用 GROUPING SETS 单次扫描完成，
+    其他数据库对只包含所需列的过滤结果 CTE 做 UNION ALL 分组
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    @staticmethod
+    def resolve_fields(fields: Sequence[str]) -> List[str]:
+        """
+        校验分面字段（去重并保持顺序）
+
+        Raises:
+            ValueError: 字段不在 ServerQueryConfig 中或不适合分面统计（长文本、时间）时抛出
+        """
+        if not fields:
+            raise ValueError("至少需要一个分面字段")
+        for name in fields:
+            SERVER_QUERY_CONFIG.get_field(name)
+            column_type = Server.__table__.c[name].type
+            if isinstance(column_type, (Text, DateTime)):
+                raise ValueError(f"字段 {name} 不支持分面统计")
+        return list(dict.fromkeys(fields))
+
+    @replica_read
+    def get_facets(self, query: Optional[QueryGroup], fields: Sequence[str],
+                   limit: Optional[int] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        获取分面统计
+
+        Args:
+            query: 查询条件，为空时统计全部服务器
+            fields: 分面字段列表
+            limit: 每个字段最多返回的取值个数（按数量降序）
+
+        Returns:
+            dict: {字段名: [{"value": 取值, "count": 数量}, ...]}
+
+        Raises:
+            ValueError: 查询条件或分面字段不合法时抛出
+        """
+        fields = self.resolve_fields(fields)
+        clause, params, filter_key, shape = None, {}, "", None
+        if query is not None:
+            plan, params = SERVER_QUERY_COMPILER.compile(query)
+            clause, filter_key, shape = plan.clause, plan.key(params), plan.shape
+
+        cache_key = (filter_key, tuple(fields), limit)
+        cached = FACET_CACHE.get(cache_key)
+        if cached is not None:
+            return cached
+        generation = FACET_CACHE.generation
+
+        if self.db.get_bind().dialect.name == "postgresql":
+            rows = self._grouping_sets(fields, clause, params)
+        else:
+            rows = self._union_all(fields, clause, params)
+
+        facets: Dict[str, List[Dict[str, Any]]] = {name: [] for name in fields}
+        # 分组查询的慢 SQL 记录本次查询条件；缓存刚失效时从主库读取，避免把从库上的旧结果写回缓存
+        query_token = bind_query(query, shape) if query is not None else None
+        try:
+            with use_primary(self.db, FACET_CACHE.recently_invalidated(Config.CONSISTENCY_WINDOW)):
+                for name, value, count in rows:
+                    facets[name].append({"value": value, "count": count})
+        finally:
+            unbind_query(query_token)
+        incr("rows", sum(len(buckets) for buckets in facets.values()))
+        for name, buckets in facets.items():
+            buckets.sort(key=lambda bucket: (-bucket["count"], str(bucket["value"])))
+            if limit:
+                del buckets[limit:]
+
+        FACET_CACHE.set(cache_key, facets, generation)
+        return facets
+
+    def _grouping_sets(self, fields: List[str], clause, params):
+        """GROUPING SETS: 一次扫描得到所有字段的分组计数，GROUPING() 标识每行所属的字段"""
+        columns = [Server.__table__.c[name] for name in fields]
+        statement = select(*columns, *[func.grouping(column) for column in columns], func.count())
+        if clause is not None:
+            statement = statement.where(clause)
+        statement = statement.group_by(func.grouping_sets(*columns))
+        for row in self.db.execute(statement, params):
+            for i, name in enumerate(fields):
+                if row[len(fields) + i] == 0:
+                    yield name, row[i], row[-1]
+                    break
+
+    def _union_all(self, fields: List[str], clause, params):
+        """过滤结果 CTE（只包含分面列）上逐字段分组，UNION ALL 合并为一次查询"""
+        table = Server.__table__
+        filtered = select(*[table.c[name] for name in fields])
+        if clause is not None:
+            filtered = filtered.where(clause)
+        filtered = filtered.cte("filtered")
+        branches = [
+            select(literal(name).label("field"), cast(filtered.c[name], String).label("value"), func.count())
+            .group_by(filtered.c[name])
+            for name in fields
+        ]
+        statement = branches[0] if len(branches) == 1 else union_all(*branches)
+        for name, value, count in self.db.execute(statement, params):
+            yield name, _restore(table.c[name], value), count
@@ -0,0 +1,482 @@
+import asyncio
+import logging
+import re
+import threading
+import time
+import weakref
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from sqlalchemy import Boolean, DateTime, Integer, Numeric, String, func, select
+from sqlalchemy.orm import Session
+from sqlalchemy.util.concurrency import await_only, in_greenlet
+
+from config import Config
+from init.metrics import register_cache
+from init.routing import use_primary
+from models.server import Server
+from schemas.query import QueryCondition, QueryGroup
+
+try:
+    import numpy as np
+except ImportError:  # numpy 为可选依赖，未安装时快照不可用，查询全部走 SQL
+    np = None
+
+try:
+    import greenlet
+except ImportError:  # 未安装 greenlet 时不会以异步模式运行
+    greenlet = None
+
+logger = logging.getLogger(__name__)
+
+
+class Unsupported(Exception):
+    """快照无法（或无法保证与数据库一致地）回答的查询，回退到 SQL"""
+
+
+class _Column:
+    """
+    单列存储
+    数值/时间/布尔列保存为定长数组，字符串列按字典编码（codes 为字典下标）；null 记录空值
+    """
+
+    def __init__(self, name: str, column_type):
+        self.name = name
+        self.scale = None
+        if isinstance(column_type, String):
+            self.kind = "str"
+        elif isinstance(column_type, Boolean):
+            self.kind = "bool"
+        elif isinstance(column_type, DateTime):
+            self.kind = "dt"
+        elif isinstance(column_type, Numeric) and not isinstance(column_type, Integer):
+            self.kind = "num"
+            self.scale = column_type.scale
+        elif isinstance(column_type, Integer):
+            self.kind = "int"
+        else:
+            raise TypeError(f"不支持的列类型: {name} {column_type}")
+        self.values = None
+        self.null = None
+        # 字符串列的字典
+        self.dictionary: List[str] = []
+        self.code_of: Dict[str, int] = {}
+        self.ascii = True
+        self._array = None
+        self._ranks = None
+
+    def encode(self, raw: List[Any]) -> Tuple["np.ndarray", "np.ndarray"]:
+        """将一批 Python 值编码为 (取值数组, 空值数组)"""
+        null = np.fromiter((value is None for value in raw), dtype=bool, count=len(raw))
+        if self.kind == "str":
+            codes = np.empty(len(raw), dtype=np.int32)
+            for i, value in enumerate(raw):
+                if value is None:
+                    codes[i] = -1
+                    continue
+                code = self.code_of.get(value)
+                if code is None:
+                    code = self.code_of[value] = len(self.dictionary)
+                    self.dictionary.append(value)
+                    self.ascii = self.ascii and value.isascii()
+                    self._array = self._ranks = None
+                codes[i] = code
+            return codes, null
+        if self.kind == "dt":
+            return np.array([value if value is not None else "NaT" for value in raw], dtype="datetime64[us]"), null
+        if self.kind == "num":
+            return np.array([float(value) if value is not None else np.nan for value in raw], dtype=np.float64), null
+        if self.kind == "bool":
+            return np.array([bool(value) for value in raw], dtype=bool), null
+        return np.array([int(value) if value is not None else 0 for value in raw], dtype=np.int64), null
+
+    def decode(self, position: int) -> Any:
+        """读取单个位置的 Python 值（与从数据库读取的类型一致）"""
+        if self.null[position]:
+            return None
+        value = self.values[position]
+        if self.kind == "str":
+            return self.dictionary[value]
+        if self.kind == "dt":
+            return value.astype(datetime)
+        if self.kind == "num":
+            return Decimal(repr(float(value))).quantize(Decimal(1).scaleb(-(self.scale or 0)))
+        if self.kind == "bool":
+            return bool(value)
+        return int(value)
+
+    def dictionary_array(self) -> "np.ndarray":
+        """字典的定长字符串数组（用于向量化的 like 匹配）"""
+        if self._array is None:
+            self._array = np.array(self.dictionary or [""], dtype=str)
+        return self._array
+
+    def nbytes(self) -> int:
+        size = self.values.nbytes + self.null.nbytes
+        return size + sum(len(value) for value in self.dictionary)
+
+
+class InventorySnapshot:
+    """
+    内存列式快照
+    将整张表按列保存在 NumPy 数组中，直接在内存中对 QueryGroup 求布尔掩码并完成排序和分页；
+    按 last_modified_date 增量刷新，行数不一致时比对主键识别删除。
+    快照无法保证与数据库结果一致的查询（游标分页、IP 区间、受排序规则影响的字符串比较等）回退到 SQL。
+    同步模式下由线程锁保护；异步模式（asgi.py）下同一事件循环上的协程还需依次获取该事件循环的 asyncio.Lock
+    """
+
+    def __init__(self, model, enabled: bool = False, max_staleness: float = 2.0, overlap: float = 5.0):
+        self.model = model
+        self.table = model.__table__
+        self.enabled = enabled and np is not None
+        self.max_staleness = max_staleness
+        self.overlap = timedelta(seconds=overlap)
+        self._lock = threading.RLock()
+        self._loop_locks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Lock]" = \
+            weakref.WeakKeyDictionary()
+        self._columns: Dict[str, _Column] = {}
+        self._ids = None
+        self._alive = None
+        self._pos: Dict[int, int] = {}
+        self._watermark: Optional[datetime] = None
+        self._refreshed_at = 0.0
+        self._stale = True
+        self._stale_at: Optional[float] = None
+        self._dialect = None
+        self.hits = 0
+        self.fallbacks: Counter = Counter()
+        self.refreshes = 0
+        self.last_refresh_ms = 0.0
+
+    @contextmanager
+    def _locked(self):
+        """
+        获取快照锁
+        异步模式下服务层代码经 AsyncSession.run_sync 在事件循环线程的 greenlet 中执行，等待数据库时切回事件循环，
+        同一线程上的其他协程会重入 RLock 并读到刷新到一半的快照，因此先等待所在事件循环的 asyncio.Lock（让出事件循环），
+        再获取线程锁（与线程池中执行的同步接口互斥）
+        """
+        if greenlet is None or not in_greenlet():
+            with self._lock:
+                yield
+            return
+        loop = asyncio.get_running_loop()
+        loop_lock = self._loop_locks.get(loop)
+        if loop_lock is None:
+            loop_lock = self._loop_locks.setdefault(loop, asyncio.Lock())
+        await_only(loop_lock.acquire())
+        try:
+            with self._lock:
+                yield
+        finally:
+            loop_lock.release()
+
+    # ------------------------------------------------------------------ 刷新
+
+    def mark_stale(self) -> None:
+        """
+        写操作提交后调用，下一次查询前先刷新（同一进程内读到自己的写入）；
+        之后 CONSISTENCY_WINDOW 秒内的刷新从主库读取，从库可能尚未同步这次写入
+        """
+        self._stale = True
+        self._stale_at = time.monotonic()
+
+    def refresh(self, db: Session, force: bool = False) -> None:
+        """
+        按需刷新快照
+
+        Args:
+            db: 数据库会话
+            force: 忽略最大过期时间立即刷新
+        """
+        with self._locked():
+            if not force and not self._stale and time.monotonic() - self._refreshed_at < self.max_staleness:
+                return
+            start = time.perf_counter()
+            self._dialect = db.get_bind().dialect.name
+            self._stale = False
+            stale_at = self._stale_at
+            with use_primary(db, stale_at is not None and time.monotonic() - stale_at < Config.CONSISTENCY_WINDOW):
+                if self._ids is None or (~self._alive).sum() > len(self._ids) // 4:
+                    self._full_load(db)
+                    logger.info(f"快照全量加载 {len(self._pos)} 行，耗时 {time.perf_counter() - start:.2f} 秒")
+                else:
+                    self._incremental(db)
+            self._refreshed_at = time.monotonic()
+            self.refreshes += 1
+            self.last_refresh_ms = round((time.perf_counter() - start) * 1000, 3)
+
+    def _full_load(self, db: Session) -> None:
+        """全量加载（首次加载或已删除行过多时）"""
+        self._columns = {column.name: _Column(column.name, column.type) for column in self.table.c}
+        self._ids = np.empty(0, dtype=np.int64)
+        self._alive = np.empty(0, dtype=bool)
+        self._pos = {}
+        for column in self._columns.values():
+            column.values, column.null = column.encode([])
+        self._watermark = None
+        statement = select(*self.table.c).order_by(self.table.c.id).execution_options(yield_per=10000)
+        for rows in db.execute(statement).partitions():
+            self._apply(rows)
+
+    def _incremental(self, db: Session) -> None:
+        """增量刷新: 重新读取最近修改的行，并识别已删除的行"""
+        modified = self.table.c.last_modified_date
+        statement = select(*self.table.c)
+        if self._watermark is not None:
+            # 向前多取一段时间，覆盖修改时间早于提交时间的事务
+            statement = statement.where(modified >= self._watermark - self.overlap)
+        self._apply(db.execute(statement.order_by(self.table.c.id)).all())
+
+        # 主键指纹（行数、主键之和与最大值）不一致时才读取全部主键，找出已删除的行以及
+        # 修改时间早于水位线而未被上面的查询读到的新行；只比较行数会漏掉同一刷新周期内一删一增的情况
+        id_column = self.table.c.id
+        total, id_sum, id_max = db.execute(
+            select(func.count(), func.coalesce(func.sum(id_column), 0), func.coalesce(func.max(id_column), 0))).one()
+        live_ids = self._ids[self._alive]
+        local = (len(self._pos), int(live_ids.sum()), int(live_ids.max()) if len(live_ids) else 0)
+        if (total, int(id_sum), int(id_max)) != local:
+            live = set(db.execute(select(id_column)).scalars())
+            removed = [server_id for server_id in self._pos if server_id not in live]
+            if removed:
+                self._alive[[self._pos.pop(server_id) for server_id in removed]] = False
+            added = sorted(live.difference(self._pos))
+            for start in range(0, len(added), 1000):
+                chunk = added[start:start + 1000]
+                self._apply(db.execute(select(*self.table.c).where(id_column.in_(chunk)).order_by(id_column)).all())
+
+    def _apply(self, rows) -> None:
+        """写入一批行: 已存在的行原地更新，新行追加到末尾"""
+        if not rows:
+            return
+        updated, appended = [], []
+        for row in rows:
+            (updated if row.id in self._pos else appended).append(row)
+            if row.last_modified_date is not None and (self._watermark is None or row.last_modified_date > self._watermark):
+                self._watermark = row.last_modified_date
+
+        if updated:
+            positions = np.array([self._pos[row.id] for row in updated], dtype=np.int64)
+            for name, column in self._columns.items():
+                values, null = column.encode([getattr(row, name) for row in updated])
+                column.values[positions] = values
+                column.null[positions] = null
+            self._alive[positions] = True
+        if appended:
+            start = len(self._ids)
+            for name, column in self._columns.items():
+                values, null = column.encode([getattr(row, name) for row in appended])
+                column.values = np.concatenate([column.values, values])
+                column.null = np.concatenate([column.null, null])
+            self._ids = np.concatenate([self._ids, np.array([row.id for row in appended], dtype=np.int64)])
+            self._alive = np.concatenate([self._alive, np.ones(len(appended), dtype=bool)])
+            for offset, row in enumerate(appended):
+                self._pos[row.id] = start + offset
+
+    # ------------------------------------------------------------------ 查询
+
+    def query(self, db: Session, query: Optional[Union[QueryGroup, QueryCondition]], sort_key: List[Tuple[str, bool]],
+              offset: int = 0, limit: Optional[int] = None) -> Optional[Tuple[List[Any], int]]:
+        """
+        在快照上执行查询
+
+        Args:
+            db: 数据库会话（用于刷新快照和读取字符串排序规则）
+            query: 查询条件或条件组
+            sort_key: 排序键 [(字段名, 是否降序), ...]，为空时按主键排序
+            offset: 跳过的行数
+            limit: 返回的最大行数，None 表示全部
+
+        Returns:
+            tuple: (当前页对象列表, 总数)；快照无法回答时返回 None
+        """
+        if not self.enabled:
+            return None
+        try:
+            self.refresh(db)
+            with self._locked():
+                mask = self._alive.copy()
+                if query is not None:
+                    mask &= self._evaluate(query)
+                positions = np.flatnonzero(mask)
+                positions = positions[self._order(db, positions, sort_key)]
+                page = positions[offset:offset + limit if limit is not None else None]
+                items = [self._materialize(position) for position in page]
+                self.hits += 1
+                return items, int(len(positions))
+        except Unsupported as e:
+            self.fallbacks[str(e)] += 1
+            return None
+
+    def _evaluate(self, node) -> "np.ndarray":
+        if isinstance(node, QueryGroup):
+            masks = [self._evaluate(condition) for condition in node.conditions]
+            if not masks:
+                return np.ones(len(self._ids), dtype=bool)
+            result = masks[0]
+            for mask in masks[1:]:
+                result = result & mask if node.operator == "AND" else result | mask
+            return result
+        column = self._columns.get(node.field)
+        if column is None:
+            raise Unsupported(f"field:{node.field}")
+        if column.kind == "str":
+            return self._evaluate_string(column, node.operator, node.value)
+        return self._evaluate_scalar(column, node.operator, node.value)
+
+    def _evaluate_scalar(self, column: _Column, operator: str, value) -> "np.ndarray":
+        not_null = ~column.null
+        if operator == "in":
+            values = value if isinstance(value, list) else [value]
+            return np.isin(column.values, [self._scalar(column, v) for v in values]) & not_null
+        value = self._scalar(column, value)
+        compare = {
+            "=": np.equal, "!=": np.not_equal, ">": np.greater, "<": np.less,
+            ">=": np.greater_equal, "<=": np.less_equal,
+        }.get(operator)
+        if compare is None:
+            raise Unsupported(f"operator:{operator}")
+        return compare(column.values, value) & not_null
+
+    def _scalar(self, column: _Column, value):
+        """将条件值转换为列的数组类型，无法确定数据库比较语义的值回退到 SQL"""
+        if column.kind == "dt":
+            if not isinstance(value, str):
+                raise Unsupported("value:datetime")
+            try:
+                return np.datetime64(datetime.fromisoformat(value), "us")
+            except ValueError:
+                raise Unsupported("value:datetime")
+        if column.kind == "bool":
+            if not isinstance(value, bool):
+                raise Unsupported("value:bool")
+            return value
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise Unsupported(f"value:{column.kind}")
+        if column.kind == "int" and not float(value).is_integer():
+            raise Unsupported("value:int")
+        return value
+
+    def _evaluate_string(self, column: _Column, operator: str, value) -> "np.ndarray":
+        # MySQL 默认排序规则大小写不敏感，SQLite 的 LIKE 对 ASCII 大小写不敏感，PostgreSQL 均区分大小写；
+        # 非 ASCII 字符的折叠规则因排序规则而异，此时回退到 SQL
+        case_insensitive_eq = self._dialect == "mysql"
+        case_insensitive_like = self._dialect != "postgresql"
+        values = value if isinstance(value, list) else [value]
+        if not all(isinstance(v, str) for v in values):
+            raise Unsupported("value:str")
+
+        if operator in ("=", "!=", "in"):
+            if case_insensitive_eq:
+                if not column.ascii or not all(v.isascii() for v in values):
+                    raise Unsupported("collation")
+                # MySQL 的 PAD SPACE 比较忽略末尾空格
+                wanted = {v.lower().rstrip(" ") for v in values}
+                codes = [code for code, text in enumerate(column.dictionary) if text.lower().rstrip(" ") in wanted]
+            else:
+                codes = [column.code_of[v] for v in values if v in column.code_of]
+            matched = np.isin(column.values, codes)
+            return ~matched & ~column.null if operator == "!=" else matched
+        if operator == "like":
+            if case_insensitive_like and (not column.ascii or not value.isascii()):
+                raise Unsupported("collation")
+            if "\\" in value:
+                # MySQL/PostgreSQL 默认以反斜杠作为 LIKE 转义字符，SQLite 没有默认转义字符
+                raise Unsupported("like:escape")
+            codes = self._like_codes(column, value, case_insensitive_like)
+            return np.isin(column.values, codes)
+        raise Unsupported(f"operator:{operator}")
+
+    def _like_codes(self, column: _Column, value: str, case_insensitive: bool) -> "np.ndarray":
+        """在字典上匹配 LIKE '%value%'，返回命中的字典下标"""
+        if not column.dictionary:
+            return np.empty(0, dtype=np.int32)
+        if "%" not in value and "_" not in value:
+            array = column.dictionary_array()
+            if case_insensitive:
+                array, value = np.char.lower(array), value.lower()
+            return np.flatnonzero(np.char.find(array, value) >= 0)
+        pattern = "".join(".*" if ch == "%" else "." if ch == "_" else re.escape(ch) for ch in value)
+        regex = re.compile(pattern, re.IGNORECASE | re.DOTALL if case_insensitive else re.DOTALL)
+        return np.array([code for code, text in enumerate(column.dictionary) if regex.search(text)], dtype=np.int32)
+
+    def _order(self, db: Session, positions: "np.ndarray", sort_key: List[Tuple[str, bool]]) -> "np.ndarray":
+        """计算排序后的下标（稳定排序，主键作为最后的排序键）"""
+        if not sort_key:
+            return np.argsort(self._ids[positions], kind="stable")
+        # 与数据库一致的空值顺序: MySQL/SQLite 升序时空值在前，PostgreSQL 在后
+        nulls_first = self._dialect != "postgresql"
+        keys = []
+        for name, desc in sort_key:
+            column = self._columns.get(name)
+            if column is None:
+                raise Unsupported(f"field:{name}")
+            values = self._sort_values(db, column)[positions]
+            null = column.null[positions]
+            null_key = ~null if nulls_first else null
+            if desc:
+                values, null_key = -values, ~null_key
+            keys += [null_key, values]
+        # np.lexsort 以最后一个键为主键
+        return np.lexsort(keys[::-1])
+
+    def _sort_values(self, db: Session, column: _Column) -> "np.ndarray":
+        """可比较、可取负的排序值"""
+        if column.kind == "dt":
+            return column.values.astype(np.int64)
+        if column.kind in ("bool", "int"):
+            return column.values.astype(np.int64)
+        if column.kind == "num":
+            return np.nan_to_num(column.values)
+        if column._ranks is None:
+            column._ranks = self._string_ranks(db, column)
+        ranks = column._ranks[np.maximum(column.values, 0)]
+        if (ranks[~column.null] < 0).any():
+            raise Unsupported("collation")
+        return ranks
+
+    def _string_ranks(self, db: Session, column: _Column) -> "np.ndarray":
+        """
+        字符串的排序名次由数据库按列的排序规则计算（DENSE_RANK 使排序规则下相等的值名次相同），
+        字典变化后重新计算；名次为 -1 表示数据库中已不存在该值
+        """
+        table_column = self.table.c[column.name]
+        distinct = select(table_column.label("value")).where(table_column.isnot(None)).distinct().subquery()
+        ranked = select(distinct.c.value, func.dense_rank().over(order_by=distinct.c.value))
+        ranks = np.full(max(len(column.dictionary), 1), -1, dtype=np.int64)
+        for value, rank in db.execute(ranked):
+            code = column.code_of.get(value)
+            if code is not None:
+                ranks[code] = rank
+        return ranks
+
+    def _materialize(self, position: int):
+        """将一行还原为（未关联会话的）模型对象"""
+        return self.model(**{name: column.decode(position) for name, column in self._columns.items()})
+
+    def stats(self) -> Dict[str, Any]:
+        """快照状态与命中统计"""
+        with self._lock:
+            loaded = self._ids is not None
+            return {
+                "enabled": self.enabled,
+                "rows": len(self._pos) if loaded else 0,
+                "memory_bytes": sum(column.nbytes() for column in self._columns.values()) if loaded else 0,
+                "watermark": self._watermark.isoformat() if self._watermark else None,
+                "refreshes": self.refreshes,
+                "last_refresh_ms": self.last_refresh_ms,
+                "hits": self.hits,
+                "fallbacks": dict(self.fallbacks),
+            }
+
+
+# 创建服务器快照实例（需安装 numpy 并开启 INVENTORY_SNAPSHOT_ENABLED）
+INVENTORY_SNAPSHOT = InventorySnapshot(Server, enabled=Config.INVENTORY_SNAPSHOT_ENABLED,
+                                       max_staleness=Config.INVENTORY_SNAPSHOT_MAX_STALENESS,
+                                       overlap=Config.INVENTORY_SNAPSHOT_OVERLAP)
+# 快照未能回答（回退到数据库）的查询计为未命中
+register_cache("inventory_snapshot", lambda: {"hits": INVENTORY_SNAPSHOT.hits,
+                                              "misses": sum(INVENTORY_SNAPSHOT.fallbacks.values())})
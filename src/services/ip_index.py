@@ -0,0 +1,135 @@
+import ipaddress
+import re
+from typing import Optional, Set, Tuple
+
+from sqlalchemy import select
+
+from config import Config
+from models.server import Server
+from models.server_ip import ServerIp
+from schemas.query import SERVER_QUERY_CONFIG
+from services.side_table_index import SideTableIndex
+
+# 多个地址之间的分隔符（other_ip 为逗号分隔）
+_SEPARATORS = re.compile(r"[\s,;]+")
+
+# IPv4 地址映射到 ::ffff:0:0/96，与 IPv6 地址共用同一编码空间
+_IPV4_MAPPED_PREFIX = 0xFFFF << 32
+
+
+def _to_int(address) -> int:
+    if address.version == 4:
+        return _IPV4_MAPPED_PREFIX | int(address)
+    return int(address)
+
+
+def _to_bytes(value: int) -> bytes:
+    return value.to_bytes(16, "big")
+
+
+def encode_ip(text: str) -> Optional[bytes]:
+    """
+    将 IP 地址编码为 16 字节大端整数，无法解析时返回 None
+
+    Args:
+        text: IPv4 或 IPv6 地址
+
+    Returns:
+        bytes: 编码后的地址
+    """
+    try:
+        return _to_bytes(_to_int(ipaddress.ip_address(text.strip())))
+    except ValueError:
+        return None
+
+
+def parse_ips(value: Optional[str]) -> Set[bytes]:
+    """解析字段中的所有地址（忽略无法解析的部分）"""
+    if not value:
+        return set()
+    encoded = (encode_ip(part) for part in _SEPARATORS.split(value) if part)
+    return {ip for ip in encoded if ip is not None}
+
+
+def cidr_bounds(value) -> Tuple[bytes, bytes]:
+    """
+    网段的地址区间
+
+    Args:
+        value: 网段，如 10.12.0.0/16 或 2001:db8::/32（不要求主机位为 0）
+
+    Returns:
+        tuple: (起始地址, 结束地址) 的编码
+
+    Raises:
+        ValueError: 网段格式错误
+    """
+    try:
+        network = ipaddress.ip_network(str(value).strip(), strict=False)
+    except ValueError:
+        raise ValueError(f"无效的网段: {value}")
+    return _to_bytes(_to_int(network.network_address)), _to_bytes(_to_int(network.broadcast_address))
+
+
+def range_bounds(value) -> Tuple[bytes, bytes]:
+    """
+    地址区间
+
+    Args:
+        value: 形如 "10.0.0.1-10.0.0.50" 的字符串（两端包含）
+
+    Returns:
+        tuple: (起始地址, 结束地址) 的编码
+
+    Raises:
+        ValueError: 区间格式错误或两端地址版本不同
+    """
+    parts = str(value).split("-")
+    try:
+        start, end = (ipaddress.ip_address(part.strip()) for part in parts)
+    except ValueError:
+        raise ValueError(f"无效的IP区间: {value}，格式应为 起始IP-结束IP")
+    if start.version != end.version:
+        raise ValueError(f"无效的IP区间: {value}，两端地址版本不一致")
+    low, high = sorted((_to_int(start), _to_int(end)))
+    return _to_bytes(low), _to_bytes(high)
+
+
+class IpIndex(SideTableIndex):
+    """
+    IP 地址索引
+    写操作时由 ServerService 在同一事务内同步；in_cidr / ip_range 条件编译为
+    id IN (SELECT server_id FROM server_ip WHERE field = ? AND ip BETWEEN ? AND ?)
+    """
+    value_column = "ip"
+
+    def condition(self, field: str, low, high):
+        """
+        区间条件
+
+        Args:
+            field: 字段名
+            low: 起始地址（绑定参数）
+            high: 结束地址（绑定参数）
+
+        Returns:
+            SQL条件表达式
+        """
+        index = self.index_model
+        matched = select(index.server_id).where(index.field == field, index.ip >= low, index.ip <= high)
+        return self.model.id.in_(matched)
+
+    def _values(self, text: Optional[str]) -> Set[bytes]:
+        return parse_ips(text)
+
+    def _stored(self, value) -> bytes:
+        # 部分驱动以 memoryview / bytearray 返回二进制列
+        return bytes(value)
+
+
+# 支持 in_cidr / ip_range 的字段
+IP_FIELDS = [name for name, field_config in SERVER_QUERY_CONFIG.get_all_fields().items()
+             if "in_cidr" in field_config.operators or "ip_range" in field_config.operators]
+
+# 创建服务器 IP 索引实例
+SERVER_IP_INDEX = IpIndex(Server, ServerIp, IP_FIELDS, enabled=Config.IP_INDEX_ENABLED)
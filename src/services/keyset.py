@@ -0,0 +1,137 @@
+import base64
+import json
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, or_, tuple_
+
+# 排序键: [(字段名, 是否降序), ...]
+SortKey = List[Tuple[str, bool]]
+
+CURSOR_NEXT = "next"
+CURSOR_PREV = "prev"
+
+
+def resolve_sort(model, sort: Optional[Sequence[Any]], tiebreaker: str = "id") -> SortKey:
+    """
+    解析排序条件，忽略模型中不存在的字段，并在末尾追加主键作为唯一排序键
+
+    Args:
+        model: ORM 模型类
+        sort: 排序条件列表（包含 field 和 order 属性）
+        tiebreaker: 兜底排序字段
+
+    Returns:
+        list: [(字段名, 是否降序), ...]
+    """
+    sort_key = []
+    for item in sort or []:
+        if item.field not in model.__table__.c:
+            print(f"WARNING: Invalid sort field: {item.field}. Ignoring sorting.")
+            continue
+        if any(name == item.field for name, _ in sort_key):
+            continue
+        sort_key.append((item.field, bool(item.order) and item.order.lower() == "desc"))
+    if not any(name == tiebreaker for name, _ in sort_key):
+        sort_key.append((tiebreaker, sort_key[-1][1] if sort_key else False))
+    return sort_key
+
+
+def order_by_clauses(model, sort_key: SortKey, reverse: bool = False) -> list:
+    """生成 ORDER BY 子句，reverse 为 True 时整体反向（用于向前翻页）"""
+    clauses = []
+    for name, desc in sort_key:
+        column = getattr(model, name)
+        clauses.append(column.desc() if desc != reverse else column.asc())
+    return clauses
+
+
+def keyset_condition(model, sort_key: SortKey, values: Sequence[Any], reverse: bool = False):
+    """
+    生成游标定位条件 (c1, c2, ..., id) > (v1, v2, ..., vid)
+
+    排序方向一致时使用行值比较，便于数据库利用联合索引；方向混合时展开为
+    (c1 > v1) OR (c1 = v1 AND c2 > v2) OR ... 的形式
+    """
+    columns = [getattr(model, name) for name, _ in sort_key]
+    descending = {desc != reverse for _, desc in sort_key}
+    if len(descending) == 1:
+        left, right = tuple_(*columns), tuple_(*values)
+        return left < right if descending.pop() else left > right
+
+    clauses = []
+    for i, ((name, desc), column) in enumerate(zip(sort_key, columns)):
+        equals = [columns[j] == values[j] for j in range(i)]
+        step = column < values[i] if desc != reverse else column > values[i]
+        clauses.append(and_(*equals, step))
+    return or_(*clauses)
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {"$dt": value.isoformat()}
+    if isinstance(value, Decimal):
+        return {"$dec": str(value)}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if "$dt" in value:
+            return datetime.fromisoformat(value["$dt"])
+        if "$dec" in value:
+            return Decimal(value["$dec"])
+    return value
+
+
+def encode_cursor(sort_key: SortKey, row, direction: str) -> str:
+    """
+    根据行数据生成不透明游标
+
+    Args:
+        sort_key: 排序键
+        row: 当前页的首行或末行
+        direction: 翻页方向 next/prev
+
+    Returns:
+        str: URL 安全的游标字符串
+    """
+    payload = {
+        "s": [[name, "desc" if desc else "asc"] for name, desc in sort_key],
+        "v": [_encode_value(getattr(row, name)) for name, _ in sort_key],
+        "d": direction,
+    }
+    raw = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_key: SortKey) -> Tuple[Optional[List[Any]], str]:
+    """
+    解析游标
+
+    Args:
+        cursor: 游标字符串，空字符串表示游标模式下的第一页
+        sort_key: 当前请求的排序键
+
+    Returns:
+        tuple: (排序键取值列表或 None, 翻页方向)
+
+    Raises:
+        ValueError: 游标格式错误或与当前排序条件不匹配
+    """
+    if not cursor:
+        return None, CURSOR_NEXT
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        expected = [[name, "desc" if desc else "asc"] for name, desc in sort_key]
+    except Exception:
+        raise ValueError("无效的游标")
+    if not isinstance(payload, dict):
+        raise ValueError("无效的游标")
+    if payload.get("s") != expected:
+        raise ValueError("游标与当前排序条件不匹配")
+    if payload.get("d") not in (CURSOR_NEXT, CURSOR_PREV) or len(payload.get("v", [])) != len(sort_key):
+        raise ValueError("无效的游标")
+    return [_decode_value(v) for v in payload["v"]], payload["d"]
@@ -1,7 +1,11 @@
 from sqlalchemy.orm import Session
 from models.network_segment import NetworkSegment
 from schemas.network_segment import NetworkSegmentCreate, NetworkSegmentUpdate
+from schemas.server import PreconditionFailedError
+from init.routing import replica_read
+from init.timing import stage
 from datetime import datetime
+from typing import Optional, Set
 
 class NetworkSegmentService:
     def __init__(self, db: Session):
@@ -40,6 +44,7 @@ class NetworkSegmentService:
         
         return db_network_segment
 
+    @replica_read
     def get_network_segments(self, skip: int = 0, limit: int = 100):
         """
         获取网络段列表
@@ -51,8 +56,10 @@ class NetworkSegmentService:
         Returns:
             List[NetworkSegment]: 网络段列表
         """
-        return self.db.query(NetworkSegment).offset(skip).limit(limit).all()
+        with stage('fetch'):
+            return self.db.query(NetworkSegment).offset(skip).limit(limit).all()
 
+    @replica_read
     def get_network_segment(self, network_segment_id: int):
         """
         获取指定网络段
@@ -66,31 +73,47 @@ class NetworkSegmentService:
         Raises:
             ValueError: 当网络段不存在时抛出
         """
-        network_segment = self.db.query(NetworkSegment).filter(NetworkSegment.id == network_segment_id).first()
+        with stage('fetch'):
+            network_segment = self.db.query(NetworkSegment).filter(NetworkSegment.id == network_segment_id).first()
         if not network_segment:
             raise ValueError(f"网络段 ID {network_segment_id} 不存在")
         return network_segment
 
-    def update_network_segment(self, network_segment_id: int, network_segment: NetworkSegmentUpdate):
+    @replica_read
+    def get_network_segment_version(self, network_segment_id: int) -> Optional[int]:
+        """只查询网络段的版本号（用于条件请求），网络段不存在时返回 None"""
+        return self.db.query(NetworkSegment.version).filter(NetworkSegment.id == network_segment_id).scalar()
+
+    def update_network_segment(self, network_segment_id: int, network_segment: NetworkSegmentUpdate,
+                               expected_versions: Optional[Set[int]] = None):
         """
         更新网络段信息
+        提交的值与当前值全部相同时不写入数据库
         
         Args:
             network_segment_id: 网络段ID
             network_segment: 网络段更新数据
+            expected_versions: If-Match 中的版本号，为空时不检查
             
         Returns:
             NetworkSegment: 更新后的网络段对象
             
         Raises:
             ValueError: 当网络段不存在时抛出
+            PreconditionFailedError: 网络段当前版本不在 expected_versions 中时抛出
         """
-        db_network_segment = self.get_network_segment(network_segment_id)
+        db_network_segment = self._get_for_update(network_segment_id)
+        self._check_version(db_network_segment, expected_versions)
         
         # 更新字段
         update_data = network_segment.model_dump(exclude_unset=True)
+        changed = False
         for field, value in update_data.items():
-            setattr(db_network_segment, field, value)
+            if getattr(db_network_segment, field) != value:
+                setattr(db_network_segment, field, value)
+                changed = True
+        if not changed:
+            return db_network_segment
         
         # 更新审计信息
         db_network_segment.last_modified_by = "system"  # TODO: 从当前用户获取
@@ -102,17 +125,20 @@ class NetworkSegmentService:
         
         return db_network_segment
 
-    def delete_network_segment(self, network_segment_id: int):
+    def delete_network_segment(self, network_segment_id: int, expected_versions: Optional[Set[int]] = None):
         """
         删除网络段
         
         Args:
             network_segment_id: 网络段ID
+            expected_versions: If-Match 中的版本号，为空时不检查
             
         Raises:
             ValueError: 当网络段不存在时抛出
+            PreconditionFailedError: 网络段当前版本不在 expected_versions 中时抛出
         """
-        db_network_segment = self.get_network_segment(network_segment_id)
+        db_network_segment = self._get_for_update(network_segment_id)
+        self._check_version(db_network_segment, expected_versions)
         
         # 软删除
         db_network_segment.is_valid = False
@@ -120,4 +146,24 @@ class NetworkSegmentService:
         db_network_segment.last_modified_date = datetime.now()
         
         # 保存到数据库
-        self.db.commit() 
\ No newline at end of file
+        self.db.commit() 
+
+    def _get_for_update(self, network_segment_id: int) -> NetworkSegment:
+        """
+        在主库上读取并锁定要修改的网络段（写操作前的读取不能走可能滞后的从库）
+
+        Raises:
+            ValueError: 当网络段不存在时抛出
+        """
+        network_segment = self.db.query(NetworkSegment).filter(
+            NetworkSegment.id == network_segment_id).with_for_update().first()
+        if not network_segment:
+            raise ValueError(f"网络段 ID {network_segment_id} 不存在")
+        return network_segment
+
+    @staticmethod
+    def _check_version(db_network_segment: NetworkSegment, expected_versions: Optional[Set[int]]):
+        """If-Match 检查"""
+        if expected_versions is not None and db_network_segment.version not in expected_versions:
+            raise PreconditionFailedError(
+                f"网络段 ID {db_network_segment.id} 已被修改（当前版本 {db_network_segment.version}），请重新获取后再提交")
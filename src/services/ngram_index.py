@@ -0,0 +1,102 @@
+import hashlib
+import re
+import unicodedata
+from typing import List, Optional, Sequence, Set
+
+from sqlalchemy import func, select
+
+from config import Config
+from models.server import Server
+from models.server_ngram import ServerNgram
+from schemas.query import FieldType, SERVER_QUERY_CONFIG
+from services.side_table_index import SideTableIndex
+
+NGRAM_SIZE = 3
+
+# like 模式中的通配符与转义序列，其两侧的片段分别计算 n-gram。
+# MySQL 以反斜杠作为 LIKE 转义字符（\x 匹配字面的 x），SQLite 没有默认转义字符（\ 为字面字符、x 仍可能是通配符），
+# 转义序列整体作为分隔处理，两种解释下各片段都必然原样出现在匹配结果里
+_WILDCARDS = re.compile(r"\\.?|[%_]", re.DOTALL)
+
+
+def normalize(text: str) -> str:
+    """大小写与重音不敏感的规范化，保证索引召回覆盖 MySQL 默认排序规则下 LIKE 的匹配结果"""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch)).casefold()
+
+
+def gram_hash(gram: str) -> int:
+    """n-gram 的稳定 64 位有符号哈希（与 BIGINT 取值范围一致）"""
+    return int.from_bytes(hashlib.blake2b(gram.encode("utf-8"), digest_size=8).digest(), "big", signed=True)
+
+
+def ngrams(text: Optional[str], n: int = NGRAM_SIZE) -> Set[int]:
+    """字符串中所有 n-gram 的哈希集合"""
+    if not text:
+        return set()
+    text = normalize(str(text))
+    return {gram_hash(text[i:i + n]) for i in range(len(text) - n + 1)}
+
+
+def pattern_ngrams(value, n: int = NGRAM_SIZE) -> Set[int]:
+    """like 查询值中必然出现在匹配结果里的 n-gram"""
+    grams = set()
+    for segment in _WILDCARDS.split(str(value)):
+        grams |= ngrams(segment, n)
+    return grams
+
+
+class NgramIndex(SideTableIndex):
+    """
+    字符串字段的 n-gram 倒排索引
+    写操作时由 ServerService 在同一事务内同步；查询时 like 条件先按 n-gram 取交集得到候选ID，
+    再对候选行执行原 LIKE 条件，结果与全表 LIKE 一致。哈希冲突只会增加候选，不会漏掉结果
+    """
+    value_column = "gram"
+
+    def __init__(self, model, index_model, fields: Sequence[str], enabled: bool = False, max_query_grams: int = 8):
+        super().__init__(model, index_model, fields, enabled)
+        self.max_query_grams = max_query_grams
+
+    def usable(self, value) -> bool:
+        """like 查询值能否使用索引（值中至少有一个完整的 n-gram）"""
+        return self.enabled and bool(pattern_ngrams(value))
+
+    def query_grams(self, value) -> List[int]:
+        """查询使用的 n-gram，超过上限时取固定的子集（候选范围变大，结果不变）"""
+        return sorted(pattern_ngrams(value))[:self.max_query_grams]
+
+    def candidates(self, field: str, grams, count):
+        """
+        候选ID子查询: 包含全部查询 n-gram 的行
+
+        Args:
+            field: 字段名
+            grams: n-gram 哈希列表（绑定参数）
+            count: n-gram 个数（绑定参数）
+
+        Returns:
+            Select: SELECT server_id ... GROUP BY server_id HAVING COUNT(*) = :count
+        """
+        index = self.index_model
+        return (select(index.server_id)
+                .where(index.field == field, index.gram.in_(grams))
+                .group_by(index.server_id)
+                .having(func.count() == count))
+
+    def _values(self, text: Optional[str]) -> Set[int]:
+        return ngrams(text)
+
+
+def _indexed_fields() -> List[str]:
+    """默认索引所有支持 like 的字符串字段，可通过配置缩小范围"""
+    fields = [name for name, field_config in SERVER_QUERY_CONFIG.get_all_fields().items()
+              if field_config.type == FieldType.STRING and "like" in field_config.operators]
+    if Config.NGRAM_INDEX_FIELDS:
+        fields = [name for name in fields if name in Config.NGRAM_INDEX_FIELDS]
+    return fields
+
+
+# 创建服务器 n-gram 索引实例
+SERVER_NGRAM_INDEX = NgramIndex(Server, ServerNgram, _indexed_fields(), enabled=Config.NGRAM_INDEX_ENABLED,
+                                max_query_grams=Config.NGRAM_QUERY_MAX_GRAMS)
@@ -0,0 +1,358 @@
+import json
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from sqlalchemy import and_, bindparam, or_
+from sqlalchemy.sql.elements import ColumnElement
+
+from config import Config
+from init.metrics import register_cache
+from models.server import Server
+from schemas.query import BaseQueryConfig, FieldConfig, FieldType, QueryCondition, QueryGroup, SERVER_QUERY_CONFIG
+from services.ip_index import IpIndex, SERVER_IP_INDEX, cidr_bounds, range_bounds
+from services.ngram_index import NgramIndex, SERVER_NGRAM_INDEX
+
+
+class OperatorSpec:
+    """
+    操作符定义
+    build: 根据列和参数槽位构建SQL条件
+    bind: 将请求中的值转换为绑定参数（返回元组，每个元素对应一个槽位）
+    slots: 参数槽位个数
+    """
+
+    def __init__(self, build: Callable[..., ColumnElement], bind: Optional[Callable[[Any], tuple]] = None,
+                 expanding: bool = False, slots: int = 1):
+        self.build = build
+        self.bind = bind or (lambda value: (value,))
+        self.expanding = expanding
+        self.slots = slots
+
+
+# 操作符分发表的基础定义，按 FieldConfig.operators 中的名称索引
+OPERATOR_SPECS: Dict[str, OperatorSpec] = {
+    "=": OperatorSpec(lambda column, value: column == value),
+    "!=": OperatorSpec(lambda column, value: column != value),
+    ">": OperatorSpec(lambda column, value: column > value),
+    "<": OperatorSpec(lambda column, value: column < value),
+    ">=": OperatorSpec(lambda column, value: column >= value),
+    "<=": OperatorSpec(lambda column, value: column <= value),
+    "like": OperatorSpec(lambda column, value: column.like(value), bind=lambda value: (f"%{value}%",)),
+    "in": OperatorSpec(lambda column, value: column.in_(value), expanding=True),
+    # IP 区间操作符依赖 IP 索引，由 IpRangeHandler 构建条件
+    "in_cidr": OperatorSpec(None, bind=cidr_bounds, slots=2),
+    "ip_range": OperatorSpec(None, bind=range_bounds, slots=2),
+}
+
+
+class FieldHandler:
+    """单个 (字段, 操作符) 组合的处理器: 值校验 + 条件构建"""
+
+    def __init__(self, field_config: FieldConfig, column, spec: OperatorSpec):
+        self.field_config = field_config
+        self.column = column
+        self.spec = spec
+        self.check = _make_value_checker(field_config)
+
+    def variant(self, value) -> Any:
+        """值相关的查询形态，同一字段/操作符在不同变体下编译为不同的语句"""
+        return None
+
+    def slots(self, variant: Any = None) -> int:
+        """参数槽位个数"""
+        return self.spec.slots
+
+    def build(self, names: List[str], variant: Any = None) -> ColumnElement:
+        slots = [bindparam(name, expanding=self.spec.expanding) for name in names]
+        return self.spec.build(self.column, *slots)
+
+    def bind(self, value, variant: Any = None) -> tuple:
+        return self.spec.bind(value)
+
+
+class NgramLikeHandler(FieldHandler):
+    """
+    like 条件处理器: 查询值包含完整 n-gram 时先用 n-gram 索引筛出候选ID，再对候选行执行 LIKE；
+    否则（值过短或索引未启用）退化为普通 LIKE
+    """
+
+    NGRAM = "ngram"
+
+    def __init__(self, field_config: FieldConfig, column, spec: OperatorSpec, index: NgramIndex):
+        super().__init__(field_config, column, spec)
+        self.index = index
+
+    def variant(self, value) -> Any:
+        return self.NGRAM if self.index.usable(value) else None
+
+    def slots(self, variant: Any = None) -> int:
+        # 模式串、n-gram 列表、n-gram 个数
+        return 3 if variant == self.NGRAM else self.spec.slots
+
+    def build(self, names: List[str], variant: Any = None) -> ColumnElement:
+        if variant != self.NGRAM:
+            return super().build(names, variant)
+        pattern, grams, count = names
+        candidates = self.index.candidates(self.field_config.name, bindparam(grams, expanding=True), bindparam(count))
+        return and_(self.index.model.id.in_(candidates), self.spec.build(self.column, bindparam(pattern)))
+
+    def bind(self, value, variant: Any = None) -> tuple:
+        if variant != self.NGRAM:
+            return super().bind(value, variant)
+        grams = self.index.query_grams(value)
+        return self.spec.bind(value) + (grams, len(grams))
+
+
+class IpRangeHandler(FieldHandler):
+    """in_cidr / ip_range 条件处理器: 将网段或地址区间编译为 IP 索引上的范围条件"""
+
+    def __init__(self, field_config: FieldConfig, column, spec: OperatorSpec, index: IpIndex):
+        super().__init__(field_config, column, spec)
+        self.index = index
+        check = self.check
+
+        def check_enabled(value):
+            check(value)
+            if not index.enabled:
+                raise ValueError(f"IP 索引未启用，字段 {field_config.name} 暂不支持网段/区间查询")
+
+        self.check = check_enabled
+
+    def build(self, names: List[str], variant: Any = None) -> ColumnElement:
+        low, high = (bindparam(name) for name in names)
+        return self.index.condition(self.field_config.name, low, high)
+
+
+def server_handler_factory(field_config: FieldConfig, column, spec: OperatorSpec) -> Optional[FieldHandler]:
+    """
+    服务器查询的处理器工厂: 建立了 n-gram 索引的字段使用 NgramLikeHandler 处理 like，
+    IP 字段使用 IpRangeHandler 处理 in_cidr / ip_range
+    """
+    if spec is OPERATOR_SPECS["like"] and SERVER_NGRAM_INDEX.covers(field_config.name):
+        return NgramLikeHandler(field_config, column, spec, SERVER_NGRAM_INDEX)
+    if spec.build is None:
+        if SERVER_IP_INDEX.covers(field_config.name):
+            return IpRangeHandler(field_config, column, spec, SERVER_IP_INDEX)
+        return None
+    return FieldHandler(field_config, column, spec)
+
+
+def _make_value_checker(field_config: FieldConfig) -> Callable[[Any], None]:
+    """
+    根据字段配置预先生成值校验函数，校验规则与 QueryCondition.validate_field 保持一致
+    """
+    name = field_config.name
+    field_type = field_config.type
+    enum_values = field_config.enum_values
+    is_multi_select = field_config.is_multi_select
+
+    def check(value):
+        if field_type == FieldType.BOOLEAN:
+            if not isinstance(value, bool):
+                raise ValueError(f"字段 {name} 必须是布尔值")
+        elif field_type == FieldType.INTEGER:
+            if not isinstance(value, (int, list)):
+                raise ValueError(f"字段 {name} 必须是整数或整数列表")
+        elif field_type == FieldType.ENUM:
+            if isinstance(value, list):
+                if not all(v in enum_values for v in value):
+                    raise ValueError(f"字段 {name} 的值必须是: {enum_values}")
+            elif value not in enum_values:
+                raise ValueError(f"字段 {name} 的值必须是: {enum_values}")
+
+        if not is_multi_select and isinstance(value, list):
+            raise ValueError(f"字段 {name} 不支持多选")
+
+    return check
+
+
+class CompiledQuery:
+    """编译后的查询计划: 带参数槽位的SQL条件以及对应的参数绑定顺序"""
+
+    __slots__ = ("shape", "clause", "binders")
+
+    def __init__(self, shape, clause: Optional[ColumnElement], binders: List[Tuple[FieldHandler, Any, List[str]]]):
+        self.shape = shape
+        self.clause = clause
+        self.binders = binders
+
+    def bind(self, values: List[Any]) -> Dict[str, Any]:
+        """
+        将一次请求中的值按顺序绑定到参数槽位
+
+        Args:
+            values: 按遍历顺序收集的条件值
+
+        Returns:
+            dict: 参数名到参数值的映射
+        """
+        params = {}
+        for (handler, variant, names), value in zip(self.binders, values):
+            params.update(zip(names, handler.bind(value, variant)))
+        return params
+
+    def key(self, params: Dict[str, Any]) -> str:
+        """规范化的过滤条件（形态 + 参数），用作结果缓存的键"""
+        return json.dumps([self.shape, params], sort_keys=True, ensure_ascii=False, default=str)
+
+
+class QueryCompiler:
+    """
+    查询编译器
+    将 QueryGroup/QueryCondition 树按"形态"（字段、操作符与嵌套结构，不含具体值）编译为
+    带绑定参数的SQL条件并缓存，同一形态的后续请求只需校验并绑定新值
+    """
+
+    def __init__(self, model, query_config: BaseQueryConfig, max_size: int = 256,
+                 handler_factory: Callable[..., FieldHandler] = FieldHandler, max_usage_shapes: int = 10000):
+        self.model = model
+        self.query_config = query_config
+        self.max_size = max_size
+        self._handler_factory = handler_factory
+        self._dispatch: Dict[Tuple[str, str], FieldHandler] = self._build_dispatch()
+        self._cache: "OrderedDict[Any, CompiledQuery]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # 各查询形态的使用次数，供索引建议工具使用
+        self.max_usage_shapes = max_usage_shapes
+        self._usage: Counter = Counter()
+
+    def _build_dispatch(self) -> Dict[Tuple[str, str], FieldHandler]:
+        """根据查询配置一次性生成 (字段, 操作符) -> 处理器 的分发表"""
+        dispatch = {}
+        for name, field_config in self.query_config.get_all_fields().items():
+            column = getattr(self.model, name)
+            for operator in field_config.operators:
+                spec = OPERATOR_SPECS.get(operator)
+                if spec is None:
+                    continue
+                handler = self._handler_factory(field_config, column, spec)
+                if handler is not None:
+                    dispatch[(name, operator)] = handler
+        return dispatch
+
+    def get_handler(self, field: str, operator: str) -> FieldHandler:
+        """获取字段/操作符对应的处理器，错误信息与 validate_field 保持一致"""
+        handler = self._dispatch.get((field, operator))
+        if handler is None:
+            field_config = self.query_config.get_field(field)
+            if operator not in field_config.operators:
+                raise ValueError(f"字段 {field} 不支持操作符: {operator}")
+            raise ValueError(f"不支持的字段类型或操作符: {field} {operator}")
+        return handler
+
+    def shape_of(self, query: Union[QueryGroup, QueryCondition], values: Optional[list] = None):
+        """
+        计算查询形态并按遍历顺序收集条件值
+
+        Args:
+            query: 查询条件或条件组
+            values: 用于收集条件值的列表
+
+        Returns:
+            tuple: 查询形态（可哈希）
+        """
+        if isinstance(query, QueryCondition):
+            handler = self.get_handler(query.field, query.operator)
+            handler.check(query.value)
+            if values is not None:
+                values.append(query.value)
+            return (query.field, query.operator, handler.variant(query.value))
+        elif isinstance(query, QueryGroup):
+            return (query.operator, tuple(self.shape_of(condition, values) for condition in query.conditions))
+        raise ValueError(f"不支持的查询类型: {type(query)}")
+
+    def compile(self, query: Union[QueryGroup, QueryCondition]) -> Tuple[CompiledQuery, Dict[str, Any]]:
+        """
+        编译查询
+
+        Args:
+            query: 查询条件或条件组
+
+        Returns:
+            tuple: (编译后的查询计划, 本次请求的绑定参数)
+        """
+        values = []
+        shape = self.shape_of(query, values)
+        with self._lock:
+            if shape in self._usage or len(self._usage) < self.max_usage_shapes:
+                self._usage[shape] += 1
+            plan = self._cache.get(shape)
+            if plan is not None:
+                self._cache.move_to_end(shape)
+                self.hits += 1
+        if plan is None:
+            plan = self._build_plan(shape)
+            with self._lock:
+                self.misses += 1
+                self._cache[shape] = plan
+                self._cache.move_to_end(shape)
+                while len(self._cache) > self.max_size:
+                    self._cache.popitem(last=False)
+                    self.evictions += 1
+        return plan, plan.bind(values)
+
+    def _build_plan(self, shape) -> CompiledQuery:
+        binders = []
+        counter = [0]
+
+        def build(node):
+            if len(node) == 2:
+                operator, children = node
+                clauses = [clause for clause in (build(child) for child in children) if clause is not None]
+                if not clauses:
+                    return None
+                return and_(*clauses) if operator == "AND" else or_(*clauses)
+
+            field, operator, variant = node
+            handler = self._dispatch[(field, operator)]
+            arity = handler.slots(variant)
+            names = [f"p{counter[0] + i}" for i in range(arity)]
+            counter[0] += arity
+            binders.append((handler, variant, names))
+            return handler.build(names, variant)
+
+        return CompiledQuery(shape, build(shape), binders)
+
+    def stats(self) -> Dict[str, Any]:
+        """缓存命中统计"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._cache),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            }
+
+    def usage_stats(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        查询形态使用统计（按使用次数降序）
+
+        Args:
+            limit: 最多返回的形态数量
+
+        Returns:
+            list: [{"shape": 查询形态, "count": 使用次数}, ...]，形态可被 JSON 序列化
+        """
+        with self._lock:
+            usage = self._usage.most_common(limit)
+        return [{"shape": json.loads(json.dumps(shape, default=str)), "count": count} for shape, count in usage]
+
+    def clear(self) -> None:
+        """清空缓存与统计"""
+        with self._lock:
+            self._cache.clear()
+            self._usage.clear()
+            self.hits = self.misses = self.evictions = 0
+
+
+# 创建服务器查询编译器实例
+SERVER_QUERY_COMPILER = QueryCompiler(Server, SERVER_QUERY_CONFIG, max_size=Config.QUERY_PLAN_CACHE_SIZE,
+                                      handler_factory=server_handler_factory)
+register_cache("query_plan", SERVER_QUERY_COMPILER.stats)
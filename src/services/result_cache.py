@@ -0,0 +1,79 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+class ResultCache:
+    """
+    进程内查询结果缓存
+    按规范化的过滤条件缓存结果，支持过期时间与容量上限（LRU 淘汰）；
+    写操作后调用 invalidate() 使所有结果失效，失效后一段时间内的重新填充应从主库读取（见 recently_invalidated）
+    """
+
+    def __init__(self, name: str, ttl: float = 30, max_size: int = 1024):
+        self.name = name
+        self.ttl = ttl
+        self.max_size = max_size
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.generation = 0
+        self.invalidated_at: Optional[float] = None
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """获取缓存结果，不存在或已过期时返回 None"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < now:
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any, generation: Optional[int] = None) -> None:
+        """
+        写入缓存结果
+
+        Args:
+            key: 规范化的过滤条件
+            value: 结果
+            generation: 开始计算结果时的缓存代数，期间发生过失效则放弃写入
+        """
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def invalidate(self) -> None:
+        """使所有缓存结果失效"""
+        with self._lock:
+            self._data.clear()
+            self.generation += 1
+            self.invalidated_at = time.monotonic()
+
+    def recently_invalidated(self, window: float) -> bool:
+        """最近 window 秒内是否失效过（期间从库可能尚未同步触发失效的写入）"""
+        invalidated_at = self.invalidated_at
+        return invalidated_at is not None and time.monotonic() - invalidated_at < window
+
+    def stats(self) -> Dict[str, Any]:
+        """缓存命中统计"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            }
@@ -0,0 +1,120 @@
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from operator import attrgetter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from flask import Response
+from sqlalchemy import Date, DateTime, Numeric
+
+from init.timing import incr, stage
+from models.network_segment import NetworkSegment
+from models.server import Server
+from schemas.network_segment import NetworkSegment as NetworkSegmentSchema
+from schemas.server import Server as ServerSchema
+
+try:
+    import orjson
+except ImportError:  # 未安装 orjson 时使用标准库 json
+    orjson = None
+
+
+def _default(value):
+    """JSON 编码器无法直接处理的类型（与接口原有的 to_serializable 转换规则一致）"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"无法序列化的类型: {type(value).__name__}")
+
+
+def dumps(obj: Any) -> bytes:
+    """编码为 UTF-8 JSON 字节串（优先使用 orjson）"""
+    with stage("encode"):
+        if orjson is not None:
+            return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=_default).encode()
+
+
+def json_response(payload: Any, code: int = 200, headers: Optional[Dict[str, str]] = None) -> Response:
+    """以 dumps 编码的 JSON 响应"""
+    return Response(dumps(payload), status=code, mimetype="application/json", headers=headers)
+
+
+def _column_encoder(column_type) -> Optional[Callable[[Any], Any]]:
+    """列值转换为 JSON 基础类型的函数，不需要转换时返回 None（orjson 可直接编码时间类型）"""
+    if isinstance(column_type, Numeric):
+        return float
+    if isinstance(column_type, (DateTime, Date)) and orjson is None:
+        return _default
+    return None
+
+
+class RowSerializer:
+    """
+    行序列化
+    按列类型预先生成每列的转换函数，ORM 对象或 Core 查询结果一次遍历转换为可直接编码的字典，
+    不经过 pydantic 校验与递归转换
+    """
+
+    def __init__(self, model, columns: Sequence[str]):
+        self.table = model.__table__
+        self.columns = list(columns)
+        self._encoders = {column.name: _column_encoder(column.type) for column in self.table.c}
+        self._plans: Dict[Optional[Tuple[str, ...]], Tuple[List[str], List[Tuple[str, Callable]], Callable]] = {}
+
+    def _plan(self, fields: Optional[Sequence[str]]):
+        key = tuple(fields) if fields else None
+        plan = self._plans.get(key)
+        if plan is None:
+            names = list(fields) if fields else self.columns
+            encoded = [(name, self._encoders[name]) for name in names if self._encoders[name] is not None]
+            getter = attrgetter(*names)
+            if len(names) == 1:
+                getter = (lambda get: lambda obj: (get(obj),))(getter)
+            plan = self._plans[key] = (names, encoded, getter)
+        return plan
+
+    def select_columns(self, fields: Optional[Sequence[str]] = None) -> list:
+        """Core 查询的列（顺序与 from_rows 的输出一致）"""
+        return [self.table.c[name] for name in (fields or self.columns)]
+
+    def from_objects(self, objs: Iterable[Any], fields: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        """
+        序列化 ORM 对象（或具有同名属性的对象）
+
+        Args:
+            objs: 对象列表
+            fields: 输出的字段，为空时输出 columns 中的全部字段
+
+        Returns:
+            list: 可直接交给 dumps 的字典列表
+        """
+        names, encoded, getter = self._plan(fields)
+        with stage("serialize"):
+            items = [self._encode(dict(zip(names, getter(obj))), encoded) for obj in objs]
+        incr("rows", len(items))
+        return items
+
+    def from_rows(self, rows: Iterable[Sequence[Any]], fields: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        """序列化按 select_columns(fields) 顺序查询的 Core 结果行"""
+        names, encoded, _ = self._plan(fields)
+        with stage("serialize"):
+            items = [self._encode(dict(zip(names, row)), encoded) for row in rows]
+        incr("rows", len(items))
+        return items
+
+    @staticmethod
+    def _encode(item: Dict[str, Any], encoded: List[Tuple[str, Callable]]) -> Dict[str, Any]:
+        for name, encode in encoded:
+            value = item[name]
+            if value is not None:
+                item[name] = encode(value)
+        return item
+
+
+# 服务器与网络段的默认输出字段与响应模型一致
+SERVER_SERIALIZER = RowSerializer(Server, [name for name in ServerSchema.model_fields if name in Server.__table__.c])
+NETWORK_SEGMENT_SERIALIZER = RowSerializer(
+    NetworkSegment, [name for name in NetworkSegmentSchema.model_fields if name in NetworkSegment.__table__.c]
+)
@@ -1,15 +1,78 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_
+from sqlalchemy.orm import Session, load_only
+from sqlalchemy import bindparam, delete, func, insert, select, true, update
+from sqlalchemy.exc import DisconnectionError, InterfaceError, OperationalError, SQLAlchemyError
+from sqlalchemy.sql import Select
+from pydantic import ValidationError
 from models.server import Server
-from schemas.server import ServerCreate, ServerUpdate, ConflictError
-from schemas.query import ServerQueryConfig, QueryGroup, QueryCondition, SERVER_QUERY_CONFIG
+from schemas.server import ServerCreate, ServerUpdate, ConflictError, PreconditionFailedError, Server as ServerSchema
+from schemas.query import ServerQueryConfig, QueryGroup, QueryCondition, SortField, SERVER_QUERY_CONFIG
 from datetime import datetime
-from typing import Union, Optional
-from schemas.query import FieldType
+from decimal import Decimal
+from typing import Dict, Iterable, List, Set, Tuple, Union, Optional
+from config import Config
+from init.routing import replica_read
+from init.slow_query_log import bind_query, unbind_query
+from init.timing import stage
+from services.query_compiler import SERVER_QUERY_COMPILER
+from services.count_strategy import COUNT_CACHE, get_count_strategy
+from services.facet_service import FACET_CACHE
+from services.capacity_rollup import SERVER_CAPACITY_ROLLUP
+from services.ip_index import SERVER_IP_INDEX
+from services.ngram_index import SERVER_NGRAM_INDEX
+from services.inventory_snapshot import INVENTORY_SNAPSHOT
+from services.keyset import (
+    CURSOR_NEXT, CURSOR_PREV, decode_cursor, encode_cursor, keyset_condition, order_by_clauses, resolve_sort
+)
 import traceback
 
 from schemas.requests import ServerQueryRequest
 
+# 只读路径未指定 fields 时查询的列（与响应模型的字段一致）
+READ_COLUMNS = [name for name in ServerSchema.model_fields if name in Server.__table__.c]
+
+# Agent 采集的字段，由上报接口按 service_tag 批量写入
+AGENT_REPORT_FIELDS = (
+    "agent_name", "agent_ip", "agent_version", "agent_kernel", "agent_os_id", "bios_version", "raid_fw_version"
+)
+
+
+def service_tag_key(service_tag: str) -> str:
+    """service_tag 在大小写不敏感的排序规则（如 MySQL 的 *_ci）下的比较键: 忽略大小写与尾部空格"""
+    return service_tag.rstrip(" ").casefold()
+
+
+def match_service_tags(requested: Iterable[str], found: Iterable[str]) -> Dict[str, str]:
+    """
+    将 IN 查询返回的 service_tag 对应回请求中的 service_tag
+    优先按原值匹配，匹配不到时按 service_tag_key 匹配（数据库按不区分大小写的排序规则返回了不同写法）
+
+    Args:
+        requested: 请求中的 service_tag
+        found: 数据库返回的 service_tag（可重复）
+
+    Returns:
+        dict: {请求中的 service_tag: 数据库中的 service_tag}
+    """
+    exact = set(requested)
+    by_key: Dict[str, List[str]] = {}
+    for tag in exact:
+        by_key.setdefault(service_tag_key(tag), []).append(tag)
+    matched: Dict[str, str] = {}
+    for tag in found:
+        if tag in exact:
+            matched[tag] = tag
+            continue
+        for requested_tag in by_key.get(service_tag_key(tag), []):
+            matched.setdefault(requested_tag, tag)
+    return matched
+
+
+# 连接类错误（数据库不可用）使整次写入失败，由调用方保留数据稍后重试；
+# 其余数据库错误与取值错误只与单条上报有关，逐台重试后丢弃
+TRANSIENT_DB_ERRORS = (OperationalError, InterfaceError, DisconnectionError)
+REPORT_DATA_ERRORS = (SQLAlchemyError, ValueError, OverflowError)
+
+
 class ServerService:
     def __init__(self, db: Session):
         self.db = db
@@ -33,272 +96,712 @@ class ServerService:
             raise ConflictError(f"service_tag '{server.service_tag}' 已存在")
             
         # 创建服务器实例
-        db_server = Server(
-            # 必填字段
-            network_segment_id=server.network_segment_id,
-            service_tag=server.service_tag,
-            
-            # 可选字段
-            description=server.description,
-            name=server.name,
-            agent_name=server.agent_name,
-            primary_ip=server.primary_ip,
-            agent_ip=server.agent_ip,
-            other_ip=server.other_ip,
-            port=server.port,
-            manage_card_ip=server.manage_card_ip,
-            manage_card_mac=server.manage_card_mac,
-            manage_card_version=server.manage_card_version,
-            bios_version=server.bios_version,
-            raid_fw_version=server.raid_fw_version,
-            agent_version=server.agent_version,
-            agent_kernel=server.agent_kernel,
-            use_status=server.use_status,
-            service_level=server.service_level,
-            is_installing=server.is_installing,
-            install_status=server.install_status,
-            lock_status=server.lock_status,
-            is_vm=server.is_vm,
-            real_server_id=server.real_server_id,
-            vm_type=server.vm_type,
-            vm_network_type=server.vm_network_type,
-            instance_name=server.instance_name,
-            cpu_amount=server.cpu_amount,
-            cpu_cores=server.cpu_cores,
-            cpu_kernel_number=server.cpu_kernel_number,
-            ram_amount=server.ram_amount,
-            ram_size=server.ram_size,
-            nic_amount=server.nic_amount,
-            storage_amount=server.storage_amount,
-            storage_info=server.storage_info,
-            filesystem_disk_space=server.filesystem_disk_space,
-            device_id=server.device_id,
-            group_id=server.group_id,
-            agent_os_id=server.agent_os_id,
-            template_id=server.template_id,
-            image_id=server.image_id,
-            owner=server.owner,
-            label=server.label,
-            
-            # 审计信息
-            created_by="system",  # TODO: 从当前用户获取
-            created_date=datetime.now(),
-            last_modified_by="system",  # TODO: 从当前用户获取
-            last_modified_date=datetime.now(),
-            is_valid=True
-        )
+        db_server = Server(**self._new_server_values(server, datetime.now()))
         
         # 保存到数据库
         self.db.add(db_server)
+        self.db.flush()
+        self._sync_search_indexes(db_server)
+        SERVER_CAPACITY_ROLLUP.add(self.db, db_server)
         self.db.commit()
+        self._invalidate_read_caches()
         self.db.refresh(db_server)
         
         return db_server
 
-    def build_query(self, query: Union[QueryGroup, QueryCondition], db_query):
-        print(f"[build_query] called with: query={query}, type={type(query)}")
-        if isinstance(query, QueryCondition):
-            query.validate_field(SERVER_QUERY_CONFIG)
-            field_config = SERVER_QUERY_CONFIG.get_field(query.field)
-            field = getattr(Server, query.field)
-            print(f"[build_query] field={query.field}, field_config.type={field_config.type}, operator={query.operator}, value={query.value}")
-            # 根据字段类型和操作符构建查询
-            if field_config.type == FieldType.STRING:
-                if query.operator == "like":
-                    print(f"[build_query] return: {field}.like(%{query.value}%)")
-                    return field.like(f"%{query.value}%")
-                elif query.operator == "in":
-                    print(f"[build_query] return: {field}.in_({query.value})")
-                    return field.in_(query.value)
-                elif query.operator == "=":
-                    print(f"[build_query] return: {field} == {query.value}")
-                    return field == query.value
-                elif query.operator == "!=":
-                    print(f"[build_query] return: {field} != {query.value}")
-                    return field != query.value
-            
-            elif field_config.type == FieldType.INTEGER:
-                if query.operator == "in":
-                    print(f"[build_query] return: {field}.in_({query.value})")
-                    return field.in_(query.value)
-                elif query.operator == "=":
-                    print(f"[build_query] return: {field} == {query.value}")
-                    return field == query.value
-                elif query.operator == "!=":
-                    print(f"[build_query] return: {field} != {query.value}")
-                    return field != query.value
-                elif query.operator == ">":
-                    print(f"[build_query] return: {field} > {query.value}")
-                    return field > query.value
-                elif query.operator == "<":
-                    print(f"[build_query] return: {field} < {query.value}")
-                    return field < query.value
-                elif query.operator == ">=":
-                    print(f"[build_query] return: {field} >= {query.value}")
-                    return field >= query.value
-                elif query.operator == "<=":
-                    print(f"[build_query] return: {field} <= {query.value}")
-                    return field <= query.value
-
-            elif field_config.type == FieldType.FLOAT:
-                if query.operator == "in":
-                    print(f"[build_query] return: {field}.in_({query.value})")
-                    return field.in_(query.value)
-                elif query.operator == "=":
-                    print(f"[build_query] return: {field} == {query.value}")
-                    return field == query.value
-                elif query.operator == "!=":
-                    print(f"[build_query] return: {field} != {query.value}")
-                    return field != query.value
-                elif query.operator == ">":
-                    print(f"[build_query] return: {field} > {query.value}")
-                    return field > query.value
-                elif query.operator == "<":
-                    print(f"[build_query] return: {field} < {query.value}")
-                    return field < query.value
-                elif query.operator == ">=":
-                    print(f"[build_query] return: {field} >= {query.value}")
-                    return field >= query.value
-                elif query.operator == "<=":
-                    print(f"[build_query] return: {field} <= {query.value}")
-                    return field <= query.value
-
-            elif field_config.type == FieldType.BOOLEAN:
-                if query.operator == "=":
-                    print(f"[build_query] return: {field} == {query.value}")
-                    return field == query.value
-                elif query.operator == "!=":
-                    print(f"[build_query] return: {field} != {query.value}")
-                    return field != query.value
-            
-            elif field_config.type == FieldType.DATETIME:
-                if query.operator == "=":
-                    print(f"[build_query] return: {field} == {query.value}")
-                    return field == query.value
-                elif query.operator == "!=":
-                    print(f"[build_query] return: {field} != {query.value}")
-                    return field != query.value
-                elif query.operator == ">":
-                    print(f"[build_query] return: {field} > {query.value}")
-                    return field > query.value
-                elif query.operator == "<":
-                    print(f"[build_query] return: {field} < {query.value}")
-                    return field < query.value
-                elif query.operator == ">=":
-                    print(f"[build_query] return: {field} >= {query.value}")
-                    return field >= query.value
-                elif query.operator == "<=":
-                    print(f"[build_query] return: {field} <= {query.value}")
-                    return field <= query.value
-            
-            elif field_config.type in [FieldType.ENUM, FieldType.MULTI_SELECT]:
-                if query.operator == "in":
-                    print(f"[build_query] return: {field}.in_({query.value})")
-                    return field.in_(query.value)
-                elif query.operator == "=":
-                    print(f"[build_query] return: {field} == {query.value}")
-                    return field == query.value
-                elif query.operator == "!=":
-                    print(f"[build_query] return: {field} != {query.value}")
-                    return field != query.value
-            # 新增异常抛出
-            raise ValueError(f"不支持的字段类型或操作符: {query.field} {query.operator}")
-        
-        elif isinstance(query, QueryGroup):
-            print(f"[build_query] QueryGroup: {query.conditions}")
-            conditions = []
-            for condition in query.conditions:
-                cond = self.build_query(condition, db_query)
-                print(f"[build_query] QueryGroup condition: {cond}")
-                conditions.append(cond)
-            
-            if query.operator == "AND":
-                print(f"[build_query] return: and_({conditions})")
-                return and_(*conditions)
-            else:  # OR
-                print(f"[build_query] return: or_({conditions})")
-                return or_(*conditions)
-        # 新增异常抛出
-        raise ValueError(f"不支持的查询类型: {type(query)}")
+    def bulk_create_servers(self, items: List[Dict], chunk_size: Optional[int] = None) -> List[Dict]:
+        """
+        批量创建服务器
+        先逐条校验整个请求，再用一条 IN 查询检查所有 service_tag 是否已存在，
+        其余数据按 chunk_size 分批以多行 INSERT 写入；单条数据的校验失败或冲突不影响其他数据
+
+        Args:
+            items: 服务器创建数据列表（与 ServerCreate 字段相同）
+            chunk_size: 每条 INSERT 语句包含的行数，默认取 Config.BULK_CREATE_CHUNK_SIZE
+
+        Returns:
+            list: 与输入顺序一致的结果 [{"index", "service_tag", "status", "id" | "error"}, ...]，
+                  status 为 created / invalid / conflict / error
+        """
+        chunk_size = chunk_size or Config.BULK_CREATE_CHUNK_SIZE
+        results = [{"index": i, "service_tag": item.get("service_tag") if isinstance(item, dict) else None}
+                   for i, item in enumerate(items)]
+
+        # 逐条校验，同一请求内重复的 service_tag 只保留第一条
+        pending: Dict[str, Tuple[int, ServerCreate]] = {}
+        for i, item in enumerate(items):
+            try:
+                server = ServerCreate(**item)
+            except ValidationError as e:
+                errors = "; ".join(f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in e.errors())
+                results[i].update(status="invalid", error=errors)
+                continue
+            except TypeError:
+                results[i].update(status="invalid", error="数据格式错误，应为对象")
+                continue
+            if server.service_tag in pending:
+                results[i].update(status="conflict", error=f"service_tag '{server.service_tag}' 在请求中重复")
+                continue
+            pending[server.service_tag] = (i, server)
+
+        # 一次查询所有已存在的 service_tag（service_tag 没有唯一约束，已存在的值可能重复）
+        if pending:
+            existing = self.db.scalars(select(Server.service_tag).where(Server.service_tag.in_(list(pending))).distinct())
+            for service_tag, stored_tag in match_service_tags(pending, existing).items():
+                i, _ = pending.pop(service_tag)
+                results[i].update(status="conflict", error=f"service_tag '{stored_tag}' 已存在")
+
+        now = datetime.now()
+        values = [(i, self._new_server_values(server, now)) for i, server in pending.values()]
+        created = []
+        for start in range(0, len(values), chunk_size):
+            chunk = self._insert_chunk(values[start:start + chunk_size], results)
+            servers = self._inserted_servers([row for _, row in chunk])
+            for (i, _), db_server in zip(chunk, servers):
+                results[i].update(status="created", id=db_server.id)
+            created += servers
 
-    def get_servers(self, server_query: ServerQueryRequest, sort_field: Optional[str] = None, sort_order: Optional[str] = None):
+        if created:
+            SERVER_NGRAM_INDEX.add_many(self.db, created)
+            SERVER_IP_INDEX.add_many(self.db, created)
+            SERVER_CAPACITY_ROLLUP.add_many(self.db, created)
+        self.db.commit()
+        if created:
+            self._invalidate_read_caches()
+        return results
+
+    def _insert_chunk(self, chunk: List[Tuple[int, Dict]], results: List[Dict]) -> List[Tuple[int, Dict]]:
+        """
+        以一条多行 INSERT 写入一批数据；失败时在保存点内逐行重试，记录失败行的错误
+
+        Returns:
+            list: 写入成功的 (输入位置, 列值)
+        """
+        try:
+            with self.db.begin_nested():
+                self.db.execute(insert(Server).values([row for _, row in chunk]))
+            return chunk
+        except SQLAlchemyError:
+            pass
+
+        inserted = []
+        for i, row in chunk:
+            try:
+                with self.db.begin_nested():
+                    self.db.execute(insert(Server).values(row))
+                inserted.append((i, row))
+            except SQLAlchemyError as e:
+                results[i].update(status="error", error=str(e.orig) if getattr(e, "orig", None) else str(e))
+        return inserted
+
+    def _inserted_servers(self, rows: List[Dict]) -> List[Server]:
+        """
+        取回刚写入的行的ID（MySQL 不支持 RETURNING，按 service_tag 查询）
+
+        Returns:
+            list: 与 rows 顺序一致的服务器对象（不加入会话，仅用于同步索引与汇总）
+        """
+        if not rows:
+            return []
+        ids = dict(self.db.execute(
+            select(Server.service_tag, func.max(Server.id))
+            .where(Server.service_tag.in_([row["service_tag"] for row in rows]))
+            .group_by(Server.service_tag)
+        ).all())
+        return [Server(id=ids[row["service_tag"]], **row) for row in rows]
+
+    def apply_agent_reports(self, reports: Dict[str, Dict], chunk_size: Optional[int] = None) -> Dict[str, int]:
+        """
+        按 service_tag 批量写入 Agent 上报数据（已按主机合并）
+        每批用一条 IN 查询读取现有值，跳过没有变化的行，变化的行以一次 executemany UPDATE 写入，
+        不存在的主机以多行 INSERT 新建；每批在保存点内写入，失败时逐台重试，写入失败的上报被丢弃并计数
+
+        Args:
+            reports: {service_tag: 上报字段}，字段为 AGENT_REPORT_FIELDS 的子集，新建时可包含 network_segment_id
+            chunk_size: 每批处理的主机数，默认取 Config.AGENT_REPORT_FLUSH_CHUNK_SIZE
+
+        Returns:
+            dict: {"updated": 更新行数, "inserted": 新建行数, "unchanged": 无变化行数, "failed": 写入失败而丢弃的主机数}
+        """
+        chunk_size = chunk_size or Config.AGENT_REPORT_FLUSH_CHUNK_SIZE
+        stats = {"updated": 0, "inserted": 0, "unchanged": 0, "failed": 0}
+        tags = list(reports)
+        try:
+            for start in range(0, len(tags), chunk_size):
+                chunk = tags[start:start + chunk_size]
+                try:
+                    with self.db.begin_nested():
+                        chunk_stats = self._apply_report_chunk(chunk, reports)
+                except TRANSIENT_DB_ERRORS:
+                    raise
+                except REPORT_DATA_ERRORS:
+                    # 整批失败时在保存点内逐台重试，写入失败的上报丢弃并计入 failed，不影响其他主机
+                    chunk_stats = {"updated": 0, "inserted": 0, "unchanged": 0}
+                    for tag in chunk:
+                        try:
+                            with self.db.begin_nested():
+                                single = self._apply_report_chunk([tag], reports)
+                        except TRANSIENT_DB_ERRORS:
+                            raise
+                        except REPORT_DATA_ERRORS as e:
+                            stats["failed"] += 1
+                            print(f'ERROR in apply_agent_reports (丢弃 {tag} 的上报):',
+                                  str(getattr(e, 'orig', None) or e))
+                            continue
+                        for name, value in single.items():
+                            chunk_stats[name] += value
+                for name, value in chunk_stats.items():
+                    stats[name] += value
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        if stats["updated"] or stats["inserted"]:
+            self._invalidate_read_caches()
+        return stats
+
+    def _apply_report_chunk(self, chunk: List[str], reports: Dict[str, Dict]) -> Dict[str, int]:
+        """
+        写入一批主机的上报（调用方负责保存点与提交）
+
+        Returns:
+            dict: 本批的 updated / inserted / unchanged 行数
+        """
+        table = Server.__table__
+        stats = {"updated": 0, "inserted": 0, "unchanged": 0}
+        statement = update(table).where(table.c.id == bindparam("b_id")).values(
+            **{name: bindparam(f"b_{name}") for name in AGENT_REPORT_FIELDS},
+            last_modified_by="agent",
+            last_modified_date=bindparam("b_last_modified_date"),
+            version=table.c.version + 1,
+        )
+        now = datetime.now()
+        # 大小写不敏感的排序规则下数据库返回的写法可能与上报不同，按 service_tag_key 对应回上报
+        requested = set(chunk)
+        by_key = {service_tag_key(tag): tag for tag in chunk}
+        changed, found = [], set()
+        for row in self.db.execute(select(table).where(table.c.service_tag.in_(chunk))).mappings():
+            tag = row["service_tag"] if row["service_tag"] in requested else by_key.get(service_tag_key(row["service_tag"]))
+            if tag is None:
+                continue
+            found.add(tag)
+            report = reports[tag]
+            if all(row[name] == value for name, value in report.items() if name in AGENT_REPORT_FIELDS):
+                stats["unchanged"] += 1
+                continue
+            changed.append({**row, **{name: value for name, value in report.items()
+                                      if name in AGENT_REPORT_FIELDS},
+                            "last_modified_date": now, "version": row["version"] + 1})
+
+        if changed:
+            self.db.execute(statement, [
+                {"b_id": row["id"], "b_last_modified_date": now,
+                 **{f"b_{name}": row[name] for name in AGENT_REPORT_FIELDS}}
+                for row in changed
+            ])
+            updated = [Server(**row) for row in changed]
+            SERVER_NGRAM_INDEX.sync_many(self.db, updated)
+            SERVER_IP_INDEX.sync_many(self.db, updated)
+            stats["updated"] += len(changed)
+
+        rows = []
+        for tag in chunk:
+            if tag in found:
+                continue
+            report = reports[tag]
+            server = ServerCreate(service_tag=tag, network_segment_id=report.get("network_segment_id") or 0,
+                                  **{name: report[name] for name in AGENT_REPORT_FIELDS if name in report})
+            rows.append({**self._new_server_values(server, now), "created_by": "agent",
+                         "last_modified_by": "agent"})
+        if rows:
+            self.db.execute(insert(table).values(rows))
+            created = self._inserted_servers(rows)
+            SERVER_NGRAM_INDEX.add_many(self.db, created)
+            SERVER_IP_INDEX.add_many(self.db, created)
+            SERVER_CAPACITY_ROLLUP.add_many(self.db, created)
+            stats["inserted"] += len(rows)
+        return stats
+
+    @staticmethod
+    def _new_server_values(server: ServerCreate, now: datetime) -> Dict:
+        """新建服务器的列值（create_server 与 bulk_create_servers 共用）"""
+        return {
+            # 必填字段
+            "network_segment_id": server.network_segment_id,
+            "service_tag": server.service_tag,
+
+            # 可选字段
+            "description": server.description,
+            "name": server.name,
+            "agent_name": server.agent_name,
+            "primary_ip": server.primary_ip,
+            "agent_ip": server.agent_ip,
+            "other_ip": server.other_ip,
+            "port": server.port,
+            "manage_card_ip": server.manage_card_ip,
+            "manage_card_mac": server.manage_card_mac,
+            "manage_card_version": server.manage_card_version,
+            "bios_version": server.bios_version,
+            "raid_fw_version": server.raid_fw_version,
+            "agent_version": server.agent_version,
+            "agent_kernel": server.agent_kernel,
+            "use_status": server.use_status,
+            "service_level": server.service_level,
+            "is_installing": server.is_installing,
+            "install_status": server.install_status,
+            "lock_status": server.lock_status,
+            "is_vm": server.is_vm,
+            "real_server_id": server.real_server_id,
+            "vm_type": server.vm_type,
+            "vm_network_type": server.vm_network_type,
+            "instance_name": server.instance_name,
+            "cpu_amount": server.cpu_amount,
+            "cpu_cores": server.cpu_cores,
+            "cpu_kernel_number": server.cpu_kernel_number,
+            "ram_amount": server.ram_amount,
+            "ram_size": server.ram_size,
+            "nic_amount": server.nic_amount,
+            "storage_amount": server.storage_amount,
+            "storage_info": server.storage_info,
+            "filesystem_disk_space": server.filesystem_disk_space,
+            "device_id": server.device_id,
+            "group_id": server.group_id,
+            "agent_os_id": server.agent_os_id,
+            "template_id": server.template_id,
+            "image_id": server.image_id,
+            "owner": server.owner,
+            "label": server.label,
+
+            # 审计信息
+            "created_by": "system",  # TODO: 从当前用户获取
+            "created_date": now,
+            "last_modified_by": "system",  # TODO: 从当前用户获取
+            "last_modified_date": now,
+            "is_valid": True,
+        }
+
+    def _sync_search_indexes(self, db_server: Server):
+        """在当前事务内同步 n-gram 与 IP 索引"""
+        SERVER_NGRAM_INDEX.sync(self.db, db_server)
+        SERVER_IP_INDEX.sync(self.db, db_server)
+
+    def _remove_search_indexes(self, server_id: int):
+        """在当前事务内删除 n-gram 与 IP 索引"""
+        SERVER_NGRAM_INDEX.remove(self.db, server_id)
+        SERVER_IP_INDEX.remove(self.db, server_id)
+
+    def _invalidate_read_caches(self):
+        """写操作提交后使按过滤条件缓存的读结果失效"""
+        COUNT_CACHE.invalidate()
+        FACET_CACHE.invalidate()
+        INVENTORY_SNAPSHOT.mark_stale()
+
+    def build_query(self, query: Union[QueryGroup, QueryCondition], db_query=None):
+        """
+        构建查询条件（已绑定参数值）
+
+        Args:
+            query: 查询条件或条件组
+            db_query: 保留参数，兼容旧调用方式
+
+        Returns:
+            SQL条件表达式
+        """
+        plan, params = SERVER_QUERY_COMPILER.compile(query)
+        if plan.clause is None:
+            return true()
+        return plan.clause.params(params)
+
+    @replica_read
+    def get_servers(self, server_query: ServerQueryRequest, sort_field: Optional[str] = None, sort_order: Optional[str] = None,
+                    as_rows: bool = False):
         """
         获取服务器列表，支持条件查询、排序和分页
         
         Args:
-            server_query: 查询参数 (包含查询条件, 分页信息)
+            server_query: 查询参数 (包含查询条件, 分页信息, 排序列表)
             sort_field: 排序字段
             sort_order: 排序顺序 ('asc' 或 'desc')
+            as_rows: 为 True 时通过 Core 查询返回只读的 Row（按字段名访问，不进入会话标识映射），
+                用于只读接口；需要修改对象时使用默认的 ORM 对象
             
         Returns:
-            dict: 包含服务器列表和总数的字典
+            dict: 包含服务器列表、总数及总数统计方式的字典，游标分页时额外包含 next_cursor 和 prev_cursor
         """
+        query_token = None
         try:
-            # 构建基础查询
+            # 构建基础查询（总数统计始终基于该 ORM 查询，只执行 COUNT，不加载对象）
             db_query = self.db.query(Server)
             
-            # 处理查询条件
+            # 处理查询条件（按查询形态缓存编译结果，仅绑定本次请求的参数）
+            count_key = None
             if server_query.query:
-                query_condition = self.build_query(server_query.query, db_query)
-                db_query = db_query.filter(query_condition) # 应用查询条件
+                with stage('compile'):
+                    plan, params = SERVER_QUERY_COMPILER.compile(server_query.query)
+                # 之后执行的慢 SQL 记录本次查询条件
+                query_token = bind_query(server_query.query, plan.shape)
+                if plan.clause is not None:
+                    db_query = db_query.filter(plan.clause).params(params) # 应用查询条件
+                    count_key = plan.key(params)
             
-            # 处理排序
-            # 从方法参数中获取排序信息
-            # sort_field = server_query.sort_field # Remove this line
-            # sort_order = server_query.sort_order # Remove this line
-
+            # 处理排序: 方法参数中的排序字段优先，其次为请求体中的排序列表
+            sort = list(server_query.sort or [])
             if sort_field:
-                # 确保排序字段在 Server 模型中存在
-                if not hasattr(Server, sort_field):
-                     # 可以选择忽略排序，或者抛出错误
-                     print(f"WARNING: Invalid sort field: {sort_field}. Ignoring sorting.")
-                     # raise ValueError(f"不支持的排序字段: {sort_field}") # 如果选择抛出错误
-                     pass # 忽略无效排序字段
-                else:
-                    field = getattr(Server, sort_field)
-                    if sort_order and sort_order.lower() == 'desc':
-                        db_query = db_query.order_by(field.desc())
-                    else:
-                        db_query = db_query.order_by(field.asc())
-            
+                order = 'desc' if sort_order and sort_order.lower() == 'desc' else 'asc'
+                sort.insert(0, SortField(field=sort_field, order=order))
+
+            pagination = server_query.pagination
+            cursor_mode = not server_query.query_all and pagination is not None and pagination.cursor is not None
+            sort_key = resolve_sort(Server, sort) if sort or cursor_mode else []
+            if cursor_mode:
+                cursor_values, direction = decode_cursor(pagination.cursor, sort_key)
+
+            # 只加载请求的字段（以及排序、分页需要的字段）
+            fields = self.resolve_fields(server_query.fields)
+            if fields:
+                load_fields = dict.fromkeys(fields + [name for name, _ in sort_key] + ['version'])
+                db_query = db_query.options(load_only(*[getattr(Server, name) for name in load_fields]))
+            elif as_rows:
+                load_fields = dict.fromkeys(READ_COLUMNS + [name for name, _ in sort_key])
+
+            # 内存快照: 能回答的查询直接在快照上完成过滤、排序和分页，否则回退到 SQL
+            if INVENTORY_SNAPSHOT.enabled and not cursor_mode:
+                paged = not server_query.query_all and pagination is not None
+                with stage('snapshot'):
+                    answered = INVENTORY_SNAPSHOT.query(
+                        self.db, server_query.query, sort_key,
+                        offset=(pagination.page - 1) * pagination.page_size if paged else 0,
+                        limit=pagination.page_size if paged else None)
+                if answered is not None:
+                    servers, total = answered
+                    # 快照上的总数与当前页来自同一份数据，满足各统计方式的要求，count_mode 按请求返回
+                    if server_query.count_mode == "none":
+                        total = None
+                    return {'items': servers, 'total': total, 'count_mode': server_query.count_mode}
+
             # 获取总数
-            total = db_query.count()
+            with stage('count'):
+                total, count_mode = get_count_strategy(server_query.count_mode).count(self.db, db_query, count_key)
+
+            # 只读路径: 之后的分页查询改用 Core select，结果为 Row
+            if as_rows:
+                table = Server.__table__
+                db_query = select(*[table.c[name] for name in load_fields])
+                if count_key is not None:
+                    db_query = db_query.where(plan.clause).params(params)
+
+            # 游标分页
+            if cursor_mode:
+                with stage('fetch'):
+                    servers, next_cursor, prev_cursor = self._page_by_cursor(
+                        db_query, sort_key, cursor_values, direction, pagination.page_size)
+                return {
+                    'items': servers,
+                    'total': total,
+                    'count_mode': count_mode,
+                    'next_cursor': next_cursor,
+                    'prev_cursor': prev_cursor
+                }
+
+            if sort_key:
+                db_query = db_query.order_by(*order_by_clauses(Server, sort_key))
             
             # 处理分页
             if not server_query.query_all and server_query.pagination:
                 db_query = db_query.offset((server_query.pagination.page - 1) * server_query.pagination.page_size).limit(server_query.pagination.page_size)
             
             # 执行查询
-            servers = db_query.all()
+            with stage('fetch'):
+                servers = self._fetch_all(db_query)
             
             return {
                 'items': servers,
-                'total': total
+                'total': total,
+                'count_mode': count_mode
             }
         except Exception as e:
             # 打印详细错误信息
             print('ERROR in get_servers:', str(e))
             print('TRACEBACK:', traceback.format_exc())
             raise # 重新抛出异常，让路由层处理
+        finally:
+            unbind_query(query_token)
 
-    def update_server(self, server_id: int, server: ServerUpdate):
+    @replica_read
+    def get_servers_by_keys(self, key_field: str, keys: List[Union[int, str]], fields: Optional[List[str]] = None,
+                            chunk_size: Optional[int] = None) -> Tuple[Dict[Union[int, str], Server], List[Union[int, str]]]:
+        """
+        按主键或 service_tag 批量获取服务器，分批执行 IN 查询，不统计总数
+
+        Args:
+            key_field: 键字段，id 或 service_tag
+            keys: 键列表（重复的键只查询一次）
+            fields: 需要加载的字段，为空时加载全部字段
+            chunk_size: 每条 IN 查询包含的键数量
+
+        Returns:
+            tuple: ({键: 服务器}（按输入顺序）, [不存在的键])；同一 service_tag 对应多台服务器时取ID最小的一台，
+                数据库排序规则不区分大小写时 service_tag 按 service_tag_key 对应回输入的键
+
+        Raises:
+            ValueError: 键字段或 fields 不合法时抛出
+        """
+        if key_field not in ('id', 'service_tag'):
+            raise ValueError(f"不支持的键字段: {key_field}")
+        column = getattr(Server, key_field)
+        chunk_size = chunk_size or Config.BATCH_GET_CHUNK_SIZE
+        unique_keys = list(dict.fromkeys(keys))
+
+        db_query = self.db.query(Server)
+        fields = self.resolve_fields(fields)
+        if fields:
+            load_fields = dict.fromkeys(fields + [key_field])
+            db_query = db_query.options(load_only(*[getattr(Server, name) for name in load_fields]))
+
+        found = {}
+        for start in range(0, len(unique_keys), chunk_size):
+            chunk = unique_keys[start:start + chunk_size]
+            for server in db_query.filter(column.in_(chunk)).order_by(Server.id):
+                found.setdefault(getattr(server, key_field), server)
+
+        # 返回的 service_tag 可能与输入的写法不同（大小写、尾部空格），按数据库的比较规则对应回输入的键
+        if key_field == 'service_tag':
+            matched = match_service_tags(unique_keys, found)
+            found = {key: found[stored] for key, stored in matched.items()}
+        servers = {key: found[key] for key in unique_keys if key in found}
+        missing = [key for key in unique_keys if key not in found]
+        return servers, missing
+
+    @staticmethod
+    def resolve_fields(fields: Optional[List[str]]) -> Optional[List[str]]:
+        """
+        校验并规范化需要返回的字段列表，id 总是包含在内
+
+        Args:
+            fields: 字段名列表，为空表示返回全部字段
+
+        Returns:
+            list: 去重后的字段列表（id 在首位），未指定时返回 None
+
+        Raises:
+            ValueError: 字段不在 ServerQueryConfig 中时抛出
+        """
+        if not fields:
+            return None
+        for name in fields:
+            SERVER_QUERY_CONFIG.get_field(name)
+        return list(dict.fromkeys(['id'] + list(fields)))
+
+    def _fetch_all(self, db_query) -> list:
+        """执行 ORM 查询（返回模型对象）或 Core select（返回 Row）"""
+        if isinstance(db_query, Select):
+            return self.db.execute(db_query).all()
+        return db_query.all()
+
+    def _page_by_cursor(self, db_query, sort_key, cursor_values, direction, page_size):
+        """
+        按游标获取一页数据
+
+        Args:
+            db_query: 已应用过滤条件的查询（ORM 查询或 Core select）
+            sort_key: 排序键
+            cursor_values: 游标所在行的排序键取值，None 表示第一页
+            direction: 翻页方向 next/prev
+            page_size: 每页条数
+
+        Returns:
+            tuple: (服务器列表, 下一页游标, 上一页游标)
+        """
+        backward = direction == CURSOR_PREV
+        if cursor_values is not None:
+            db_query = db_query.filter(keyset_condition(Server, sort_key, cursor_values, reverse=backward))
+        db_query = db_query.order_by(*order_by_clauses(Server, sort_key, reverse=backward))
+
+        # 多取一条用于判断该方向上是否还有数据
+        servers = self._fetch_all(db_query.limit(page_size + 1))
+        has_more = len(servers) > page_size
+        servers = servers[:page_size]
+        if backward:
+            servers.reverse()
+        if not servers:
+            return servers, None, None
+
+        has_next = has_more if not backward else True
+        has_prev = has_more if backward else cursor_values is not None
+        next_cursor = encode_cursor(sort_key, servers[-1], CURSOR_NEXT) if has_next else None
+        prev_cursor = encode_cursor(sort_key, servers[0], CURSOR_PREV) if has_prev else None
+        return servers, next_cursor, prev_cursor
+
+    def update_servers_by_query(self, query: QueryGroup, server: ServerUpdate, dry_run: bool = False,
+                                max_rows: Optional[int] = None) -> Dict:
+        """
+        按查询条件批量更新服务器（一条 UPDATE ... WHERE）
+
+        Args:
+            query: 查询条件（格式同高级查询）
+            server: 修改的字段（只更新非空值）
+            dry_run: 只统计匹配的服务器数量，不做修改
+            max_rows: 允许修改的最大行数，默认取 Config.BY_QUERY_MAX_ROWS，不能超过 Config.BY_QUERY_MAX_ROWS_LIMIT
+
+        Returns:
+            dict: {"matched": 匹配数量, "affected": 修改行数, "dry_run": 是否试运行}
+
+        Raises:
+            ValueError: 查询条件或修改字段不合法、max_rows 超过上限或匹配数量超过 max_rows 时抛出
+        """
+        # 之后执行的慢 SQL 记录本次查询条件
+        query_token = bind_query(query, SERVER_QUERY_COMPILER.shape_of(query))
+        try:
+            max_rows = self._resolve_max_rows(max_rows)
+            changes = {key: value for key, value in server.model_dump(exclude_unset=True).items() if value is not None}
+            if not changes:
+                raise ValueError("没有提供任何要更新的字段")
+            if "service_tag" in changes:
+                raise ValueError("service_tag 不支持按条件批量修改")
+
+            # 修改的字段涉及搜索索引或容量汇总时，需要锁定并记录匹配的服务器ID
+            track = (SERVER_CAPACITY_ROLLUP.enabled and SERVER_CAPACITY_ROLLUP.affected_by(changes)) or any(
+                index.enabled and any(index.covers(field) for field in changes)
+                for index in (SERVER_NGRAM_INDEX, SERVER_IP_INDEX)
+            )
+            where, params, ids, matched = self._match_by_query(query, max_rows, dry_run, track)
+            if dry_run:
+                return {"matched": matched, "affected": 0, "dry_run": True}
+
+            try:
+                if ids is not None:
+                    SERVER_CAPACITY_ROLLUP.move_where(self.db, where, changes)
+                statement = update(Server.__table__).where(where).values(
+                    **changes,
+                    last_modified_by="system",  # TODO: 从当前用户获取
+                    last_modified_date=datetime.now(),
+                    version=Server.__table__.c.version + 1,
+                )
+                affected = self.db.execute(statement, params).rowcount
+                self._check_max_rows(affected, max_rows)
+                if ids is not None:
+                    SERVER_NGRAM_INDEX.replace_many(self.db, ids, changes)
+                    SERVER_IP_INDEX.replace_many(self.db, ids, changes)
+                self.db.commit()
+            except Exception:
+                self.db.rollback()
+                raise
+            if affected:
+                self._invalidate_read_caches()
+            return {"matched": matched, "affected": affected, "dry_run": False}
+        finally:
+            unbind_query(query_token)
+
+    def delete_servers_by_query(self, query: QueryGroup, dry_run: bool = False,
+                                max_rows: Optional[int] = None) -> Dict:
+        """
+        按查询条件批量删除服务器（一条 DELETE ... WHERE，物理删除）
+
+        Args:
+            query: 查询条件（格式同高级查询）
+            dry_run: 只统计匹配的服务器数量，不做删除
+            max_rows: 允许删除的最大行数，默认取 Config.BY_QUERY_MAX_ROWS，不能超过 Config.BY_QUERY_MAX_ROWS_LIMIT
+
+        Returns:
+            dict: {"matched": 匹配数量, "affected": 删除行数, "dry_run": 是否试运行}
+
+        Raises:
+            ValueError: 查询条件不合法、max_rows 超过上限或匹配数量超过 max_rows 时抛出
+        """
+        # 之后执行的慢 SQL 记录本次查询条件
+        query_token = bind_query(query, SERVER_QUERY_COMPILER.shape_of(query))
+        try:
+            max_rows = self._resolve_max_rows(max_rows)
+            track = SERVER_CAPACITY_ROLLUP.enabled or SERVER_NGRAM_INDEX.enabled or SERVER_IP_INDEX.enabled
+            where, params, ids, matched = self._match_by_query(query, max_rows, dry_run, track)
+            if dry_run:
+                return {"matched": matched, "affected": 0, "dry_run": True}
+
+            try:
+                if ids is not None:
+                    SERVER_CAPACITY_ROLLUP.remove_where(self.db, where)
+                    SERVER_NGRAM_INDEX.remove_many(self.db, ids)
+                    SERVER_IP_INDEX.remove_many(self.db, ids)
+                affected = self.db.execute(delete(Server.__table__).where(where), params).rowcount
+                self._check_max_rows(affected, max_rows)
+                self.db.commit()
+            except Exception:
+                self.db.rollback()
+                raise
+            if affected:
+                self._invalidate_read_caches()
+            return {"matched": matched, "affected": affected, "dry_run": False}
+        finally:
+            unbind_query(query_token)
+
+    def _match_by_query(self, query: QueryGroup, max_rows: int, dry_run: bool, track: bool):
+        """
+        编译批量写操作的查询条件并检查匹配数量
+
+        track 为 True 时锁定匹配的行并返回其ID，写语句改用 id IN (...)：
+        同步索引与汇总需要知道被修改的行，而条件本身可能依赖即将被改写的索引
+
+        Returns:
+            tuple: (条件, 绑定参数, 匹配的ID列表或 None, 匹配数量)
+        """
+        plan, params = SERVER_QUERY_COMPILER.compile(query)
+        where = plan.clause if plan.clause is not None else true()
+        if track and not dry_run:
+            ids = list(self.db.scalars(select(Server.id).where(where).with_for_update(), params))
+            self._check_max_rows(len(ids), max_rows)
+            return Server.id.in_(ids), {}, ids, len(ids)
+
+        matched = self.db.scalar(select(func.count()).select_from(Server).where(where), params)
+        if not dry_run:
+            self._check_max_rows(matched, max_rows)
+        return where, params, None, matched
+
+    @staticmethod
+    def _resolve_max_rows(max_rows: Optional[int]) -> int:
+        """
+        批量写操作允许修改的最大行数: 未指定时取默认值，客户端只能在 Config.BY_QUERY_MAX_ROWS_LIMIT 以内调整
+
+        Raises:
+            ValueError: max_rows 超过 Config.BY_QUERY_MAX_ROWS_LIMIT 时抛出
+        """
+        limit = Config.BY_QUERY_MAX_ROWS_LIMIT
+        if max_rows is not None and max_rows > limit:
+            raise ValueError(f"max_rows 不能超过 {limit}")
+        return min(max_rows or Config.BY_QUERY_MAX_ROWS, limit)
+
+    @staticmethod
+    def _check_max_rows(count: int, max_rows: int):
+        if count > max_rows:
+            raise ValueError(f"匹配的服务器数量 {count} 超过上限 {max_rows}，请缩小查询范围或调大 max_rows")
+
+    @replica_read
+    def get_server_version(self, server_id: int) -> Optional[int]:
+        """只查询服务器的版本号（用于条件请求），服务器不存在时返回 None"""
+        return self.db.scalar(select(Server.version).where(Server.id == server_id))
+
+    def update_server(self, server_id: int, server: ServerUpdate, expected_versions: Optional[Set[int]] = None):
         """
         更新服务器信息
+        提交的值与当前值全部相同时不写入数据库（版本号与最后修改时间保持不变）
         
         Args:
             server_id: 服务器ID
             server: 更新后的服务器信息
+            expected_versions: If-Match 中的版本号，为空时不检查
             
         Returns:
             Server: 更新后的服务器对象
             
         Raises:
             ValueError: 当服务器不存在或 service_tag 已存在时抛出
+            PreconditionFailedError: 服务器当前版本不在 expected_versions 中时抛出
         """
-        # 获取要更新的服务器
-        db_server = self.db.query(Server).filter(Server.id == server_id).first()
+        # 获取要更新的服务器（锁定该行，保证容量汇总的增量基于最新值计算）
+        db_server = self.db.query(Server).filter(Server.id == server_id).with_for_update().first()
         if not db_server:
             raise ValueError(f"服务器ID {server_id} 不存在")
+        self._check_version(db_server, expected_versions)
+        capacity_before = SERVER_CAPACITY_ROLLUP.contribution(db_server)
             
         # 如果要更新 service_tag,需要检查唯一性
         if server.service_tag and server.service_tag != db_server.service_tag:
@@ -316,18 +819,30 @@ class ServerService:
             
         print(f"正在更新服务器 {server_id}，更新字段: {server_data}")  # 添加日志
         
+        changed = False
         for key, value in server_data.items():
-            if value is not None:  # 只更新非空值
+            if value is not None and self._differs(getattr(db_server, key), value):  # 只更新非空且有变化的值
                 setattr(db_server, key, value)
+                changed = True
                 print(f"更新字段 {key}: {value}")  # 添加日志
+
+        if not changed:
+            # 没有任何变化: 不提交事务（只释放行锁），版本号与最后修改时间保持不变
+            print(f"服务器 {server_id} 没有变化，跳过更新")  # 添加日志
+            self.db.expunge(db_server)
+            self.db.rollback()
+            return db_server
             
         # 更新审计信息
         db_server.last_modified_by = "system"  # TODO: 从当前用户获取
         db_server.last_modified_date = datetime.now()
         
         try:
-            # 保存更改
+            # 保存更改（搜索索引在同一事务内同步）
+            self._sync_search_indexes(db_server)
+            SERVER_CAPACITY_ROLLUP.move(self.db, capacity_before, db_server)
             self.db.commit()
+            self._invalidate_read_caches()
             self.db.refresh(db_server)
             print(f"服务器 {server_id} 更新成功")  # 添加日志
             return db_server
@@ -336,23 +851,43 @@ class ServerService:
             print(f"更新服务器 {server_id} 时发生错误: {str(e)}")  # 添加日志
             raise ValueError(f"更新服务器失败: {str(e)}")
 
-    def delete_server(self, server_id: int) -> None:
+    def delete_server(self, server_id: int, expected_versions: Optional[Set[int]] = None) -> None:
         """删除服务器（物理删除）
         
         Args:
             server_id: 服务器ID
+            expected_versions: If-Match 中的版本号，为空时不检查
             
         Raises:
             ValueError: 当服务器不存在时
+            PreconditionFailedError: 服务器当前版本不在 expected_versions 中时抛出
         """
-        server = self.db.query(Server).filter(Server.id == server_id).first()
+        server = self.db.query(Server).filter(Server.id == server_id).with_for_update().first()
         if not server:
             raise ValueError(f"服务器ID {server_id} 不存在")
+        self._check_version(server, expected_versions)
         
         # 物理删除：直接从数据库移除
         self.db.delete(server)
         try:
+            self._remove_search_indexes(server_id)
+            SERVER_CAPACITY_ROLLUP.remove(self.db, server)
             self.db.commit()
+            self._invalidate_read_caches()
         except Exception as e:
             self.db.rollback()
-            raise ValueError(f"删除服务器失败: {str(e)}")
\ No newline at end of file
+            raise ValueError(f"删除服务器失败: {str(e)}")
+
+    def _check_version(self, db_server: Server, expected_versions: Optional[Set[int]]):
+        """If-Match 检查，不满足时释放行锁并抛出 PreconditionFailedError"""
+        if expected_versions is not None and db_server.version not in expected_versions:
+            server_id, version = db_server.id, db_server.version
+            self.db.rollback()
+            raise PreconditionFailedError(f"服务器ID {server_id} 已被修改（当前版本 {version}），请重新获取后再提交")
+
+    @staticmethod
+    def _differs(current, value) -> bool:
+        """提交的值与当前值是否不同（Numeric 列按 Decimal 比较）"""
+        if isinstance(current, Decimal):
+            return current != Decimal(str(value))
+        return current != value
@@ -0,0 +1,145 @@
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Set
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+
+class SideTableIndex(ABC):
+    """
+    独立索引表的公共维护逻辑
+    索引表每行为 (field, <值列>, server_id)，值由子类从字段文本中提取（n-gram 哈希、IP 编码等）；
+    写操作时由 ServerService 在同一事务内同步，子类只需实现 _values 与各自的查询条件
+    """
+
+    # 索引表中保存提取值的列名
+    value_column = ""
+
+    def __init__(self, model, index_model, fields: Sequence[str], enabled: bool = False):
+        self.model = model
+        self.index_model = index_model
+        self.fields = list(fields)
+        self.enabled = enabled
+
+    def covers(self, field: str) -> bool:
+        """字段是否建立了索引"""
+        return field in self.fields
+
+    @abstractmethod
+    def _values(self, text: Optional[str]) -> Set[Hashable]:
+        """从字段文本中提取需要索引的值"""
+
+    def _stored(self, value) -> Hashable:
+        """索引表中读出的值转换为与 _values 相同的类型"""
+        return value
+
+    def _values_of(self, obj) -> Dict[str, Set[Hashable]]:
+        return {field: self._values(getattr(obj, field)) for field in self.fields}
+
+    def _rows(self, field: str, values, object_id: int) -> List[Dict[str, Any]]:
+        return [{"field": field, self.value_column: value, "server_id": object_id} for value in values]
+
+    def sync(self, db: Session, obj) -> None:
+        """
+        同步单个对象的索引（只写入变化的值），需在对象获得ID之后、事务提交之前调用
+
+        Args:
+            db: 数据库会话
+            obj: 服务器对象
+        """
+        if not self.enabled:
+            return
+        index = self.index_model
+        column = getattr(index, self.value_column)
+        existing: Dict[str, Set[Hashable]] = {}
+        for field, value in db.execute(select(index.field, column).where(index.server_id == obj.id)):
+            existing.setdefault(field, set()).add(self._stored(value))
+
+        added = []
+        for field, values in self._values_of(obj).items():
+            stale = existing.get(field, set()) - values
+            if stale:
+                db.execute(delete(index).where(index.server_id == obj.id, index.field == field, column.in_(stale)))
+            added += self._rows(field, values - existing.get(field, set()), obj.id)
+        if added:
+            db.execute(insert(index), added)
+
+    def add_many(self, db: Session, objs) -> None:
+        """
+        为新建的对象批量写入索引（不查询已有索引），需在对象获得ID之后、事务提交之前调用
+
+        Args:
+            db: 数据库会话
+            objs: 新建的服务器对象列表
+        """
+        if not self.enabled:
+            return
+        rows = [row for obj in objs for field, values in self._values_of(obj).items()
+                for row in self._rows(field, values, obj.id)]
+        if rows:
+            db.execute(insert(self.index_model), rows)
+
+    def sync_many(self, db: Session, objs) -> None:
+        """批量同步已有对象的索引（删除这些对象的全部索引后重新写入），需在事务提交前调用"""
+        if not self.enabled or not objs:
+            return
+        self.remove_many(db, [obj.id for obj in objs])
+        self.add_many(db, objs)
+
+    def remove(self, db: Session, object_id: int) -> None:
+        """删除单个对象的索引"""
+        if not self.enabled:
+            return
+        db.execute(delete(self.index_model).where(self.index_model.server_id == object_id))
+
+    def remove_many(self, db: Session, object_ids: Sequence[int]) -> None:
+        """批量删除对象的索引"""
+        if not self.enabled or not object_ids:
+            return
+        db.execute(delete(self.index_model).where(self.index_model.server_id.in_(list(object_ids))))
+
+    def replace_many(self, db: Session, object_ids: Sequence[int], values: Dict[str, Optional[str]]) -> None:
+        """
+        多个对象的若干字段被修改为相同取值时，批量重写这些字段的索引
+
+        Args:
+            db: 数据库会话
+            object_ids: 对象ID列表
+            values: 修改的字段及新值（未建立索引的字段忽略）
+        """
+        fields = [field for field in values if self.covers(field)]
+        if not self.enabled or not fields or not object_ids:
+            return
+        index = self.index_model
+        db.execute(delete(index).where(index.field.in_(fields), index.server_id.in_(list(object_ids))))
+        rows = [row for field in fields for object_id in object_ids
+                for row in self._rows(field, self._values(values[field]), object_id)]
+        if rows:
+            db.execute(insert(index), rows)
+
+    def rebuild(self, db: Session, batch_size: int = 1000) -> int:
+        """
+        全量重建索引（不提交事务）
+
+        Args:
+            db: 数据库会话
+            batch_size: 每批读取/写入的行数
+
+        Returns:
+            int: 写入的索引行数
+        """
+        db.execute(delete(self.index_model))
+        columns = [getattr(self.model, field) for field in self.fields]
+        statement = select(self.model.id, *columns).execution_options(yield_per=batch_size)
+        total, batch = 0, []
+        for row in db.execute(statement):
+            for field, values in self._values_of(row).items():
+                batch += self._rows(field, values, row.id)
+            if len(batch) >= batch_size:
+                db.execute(insert(self.index_model), batch)
+                total += len(batch)
+                batch = []
+        if batch:
+            db.execute(insert(self.index_model), batch)
+            total += len(batch)
+        return total
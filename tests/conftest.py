@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 业务代码以 src 为根目录导入（如 from init.database import Base）
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
@@ -0,0 +1,85 @@
+import pytest
+from pydantic import ValidationError
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from init.database import Base
+from models.server import Server
+from models.server_ip import ServerIp
+from schemas.requests import AgentReport
+from scripts.synthetic_data import load_dataset
+from services.agent_report_buffer import AgentReportBuffer, BufferFull
+from services.capacity_rollup import SERVER_CAPACITY_ROLLUP
+from services.ip_index import SERVER_IP_INDEX
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://")
+    load_dataset(engine, 100)
+    Base.metadata.create_all(engine)
+    session = Session(engine)
+    SERVER_CAPACITY_ROLLUP.enabled = SERVER_IP_INDEX.enabled = True
+    SERVER_CAPACITY_ROLLUP.check(session, repair=True)
+    SERVER_IP_INDEX.rebuild(session)
+    session.commit()
+    yield session
+    session.close()
+    SERVER_CAPACITY_ROLLUP.enabled = SERVER_IP_INDEX.enabled = False
+
+
+def test_reports_are_merged_and_unchanged_rows_dropped(session):
+    first, second = session.scalars(select(Server).where(Server.id.in_([1, 2])).order_by(Server.id))
+    buffer = AgentReportBuffer(lambda: session, autostart=False)
+    buffer.submit([{"service_tag": first.service_tag, "agent_version": "2.0"}])
+    buffer.submit([
+        {"service_tag": first.service_tag, "agent_ip": "10.77.0.1"},
+        {"service_tag": second.service_tag, "agent_version": second.agent_version},
+        {"service_tag": "NEW-HOST", "agent_name": "new-host", "agent_ip": "10.77.0.2"},
+    ])
+    assert buffer.stats()["pending"] == 3 and buffer.stats()["merged"] == 1
+
+    assert buffer.flush(session) == {"updated": 1, "inserted": 1, "unchanged": 1, "failed": 0}
+    assert buffer.stats()["pending"] == 0
+
+    session.expire_all()
+    updated = session.get(Server, 1)
+    assert (updated.agent_version, updated.agent_ip, updated.last_modified_by) == ("2.0", "10.77.0.1", "agent")
+    assert session.get(Server, 2).last_modified_by != "agent"
+    created = session.scalars(select(Server).where(Server.service_tag == "NEW-HOST")).one()
+    assert (created.agent_name, created.network_segment_id) == ("new-host", 0)
+
+    indexed = set(session.execute(select(ServerIp.server_id).where(ServerIp.field == "agent_ip",
+                                                                   ServerIp.ip.isnot(None))).scalars())
+    assert {1, created.id} <= indexed
+    assert SERVER_CAPACITY_ROLLUP.check(session) == []
+
+
+def test_full_buffer_rejects_new_hosts():
+    buffer = AgentReportBuffer(lambda: None, max_pending=2, block_timeout=0.01, autostart=False)
+    buffer.submit([{"service_tag": "A"}, {"service_tag": "B"}])
+    with pytest.raises(BufferFull):
+        buffer.submit([{"service_tag": "C"}])
+    # 已在缓冲区中的主机仍可合并
+    assert buffer.submit([{"service_tag": "A", "agent_version": "1"}]) == 2
+    assert buffer.stats()["rejected"] == 1
+
+
+def test_poison_report_is_dropped(session):
+    good = session.get(Server, 3)
+    buffer = AgentReportBuffer(lambda: session, autostart=False)
+    buffer.submit([{"service_tag": good.service_tag, "agent_version": "9.9"},
+                   {"service_tag": "POISON", "agent_os_id": 2 ** 70}])
+
+    assert buffer.flush(session) == {"updated": 1, "inserted": 0, "unchanged": 0, "failed": 1}
+    assert buffer.stats()["pending"] == 0 and buffer.stats()["failed"] == 1
+    session.expire_all()
+    assert session.get(Server, 3).agent_version == "9.9"
+    assert session.scalars(select(Server).where(Server.service_tag == "POISON")).first() is None
+
+
+def test_report_schema_limits():
+    with pytest.raises(ValidationError):
+        AgentReport(service_tag="A", agent_os_id=2 ** 70)
+    with pytest.raises(ValidationError):
+        AgentReport(service_tag="A", agent_name="x" * 101)
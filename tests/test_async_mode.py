@@ -0,0 +1,114 @@
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip("asgiref")
+pytest.importorskip("aiosqlite")
+pytest.importorskip("greenlet")
+
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from scripts.synthetic_data import load_dataset  # noqa: E402
+
+QUERY = {"query": {"operator": "AND", "conditions": [{"field": "cpu_cores", "operator": ">", "value": 16}]},
+         "pagination": {"page": 1, "page_size": 5}, "sort": [{"field": "ram_size", "order": "desc"}]}
+
+
+def _call(app, method, path, query_string=b"", body=b"", headers=()):
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "method": method, "path": path, "query_string": query_string, "root_path": "",
+             "headers": list(headers), "http_version": "1.1", "scheme": "http"}
+    asyncio.run(app(scope, receive, send))
+    headers = {name.decode(): value.decode() for name, value in messages[0]["headers"]}
+    return messages[0]["status"], headers, b"".join(message.get("body", b"") for message in messages[1:])
+
+
+@pytest.fixture
+def apps(tmp_path, monkeypatch):
+    import asgi
+    from init.async_database import AsyncDatabase
+
+    url = f"sqlite:///{tmp_path / 'async.db'}"
+    engine = create_engine(url)
+    load_dataset(engine, 30)
+    database = AsyncDatabase(url)
+    monkeypatch.setattr("routes.async_read.ASYNC_DB", database)
+    monkeypatch.setattr("routes.server.get_db", sessionmaker(bind=engine))
+    yield asgi.app, asgi.flask_app.test_client()
+    asyncio.run(database.dispose())
+    engine.dispose()
+
+
+def test_async_routes_match_sync_responses(apps):
+    app, client = apps
+    status, _, body = _call(app, "POST", "/api/server/query", body=json.dumps(QUERY).encode())
+    assert status == 200 and json.loads(body) == client.post("/api/server/query", json=QUERY).get_json()
+
+    status, headers, body = _call(app, "GET", "/api/server/", b"page_size=3&fields=name&sort_field=name")
+    expected = client.get("/api/server/?page_size=3&fields=name&sort_field=name")
+    assert status == 200 and json.loads(body) == expected.get_json() and headers["etag"] == expected.headers["ETag"]
+
+    status, headers, _ = _call(app, "GET", "/api/server/3")
+    assert status == 200 and headers["etag"] == '"3-1"'
+    assert _call(app, "GET", "/api/server/3", headers=[(b"if-none-match", b'"3-1"')])[0] == 304
+    assert _call(app, "GET", "/api/server/999")[0] == 404
+    assert _call(app, "POST", "/api/server/query", body=b'{"query": {}}')[0] == 400
+
+    # 未在异步模式中实现的接口交给 Flask
+    status, _, body = _call(app, "GET", "/api/server/fields")
+    assert status == 200 and json.loads(body) == client.get("/api/server/fields").get_json()
+
+
+def test_concurrent_async_reads_share_snapshot(apps, monkeypatch):
+    from models.server import Server
+    from services.inventory_snapshot import InventorySnapshot
+
+    app, client = apps
+    expected = client.post("/api/server/query", json=QUERY).get_json()
+    snapshot = InventorySnapshot(Server, enabled=True)
+    monkeypatch.setattr("services.server_service.INVENTORY_SNAPSHOT", snapshot)
+
+    # 刷新期间等待数据库时会切回事件循环，记录同时在刷新快照的协程数
+    active, overlap, full_load = [0], [0], snapshot._full_load
+
+    def tracked_full_load(db):
+        active[0] += 1
+        overlap[0] = max(overlap[0], active[0])
+        try:
+            full_load(db)
+        finally:
+            active[0] -= 1
+
+    monkeypatch.setattr(snapshot, "_full_load", tracked_full_load)
+
+    async def gather():
+        return await asyncio.gather(*[app_call(app, json.dumps(QUERY).encode()) for _ in range(8)])
+
+    # 同一事件循环上的并发请求: 其他协程必须等待首次加载完成，而不是重入线程锁读到加载到一半的快照
+    results = asyncio.run(gather())
+    assert all(status == 200 and json.loads(body) == expected for status, body in results)
+    assert overlap[0] == 1 and snapshot.refreshes == 1 and snapshot.hits == 8
+
+
+async def app_call(app, body):
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "method": "POST", "path": "/api/server/query", "query_string": b"", "root_path": "",
+             "headers": [], "http_version": "1.1", "scheme": "http"}
+    await app(scope, receive, send)
+    return messages[0]["status"], b"".join(message.get("body", b"") for message in messages[1:])
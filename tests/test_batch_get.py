@@ -0,0 +1,60 @@
+import pytest
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.schema import CreateTable
+
+from app import app
+from models.server import Server
+from scripts.synthetic_data import load_dataset
+from services.server_service import ServerService
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    # service_tag 使用不区分大小写的排序规则（同 MySQL 的 *_ci）
+    ddl = str(CreateTable(Server.__table__).compile(engine))
+    ddl = ddl.replace("service_tag VARCHAR(100) NOT NULL", "service_tag VARCHAR(100) NOT NULL COLLATE NOCASE")
+    with engine.begin() as conn:
+        conn.execute(text(ddl))
+    load_dataset(engine, 40)
+    return engine
+
+
+def tags(engine, *ids):
+    with Session(engine) as db:
+        stored = dict(db.execute(select(Server.id, Server.service_tag).where(Server.id.in_(ids))).all())
+    return [stored[server_id] for server_id in ids]
+
+
+def test_get_by_ids_keeps_order_and_reports_missing(engine):
+    with Session(engine) as db:
+        servers, missing = ServerService(db).get_servers_by_keys("id", [7, 3, 999, 7, 12, 1], chunk_size=2)
+    assert list(servers) == [7, 3, 12, 1] and [server.id for server in servers.values()] == [7, 3, 12, 1]
+    assert missing == [999]
+
+
+def test_get_by_service_tags_matches_database_collation(engine):
+    first, second = tags(engine, 5, 9)
+    keys = [second.lower(), first, "NO-SUCH-TAG", first, second.lower()]
+    with Session(engine) as db:
+        servers, missing = ServerService(db).get_servers_by_keys("service_tag", keys, ["name"], chunk_size=1)
+    # 输入的写法作为结果的键，重复的键只返回一次
+    assert list(servers) == [second.lower(), first] and [server.id for server in servers.values()] == [9, 5]
+    assert missing == ["NO-SUCH-TAG"]
+
+
+def test_batch_get_route(engine, monkeypatch):
+    monkeypatch.setattr("routes.server.get_db", sessionmaker(bind=engine))
+    (tag,) = tags(engine, 4)
+    with app.test_client() as client:
+        body = client.post("/api/server/batch_get", json={"ids": [4, 2, 500], "fields": ["name"]}).get_json()
+        assert list(body["data"]) == ["4", "2"] and body["missing"] == [500]
+        assert set(body["data"]["4"]) == {"id", "name"}
+
+        body = client.post("/api/server/batch_get", json={"service_tags": [tag.lower()]}).get_json()
+        assert body["data"][tag.lower()]["id"] == 4 and body["missing"] == []
+
+        assert client.post("/api/server/batch_get", json={"ids": [1], "service_tags": [tag]}).status_code == 400
+        assert client.post("/api/server/batch_get", json={"ids": [1], "fields": ["nope"]}).status_code == 400
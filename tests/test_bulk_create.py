@@ -0,0 +1,74 @@
+import pytest
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.orm import Session
+
+from init.database import Base
+from models.server import Server
+from models.server_ip import ServerIp
+from scripts.synthetic_data import load_dataset
+from services.capacity_rollup import SERVER_CAPACITY_ROLLUP
+from services.ip_index import SERVER_IP_INDEX
+from services.server_service import ServerService, match_service_tags
+
+
+@pytest.fixture
+def service():
+    engine = create_engine("sqlite://")
+    load_dataset(engine, 200)
+    Base.metadata.create_all(engine)
+    session = Session(engine)
+    SERVER_CAPACITY_ROLLUP.enabled = SERVER_IP_INDEX.enabled = True
+    SERVER_CAPACITY_ROLLUP.check(session, repair=True)
+    SERVER_IP_INDEX.rebuild(session)
+    session.commit()
+    yield ServerService(session)
+    session.close()
+    SERVER_CAPACITY_ROLLUP.enabled = SERVER_IP_INDEX.enabled = False
+
+
+def test_bulk_create_reports_each_item(service):
+    db = service.db
+    existing_tag = db.scalar(select(Server.service_tag).where(Server.id == 1))
+    items = [
+        {"service_tag": f"BULK-{i}", "network_segment_id": 1, "primary_ip": f"10.250.0.{i}", "ram_size": 64}
+        for i in range(7)
+    ]
+    items += [
+        {"service_tag": existing_tag, "network_segment_id": 1},
+        {"service_tag": "BULK-0", "network_segment_id": 1},
+        {"service_tag": "BULK-BAD", "network_segment_id": 1, "cpu_cores": "many"},
+        {"service_tag": "BULK-NULL"},
+        "not-an-object",
+    ]
+
+    results = service.bulk_create_servers(items, chunk_size=3)
+
+    assert [result["status"] for result in results] == \
+        ["created"] * 7 + ["conflict", "conflict", "invalid", "error", "invalid"]
+    assert "cpu_cores" in results[9]["error"]
+    for item, result in zip(items[:7], results[:7]):
+        assert db.get(Server, result["id"]).service_tag == item["service_tag"]
+
+    indexed = db.scalar(select(func.count()).select_from(ServerIp).where(
+        ServerIp.server_id.in_([result["id"] for result in results[:7]])))
+    assert indexed == 7
+    assert SERVER_CAPACITY_ROLLUP.check(db) == []
+
+
+def test_bulk_create_with_duplicate_existing_tags(service):
+    db = service.db
+    template = {column: value for column, value in vars(db.get(Server, 1)).items() if column in Server.__table__.c}
+    for _ in range(2):
+        db.execute(insert(Server.__table__), {**template, "id": None, "service_tag": "dup"})
+    db.commit()
+
+    results = service.bulk_create_servers([
+        {"service_tag": "dup", "network_segment_id": 1},
+        {"service_tag": "BULK-NEW", "network_segment_id": 1},
+    ])
+    assert [result["status"] for result in results] == ["conflict", "created"]
+
+
+def test_match_service_tags_ignores_case():
+    # 大小写不敏感的排序规则下，数据库可能返回与请求写法不同的值
+    assert match_service_tags(["abc", "XYZ", "new"], ["ABC", "XYZ", "XYZ"]) == {"abc": "ABC", "XYZ": "XYZ"}
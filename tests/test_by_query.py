@@ -0,0 +1,104 @@
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from config import Config
+from init.database import Base
+from models.server import Server
+from models.server_ip import ServerIp
+from models.server_ngram import ServerNgram
+from schemas.query import QueryGroup
+from schemas.server import ServerUpdate
+from scripts.synthetic_data import load_dataset
+from services.capacity_rollup import SERVER_CAPACITY_ROLLUP
+from services.ip_index import SERVER_IP_INDEX
+from services.ngram_index import SERVER_NGRAM_INDEX
+from services.server_service import ServerService
+
+STRUCTURES = (SERVER_CAPACITY_ROLLUP, SERVER_IP_INDEX, SERVER_NGRAM_INDEX)
+
+
+@pytest.fixture(params=[False, True], ids=["plain", "maintained"])
+def service(request):
+    engine = create_engine("sqlite://")
+    load_dataset(engine, 300)
+    Base.metadata.create_all(engine)
+    session = Session(engine)
+    for structure in STRUCTURES:
+        structure.enabled = request.param
+    if request.param:
+        SERVER_CAPACITY_ROLLUP.check(session, repair=True)
+        SERVER_IP_INDEX.rebuild(session)
+        SERVER_NGRAM_INDEX.rebuild(session)
+        session.commit()
+    yield ServerService(session)
+    session.close()
+    for structure in STRUCTURES:
+        structure.enabled = False
+
+
+def group(*conditions):
+    return QueryGroup(operator="AND", conditions=[
+        {"field": field, "operator": operator, "value": value} for field, operator, value in conditions
+    ])
+
+
+def index_rows(db, model, key):
+    return set(db.execute(select(model.field, getattr(model, key), model.server_id)))
+
+
+def test_update_and_delete_by_query(service):
+    db = service.db
+    query = group(("cpu_cores", ">", 16))
+    matched = db.scalar(select(func.count()).select_from(Server).where(Server.cpu_cores > 16))
+    assert 0 < matched < 300
+
+    changes = ServerUpdate(owner="ops-team", label="by-query", primary_ip="10.99.0.1", ram_size=512)
+    assert service.update_servers_by_query(query, changes, dry_run=True) == \
+        {"matched": matched, "affected": 0, "dry_run": True}
+    with pytest.raises(ValueError):
+        service.update_servers_by_query(query, changes, max_rows=matched - 1)
+    assert db.scalar(select(func.count()).select_from(Server).where(Server.owner == "ops-team")) == 0
+
+    assert service.update_servers_by_query(query, changes)["affected"] == matched
+    updated = db.scalars(select(Server).where(Server.label == "by-query")).all()
+    assert len(updated) == matched
+    assert all(server.owner == "ops-team" and server.last_modified_by == "system" for server in updated)
+
+    with pytest.raises(ValueError):
+        service.update_servers_by_query(query, ServerUpdate(service_tag="same"))
+
+    deleted = service.delete_servers_by_query(group(("owner", "like", "%ops-te%"), ("ram_size", ">=", 512)))
+    assert deleted == {"matched": matched, "affected": matched, "dry_run": False}
+    assert db.scalar(select(func.count()).select_from(Server)) == 300 - matched
+
+    if SERVER_CAPACITY_ROLLUP.enabled:
+        assert SERVER_CAPACITY_ROLLUP.check(db) == []
+        for index, model, key in ((SERVER_IP_INDEX, ServerIp, "ip"), (SERVER_NGRAM_INDEX, ServerNgram, "gram")):
+            maintained = index_rows(db, model, key)
+            index.rebuild(db)
+            assert maintained == index_rows(db, model, key)
+
+
+def test_max_rows_cannot_exceed_limit(monkeypatch):
+    from app import app
+
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    load_dataset(engine, 100)
+    monkeypatch.setattr("routes.server.get_db", sessionmaker(bind=engine))
+    matched = Session(engine).scalar(select(func.count()).select_from(Server).where(Server.cpu_cores > 16))
+    assert matched > 1
+    monkeypatch.setattr(Config, "BY_QUERY_MAX_ROWS", matched - 1)
+    monkeypatch.setattr(Config, "BY_QUERY_MAX_ROWS_LIMIT", matched)
+    body = {"query": {"operator": "AND", "conditions": [{"field": "cpu_cores", "operator": ">", "value": 16}]}}
+
+    with app.test_client() as client:
+        # 超过默认上限时拒绝；客户端可在硬上限以内调大 max_rows，超过硬上限直接拒绝（试运行也一样）
+        assert client.delete("/api/server/by_query", json=body).status_code == 400
+        for dry_run in (True, False):
+            response = client.delete("/api/server/by_query", json={**body, "max_rows": matched + 1, "dry_run": dry_run})
+            assert response.status_code == 400 and f"max_rows 不能超过 {matched}" in response.get_json()["message"]
+        response = client.delete("/api/server/by_query", json={**body, "max_rows": matched})
+        assert response.status_code == 200 and response.get_json()["data"]["affected"] == matched
+    assert Session(engine).scalar(select(func.count()).select_from(Server)) == 100 - matched
@@ -0,0 +1,50 @@
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from init.database import Base
+from models.server import Server
+from models.server_capacity_rollup import ServerCapacityRollup
+from schemas.server import ServerUpdate
+from scripts.synthetic_data import load_dataset
+from services.capacity_rollup import SERVER_CAPACITY_ROLLUP
+from services.server_service import ServerService
+
+
+@pytest.fixture
+def service():
+    engine = create_engine("sqlite://")
+    load_dataset(engine, 500)
+    Base.metadata.create_all(engine)
+    session = Session(engine)
+    SERVER_CAPACITY_ROLLUP.enabled = True
+    SERVER_CAPACITY_ROLLUP.check(session, repair=True)
+    session.commit()
+    yield ServerService(session)
+    session.close()
+    SERVER_CAPACITY_ROLLUP.enabled = False
+
+
+def test_deltas_stay_consistent_with_full_recompute(service):
+    db = service.db
+    server = db.get(Server, 3)
+    service.update_server(3, ServerUpdate(ram_size=server.ram_size + 64, cpu_cores=server.cpu_cores + 8))
+    service.update_server(4, ServerUpdate(label="capacity-test", use_status="maintenance"))
+    service.update_server(5, ServerUpdate(label="capacity-test", use_status="maintenance"))
+    service.delete_server(4)
+    service.delete_server(6)
+    assert SERVER_CAPACITY_ROLLUP.check(db) == []
+
+    [row] = SERVER_CAPACITY_ROLLUP.summary(db, ["label"], {"label": "capacity-test"})
+    assert row["server_count"] == 1
+    assert SERVER_CAPACITY_ROLLUP.summary(db, ["label", "use_status"]) == \
+        SERVER_CAPACITY_ROLLUP.summary(db, ["label", "use_status"], source="server")
+
+
+def test_check_detects_and_repairs_drift(service):
+    db = service.db
+    db.execute(ServerCapacityRollup.__table__.update().values(server_count=ServerCapacityRollup.server_count + 1))
+    assert len(SERVER_CAPACITY_ROLLUP.check(db, repair=True)) > 0
+    assert SERVER_CAPACITY_ROLLUP.check(db) == []
+    with pytest.raises(ValueError):
+        SERVER_CAPACITY_ROLLUP.summary(db, ["owner"])
@@ -0,0 +1,58 @@
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import app
+from init.database import Base
+from scripts.synthetic_data import load_dataset
+
+
+@pytest.fixture
+def client(monkeypatch):
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    load_dataset(engine, 20)
+    Base.metadata.create_all(engine)
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2].split()[0]))
+    monkeypatch.setattr("routes.server.get_db", sessionmaker(bind=engine))
+    with app.test_client() as client:
+        client.statements = statements
+        yield client
+
+
+def test_etag_and_if_none_match(client):
+    response = client.get("/api/server/3")
+    etag = response.headers["ETag"]
+    assert response.status_code == 200 and etag == '"3-1"'
+    assert response.get_json()["data"]["version"] == 1
+
+    client.statements.clear()
+    response = client.get("/api/server/3", headers={"If-None-Match": etag})
+    assert response.status_code == 304 and response.data == b""
+    assert client.statements == ["SELECT"]
+
+    projected = client.get("/api/server/3?fields=name", headers={"If-None-Match": etag})
+    assert projected.status_code == 200 and projected.headers["ETag"] != etag
+
+    listing = client.get("/api/server/?page_size=5")
+    assert client.get("/api/server/?page_size=5",
+                      headers={"If-None-Match": listing.headers["ETag"]}).status_code == 304
+
+
+def test_if_match_and_noop_updates(client):
+    current = client.get("/api/server/4").get_json()["data"]
+
+    client.statements.clear()
+    response = client.put("/api/server/4", json={"name": current["name"], "ram_size": current["ram_size"]},
+                          headers={"If-Match": '"4-1"'})
+    assert response.status_code == 200 and response.headers["ETag"] == '"4-1"'
+    assert "UPDATE" not in client.statements
+    assert response.get_json()["data"]["last_modified_date"] == current["last_modified_date"]
+
+    response = client.put("/api/server/4", json={"name": "renamed"}, headers={"If-Match": '"4-1"'})
+    assert response.status_code == 200 and response.headers["ETag"] == '"4-2"'
+
+    assert client.put("/api/server/4", json={"name": "again"}, headers={"If-Match": '"4-1"'}).status_code == 412
+    assert client.delete("/api/server/4", headers={"If-Match": '"4-1"'}).status_code == 412
+    assert client.delete("/api/server/4", headers={"If-Match": '"4-2"'}).status_code == 200
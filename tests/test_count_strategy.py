@@ -0,0 +1,81 @@
+import json
+
+import pytest
+from sqlalchemy import bindparam, create_engine, func, select
+from sqlalchemy.orm import Session
+
+from models.server import Server
+from schemas.query import QueryGroup
+from scripts.synthetic_data import load_dataset
+from services.count_strategy import (COUNT_CACHE, CachedCount, CountStrategy, EstimateCount, ExactCount,
+                                     get_count_strategy)
+from services.server_service import ServerService
+
+ROWS = 500
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    load_dataset(engine, ROWS)
+    session = Session(engine)
+    COUNT_CACHE.invalidate()
+    yield session
+    session.close()
+    COUNT_CACHE.invalidate()
+
+
+def filtered(db, cores=16):
+    return db.query(Server).filter(Server.cpu_cores > bindparam("cores")).params(cores=cores)
+
+
+def matched(db, cores=16):
+    return db.scalar(select(func.count()).select_from(Server).where(Server.cpu_cores > cores))
+
+
+def test_registered_strategies(db):
+    assert get_count_strategy("exact").count(db, filtered(db), "k") == (matched(db), "exact")
+    assert get_count_strategy("none").count(db, filtered(db), "k") == (None, "none")
+    with pytest.raises(ValueError):
+        get_count_strategy("approx")
+    with pytest.raises(TypeError):
+        CountStrategy()
+
+
+def test_cached_count_invalidated_by_write(db):
+    strategy = CachedCount(COUNT_CACHE)
+    expected = matched(db)
+    assert strategy.count(db, filtered(db), "cores>16") == (expected, "exact")
+    assert strategy.count(db, filtered(db), "cores>16") == (expected, "cached")
+
+    # 写操作提交后缓存失效，下一次重新精确统计
+    query = QueryGroup(operator="AND", conditions=[{"field": "cpu_cores", "operator": ">", "value": 16}])
+    ServerService(db).delete_servers_by_query(query, max_rows=ROWS)
+    assert strategy.count(db, filtered(db), "cores>16") == (0, "exact")
+
+
+def test_estimate_count(db):
+    # 数据量不超过抽样大小时直接精确统计
+    assert EstimateCount(sample_size=ROWS).count(db, filtered(db), "k") == (matched(db), "exact")
+
+    strategy = EstimateCount(sample_size=100)
+    assert strategy.count(db, filtered(db), None) == (ROWS, "estimate")
+    total, mode = strategy.count(db, filtered(db), "k")
+    assert mode == "estimate" and 0 <= total <= ROWS
+
+
+def test_estimate_falls_back_to_sampling_without_planner(db, monkeypatch):
+    # 执行计划不可用（读取失败）时返回 None，由抽样估算兜底
+    assert EstimateCount()._planner_rows(db, filtered(db)) is None
+
+    executed = []
+
+    class Connection:
+        def exec_driver_sql(self, sql, params):
+            executed.append((sql, params))
+            return type("Result", (), {"scalar": lambda self: json.dumps([{"Plan": {"Plan Rows": 42}}])})()
+
+    monkeypatch.setattr(db, "connection", lambda: Connection())
+    assert EstimateCount()._planner_rows(db, filtered(db, cores=24)) == 42
+    sql, params = executed[0]
+    assert sql.startswith("EXPLAIN (FORMAT JSON) ") and params["cores"] == 24
@@ -0,0 +1,38 @@
+import pytest
+from sqlalchemy import create_engine, exc, text
+
+from app import app
+from init import database
+from init.pool import TimedQueuePool, pool_stats
+
+
+def test_session_is_scoped_to_app_context():
+    with app.app_context():
+        db = database.get_db()
+        assert database.get_db() is db
+    # 应用上下文结束后会话已关闭，再次获取得到新会话
+    with app.app_context():
+        assert database.get_db() is not db
+    outside = database.get_db()
+    assert outside is not database.get_db()
+    outside.close()
+
+
+def test_pool_stats_record_waits_and_timeouts(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=TimedQueuePool,
+                           pool_size=1, max_overflow=0, pool_timeout=0.05)
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+        assert pool_stats(engine.pool)["checked_out"] == 1
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+
+    stats = pool_stats(engine.pool)
+    assert (stats["checked_out"], stats["checkouts"], stats["timeouts"]) == (0, 2, 1)
+    assert stats["wait_ms_max"] >= 50
+
+
+def test_pool_endpoint():
+    with app.test_client() as client:
+        data = client.get("/api/system/pool").get_json()["data"]
+    assert data == pool_stats(database.engine.pool)
@@ -0,0 +1,81 @@
+import csv
+import io
+import json
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import app
+from models.server import Server
+from scripts.synthetic_data import load_dataset
+
+ROWS = 120
+QUERY = {"operator": "AND", "conditions": [{"field": "cpu_cores", "operator": ">", "value": 16}]}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    load_dataset(engine, ROWS)
+    sessions = []
+
+    class TrackedSession(Session):
+        closed = False
+
+        def close(self):
+            self.closed = True
+            super().close()
+
+    def get_db():
+        sessions.append(TrackedSession(engine))
+        return sessions[-1]
+
+    monkeypatch.setattr("routes.server.get_db", get_db)
+    with app.test_client() as client:
+        client.engine, client.sessions = engine, sessions
+        yield client
+
+
+def expected_ids(engine, *order_by):
+    with Session(engine) as db:
+        statement = select(Server.id).where(Server.cpu_cores > 16).order_by(*order_by)
+        return list(db.scalars(statement))
+
+
+def test_export_ndjson_streams_batches_and_closes_session(client):
+    response = client.post("/api/server/export", json={"query": QUERY, "batch_size": 10}, buffered=False)
+    assert response.status_code == 200 and response.mimetype == "application/x-ndjson"
+    assert response.headers["Content-Disposition"] == "attachment; filename=servers.ndjson"
+
+    # 会话在数据全部输出后才关闭
+    chunks = []
+    for chunk in response.response:
+        assert not client.sessions[0].closed
+        chunks.append(chunk.decode() if isinstance(chunk, bytes) else chunk)
+    response.close()
+    assert client.sessions[0].closed
+
+    ids = expected_ids(client.engine, Server.id)
+    rows = [json.loads(line) for chunk in chunks for line in chunk.splitlines()]
+    assert sorted(row["id"] for row in rows) == ids
+    # 每批最多 batch_size 行，逐批输出
+    sizes = [len(chunk.splitlines()) for chunk in chunks]
+    assert sizes == [10] * (len(ids) // 10) + ([len(ids) % 10] if len(ids) % 10 else [])
+
+
+def test_export_csv_sorted(client):
+    body = {"query": QUERY, "format": "csv", "sort": [{"field": "ram_size", "order": "desc"}]}
+    response = client.post("/api/server/export", json=body)
+    assert response.status_code == 200 and response.mimetype == "text/csv"
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert [int(row["id"]) for row in rows] == expected_ids(client.engine, Server.ram_size.desc(), Server.id.desc())
+    assert all(session.closed for session in client.sessions)
+
+
+def test_export_rejects_invalid_request(client):
+    assert client.post("/api/server/export", json={"query": QUERY, "batch_size": 0}).status_code == 400
+    bad_query = {"operator": "AND", "conditions": [{"field": "unknown", "operator": "=", "value": 1}]}
+    assert client.post("/api/server/export", json={"query": bad_query}).status_code == 400
+    assert all(session.closed for session in client.sessions)
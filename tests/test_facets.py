@@ -0,0 +1,42 @@
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+
+from models.server import Server
+from schemas.query import QueryGroup
+from scripts.synthetic_data import load_dataset
+from services.facet_service import FACET_CACHE, FacetService
+
+FIELDS = ["use_status", "service_level", "is_valid", "label"]
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    load_dataset(engine, 1000)
+    FACET_CACHE.invalidate()
+    with Session(engine) as session:
+        yield session
+
+
+def test_facets_match_group_by(db):
+    query = QueryGroup(operator="AND", conditions=[{"field": "is_vm", "operator": "=", "value": 1}])
+    facets = FacetService(db).get_facets(query, FIELDS)
+
+    assert list(facets) == FIELDS
+    for name in FIELDS:
+        column = getattr(Server, name)
+        expected = dict(db.execute(select(column, func.count()).where(Server.is_vm == 1).group_by(column)).all())
+        assert {bucket["value"]: bucket["count"] for bucket in facets[name]} == expected
+        counts = [bucket["count"] for bucket in facets[name]]
+        assert counts == sorted(counts, reverse=True)
+
+    hits = FACET_CACHE.hits
+    assert FacetService(db).get_facets(query, FIELDS) == facets
+    assert FACET_CACHE.hits == hits + 1
+
+
+def test_facets_reject_unsupported_fields(db):
+    for fields in ([], ["description"], ["created_date"], ["no_such_field"]):
+        with pytest.raises(ValueError):
+            FacetService(db).get_facets(None, fields)
@@ -0,0 +1,58 @@
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import app
+from models.server import Server
+from scripts.synthetic_data import load_dataset
+
+
+@pytest.fixture
+def client(monkeypatch):
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    load_dataset(engine, 30)
+    monkeypatch.setattr("routes.server.get_db", sessionmaker(bind=engine))
+    with app.test_client() as client:
+        client.engine = engine
+        yield client
+
+
+def test_get_with_fields(client):
+    data = client.get("/api/server/3?fields=name,ram_size").get_json()["data"]
+    with Session(client.engine) as db:
+        server = db.get(Server, 3)
+    assert data == {"id": 3, "name": server.name, "ram_size": server.ram_size}
+
+    # id 即使未请求也会返回，重复的字段只返回一次
+    assert client.get("/api/server/3?fields=name,name").get_json()["data"] == {"id": 3, "name": server.name}
+    assert "owner" in client.get("/api/server/3").get_json()["data"]
+
+
+def test_list_with_fields_loads_sort_key_without_returning_it(client):
+    body = client.get("/api/server/?page_size=5&fields=name&sort_field=ram_size&sort_order=desc").get_json()
+    with Session(client.engine) as db:
+        expected = db.execute(select(Server.id, Server.name).order_by(Server.ram_size.desc(), Server.id.desc())
+                              .limit(5)).all()
+    assert body["data"] == [{"id": id, "name": name} for id, name in expected]
+    assert body["total"] == 30
+
+
+def test_query_with_fields(client):
+    request = {"query": {"operator": "AND", "conditions": [{"field": "cpu_cores", "operator": ">", "value": 16}]},
+               "pagination": {"page": 1, "page_size": 50}, "sort": [{"field": "cpu_cores", "order": "asc"}],
+               "fields": ["owner"]}
+    body = client.post("/api/server/query", json=request).get_json()
+    with Session(client.engine) as db:
+        expected = db.execute(select(Server.id, Server.owner).where(Server.cpu_cores > 16)
+                              .order_by(Server.cpu_cores, Server.id)).all()
+    assert body["data"] == [{"id": id, "owner": owner} for id, owner in expected]
+
+
+def test_unknown_field_is_rejected(client):
+    request = {"query": {"operator": "AND", "conditions": []}, "pagination": {"page": 1, "page_size": 10},
+               "fields": ["no_such_field"]}
+    for response in (client.get("/api/server/3?fields=name,no_such_field"),
+                     client.get("/api/server/?fields=no_such_field"),
+                     client.post("/api/server/query", json=request)):
+        assert response.status_code == 400 and "no_such_field" in response.get_json()["message"]
@@ -0,0 +1,49 @@
+import json
+
+from sqlalchemy import Index, create_engine
+
+from models.server import Server
+from schemas.query import QueryGroup
+from scripts import index_advisor
+from services.query_compiler import SERVER_QUERY_COMPILER
+
+
+def write_usage(path):
+    query = QueryGroup(operator="AND", conditions=[{"field": "owner", "operator": "=", "value": "user001"},
+                                                   {"field": "ram_size", "operator": ">", "value": 128}])
+    shape = json.loads(json.dumps(SERVER_QUERY_COMPILER.shape_of(query), default=str))
+    path.write_text(json.dumps([{"shape": shape, "count": 100}]), encoding="utf-8")
+
+
+def run(argv, capsys):
+    index_advisor.main(argv + ["--json"])
+    return json.loads(capsys.readouterr().out)
+
+
+def test_second_run_does_not_repeat_indexes(tmp_path, capsys):
+    usage, versions = tmp_path / "usage.json", tmp_path / "versions"
+    write_usage(usage)
+
+    first = run(["--usage", str(usage), "--migration-dir", str(versions)], capsys)
+    names = {proposal["name"] for proposal in first["proposals"]}
+    assert names == {"ix_server_service_tag", "ix_server_owner_ram_size"}
+
+    # 第一次生成的迁移中的索引不再建议，也不会生成第二个迁移
+    second = run(["--usage", str(usage), "--migration-dir", str(versions)], capsys)
+    assert second["proposals"] == [] and "migration" not in second
+    assert len(list(versions.glob("*.py"))) == 1
+
+
+def test_indexes_reflected_from_database(tmp_path, capsys):
+    usage = tmp_path / "usage.json"
+    write_usage(usage)
+    expected = {tuple(proposal["columns"]) for proposal in run(["--usage", str(usage)], capsys)["proposals"]}
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'live.db'}")
+    Server.__table__.create(engine)
+    for columns in expected:
+        Index(f"ix_live_{'_'.join(columns)}", *[Server.__table__.c[column] for column in columns]).create(engine)
+    engine.dispose()
+
+    reflected = run(["--usage", str(usage), "--database-url", f"sqlite:///{tmp_path / 'live.db'}"], capsys)
+    assert reflected["proposals"] == []
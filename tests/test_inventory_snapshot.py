@@ -0,0 +1,118 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+from models.server import Server
+from schemas.requests import ServerQueryRequest
+from schemas.server import ServerUpdate
+from scripts.synthetic_data import generate_servers, load_dataset
+from services.inventory_snapshot import INVENTORY_SNAPSHOT, InventorySnapshot, np
+from services.server_service import ServerService
+
+pytestmark = pytest.mark.skipif(np is None, reason="numpy 未安装")
+
+QUERIES = [
+    {"operator": "AND", "conditions": []},
+    {"operator": "AND", "conditions": [{"field": "use_status", "operator": "=", "value": "in_use"},
+                                       {"field": "service_level", "operator": ">=", "value": 2}]},
+    {"operator": "OR", "conditions": [{"field": "name", "operator": "like", "value": "db-bj"},
+                                      {"field": "network_segment_id", "operator": "in", "value": [1, 2, 3]}]},
+    {"operator": "AND", "conditions": [{"field": "ram_size", "operator": ">", "value": 256},
+                                       {"field": "cpu_cores", "operator": "<=", "value": 64},
+                                       {"field": "is_valid", "operator": "=", "value": True}]},
+    {"operator": "AND", "conditions": [{"field": "label", "operator": "!=", "value": "bu-00"},
+                                       {"field": "description", "operator": "like", "value": "pay%log"}]},
+]
+SORTS = [None, [{"field": "name", "order": "desc"}],
+         [{"field": "service_level", "order": "asc"}, {"field": "created_date", "order": "desc"}]]
+
+
+@pytest.fixture
+def service():
+    engine = create_engine("sqlite://")
+    load_dataset(engine, 2000)
+    session = Session(engine)
+    INVENTORY_SNAPSHOT.__init__(Server, enabled=True, max_staleness=3600)
+    yield ServerService(session)
+    session.close()
+    INVENTORY_SNAPSHOT.__init__(Server, enabled=False)
+
+
+def _run(service, query, sort, use_snapshot, page=2):
+    INVENTORY_SNAPSHOT.enabled = use_snapshot
+    request = ServerQueryRequest(query=query, sort=sort, pagination={"page": page, "page_size": 25})
+    result = service.get_servers(request)
+    return [s.id for s in result['items']], result['total']
+
+
+@pytest.mark.parametrize("sort", SORTS)
+@pytest.mark.parametrize("query", QUERIES)
+def test_snapshot_matches_sql(service, query, sort):
+    expected = _run(service, query, sort, use_snapshot=False)
+    hits = INVENTORY_SNAPSHOT.hits
+    assert _run(service, query, sort, use_snapshot=True) == expected
+    assert INVENTORY_SNAPSHOT.hits == hits + 1
+
+
+@pytest.mark.parametrize("count_mode", ["exact", "none", "estimate", "cached"])
+def test_snapshot_reports_requested_count_mode(service, count_mode):
+    INVENTORY_SNAPSHOT.enabled = True
+    hits = INVENTORY_SNAPSHOT.hits
+    request = ServerQueryRequest(query=QUERIES[1], pagination={"page": 1, "page_size": 25}, count_mode=count_mode)
+    result = service.get_servers(request)
+    assert INVENTORY_SNAPSHOT.hits == hits + 1
+    assert result['count_mode'] == count_mode
+    expected = _run(service, QUERIES[1], None, use_snapshot=False)[1]
+    assert result['total'] == (None if count_mode == "none" else expected)
+
+
+def test_snapshot_refreshes_and_falls_back(service):
+    query = {"operator": "AND", "conditions": [{"field": "owner", "operator": "=", "value": "someone-new"}]}
+    assert _run(service, query, None, use_snapshot=True, page=1) == ([], 0)
+
+    # 本进程内的写操作使快照在下一次查询前刷新
+    service.update_server(7, ServerUpdate(owner="someone-new"))
+    assert _run(service, query, None, use_snapshot=True, page=1) == ([7], 1)
+    service.delete_server(7)
+    assert _run(service, query, None, use_snapshot=True, page=1) == ([], 0)
+
+    # 其他进程写入的行按 last_modified_date 增量刷新
+    row = next(generate_servers(1, 10, seed=1, start_id=5000))
+    row.update(owner="someone-new", last_modified_date=datetime.now())
+    service.db.execute(insert(Server.__table__), [row])
+    service.db.commit()
+    INVENTORY_SNAPSHOT.refresh(service.db, force=True)
+    assert _run(service, query, None, use_snapshot=True, page=1) == ([5000], 1)
+
+    # 快照无法保证一致的查询回退到 SQL
+    fallbacks = sum(INVENTORY_SNAPSHOT.fallbacks.values())
+    query = {"operator": "AND", "conditions": [{"field": "name", "operator": "like", "value": "a\\b"}]}
+    assert _run(service, query, None, use_snapshot=True) == _run(service, query, None, use_snapshot=False)
+    assert sum(INVENTORY_SNAPSHOT.fallbacks.values()) == fallbacks + 1
+
+
+def test_disabled_without_numpy(monkeypatch):
+    import services.inventory_snapshot as module
+    monkeypatch.setattr(module, "np", None)
+    assert not InventorySnapshot(Server, enabled=True).enabled
+
+
+def test_incremental_detects_delete_plus_insert(service):
+    db = service.db
+    query = {"operator": "AND", "conditions": [{"field": "id", "operator": "=", "value": 5}]}
+    assert _run(service, query, None, use_snapshot=True, page=1) == ([5], 1)
+
+    # 其他进程在同一刷新周期内删除一行并新增一行（总行数不变，新行的修改时间早于快照水位线）
+    db.execute(Server.__table__.delete().where(Server.id == 5))
+    row = next(generate_servers(1, 10, seed=2, start_id=6000))
+    row.update(last_modified_date=datetime(2000, 1, 1))
+    db.execute(insert(Server.__table__), [row])
+    db.commit()
+    INVENTORY_SNAPSHOT.refresh(db, force=True)
+    hits = INVENTORY_SNAPSHOT.hits
+    assert _run(service, query, None, use_snapshot=True, page=1) == ([], 0)
+    query["conditions"][0]["value"] = 6000
+    assert _run(service, query, None, use_snapshot=True, page=1) == ([6000], 1)
+    assert INVENTORY_SNAPSHOT.hits == hits + 2
@@ -0,0 +1,70 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from init.database import Base
+from models.server import Server
+from schemas.requests import ServerQueryRequest
+from schemas.server import ServerUpdate
+from services.ip_index import SERVER_IP_INDEX, cidr_bounds, encode_ip, range_bounds
+from services.server_service import ServerService
+
+SERVERS = [
+    {"primary_ip": "10.12.0.5", "other_ip": ""},
+    {"primary_ip": "10.12.255.254", "other_ip": "192.168.1.10,2001:db8::1"},
+    {"primary_ip": "10.13.0.1", "other_ip": "192.168.1.200, bad-ip"},
+    {"primary_ip": "2001:db8:0:1::10", "manage_card_ip": "172.16.0.9"},
+]
+
+
+@pytest.fixture
+def service():
+    SERVER_IP_INDEX.enabled = True
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = Session(engine)
+    for i, values in enumerate(SERVERS, start=1):
+        session.add(Server(id=i, service_tag=f"tag{i}", network_segment_id=1, description="", **values))
+    session.commit()
+    SERVER_IP_INDEX.rebuild(session)
+    session.commit()
+    yield ServerService(session)
+    session.close()
+    SERVER_IP_INDEX.enabled = False
+
+
+def _search(service, field, operator, value):
+    request = ServerQueryRequest(query={"operator": "AND", "conditions": [
+        {"field": field, "operator": operator, "value": value}]}, pagination={}, query_all=True)
+    return sorted(s.id for s in service.get_servers(request)['items'])
+
+
+def test_encoding_preserves_order():
+    assert encode_ip("10.0.0.1") < encode_ip("10.0.0.2") < encode_ip("10.0.1.0") < encode_ip("2001:db8::1")
+    assert cidr_bounds("10.12.3.4/16") == (encode_ip("10.12.0.0"), encode_ip("10.12.255.255"))
+    assert range_bounds("10.0.0.9-10.0.0.1") == (encode_ip("10.0.0.1"), encode_ip("10.0.0.9"))
+    with pytest.raises(ValueError):
+        range_bounds("10.0.0.1-2001:db8::1")
+
+
+@pytest.mark.parametrize("field, operator, value, expected", [
+    ("primary_ip", "in_cidr", "10.12.0.0/16", [1, 2]),
+    ("primary_ip", "in_cidr", "10.0.0.0/8", [1, 2, 3]),
+    ("primary_ip", "in_cidr", "2001:db8::/32", [4]),
+    ("primary_ip", "ip_range", "10.12.255.0-10.13.0.1", [2, 3]),
+    ("other_ip", "in_cidr", "192.168.1.0/24", [2, 3]),
+    ("other_ip", "in_cidr", "2001:db8::/64", [2]),
+    ("manage_card_ip", "in_cidr", "172.16.0.0/12", [4]),
+])
+def test_range_search(service, field, operator, value, expected):
+    assert _search(service, field, operator, value) == expected
+
+
+def test_index_follows_writes_and_rejects_bad_input(service):
+    service.update_server(1, ServerUpdate(primary_ip="10.99.0.1"))
+    assert _search(service, "primary_ip", "in_cidr", "10.12.0.0/16") == [2]
+    service.delete_server(2)
+    assert _search(service, "other_ip", "in_cidr", "192.168.1.0/24") == [3]
+
+    with pytest.raises(ValueError):
+        _search(service, "primary_ip", "in_cidr", "10.12.0.0/33")
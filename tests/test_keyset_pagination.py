@@ -0,0 +1,62 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from init.database import Base
+from models.server import Server
+from schemas.requests import ServerQueryRequest
+from services.server_service import ServerService
+
+
+@pytest.fixture
+def service():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = Session(engine)
+    for i in range(1, 24):
+        session.add(Server(id=i, service_tag=f"tag{i}", name=f"host{i % 5}", network_segment_id=1,
+                           service_level=i % 3, description=""))
+    session.commit()
+    yield ServerService(session)
+    session.close()
+
+
+def _request(cursor, sort, page_size=5):
+    return ServerQueryRequest(
+        query={"operator": "AND", "conditions": []},
+        pagination={"page_size": page_size, "cursor": cursor},
+        sort=sort,
+    )
+
+
+@pytest.mark.parametrize("sort", [
+    [{"field": "name", "order": "asc"}],
+    [{"field": "service_level", "order": "desc"}, {"field": "name", "order": "asc"}],
+])
+def test_cursor_walk_matches_offset_order(service, sort):
+    # 1. 按页码一次性获取完整排序结果
+    expected = [s.id for s in service.get_servers(_request(None, sort, page_size=100))['items']]
+
+    # 2. 按游标向后翻页
+    forward, pages, cursor = [], [], ""
+    while cursor is not None:
+        result = service.get_servers(_request(cursor, sort))
+        forward += [s.id for s in result['items']]
+        pages.append(result)
+        cursor = result['next_cursor']
+    assert forward == expected
+    assert pages[0]['prev_cursor'] is None
+
+    # 3. 从最后一页按游标向前翻页
+    backward, cursor = [s.id for s in pages[-1]['items']], pages[-1]['prev_cursor']
+    while cursor is not None:
+        result = service.get_servers(_request(cursor, sort))
+        backward = [s.id for s in result['items']] + backward
+        cursor = result['prev_cursor']
+    assert backward == expected
+
+
+def test_cursor_rejects_changed_sort(service):
+    result = service.get_servers(_request("", [{"field": "name", "order": "asc"}]))
+    with pytest.raises(ValueError):
+        service.get_servers(_request(result['next_cursor'], [{"field": "name", "order": "desc"}]))
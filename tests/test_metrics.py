@@ -0,0 +1,63 @@
+import json
+import os
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import app
+from init.metrics import METRICS_COLLECTOR, Metrics
+from scripts.synthetic_data import load_dataset
+
+QUERY = {"query": {"operator": "AND", "conditions": [{"field": "cpu_cores", "operator": ">", "value": 16}]},
+         "pagination": {"page": 1, "page_size": 10}}
+ROUTE = 'method="POST",route="/api/server/query"'
+
+
+@pytest.fixture
+def client(monkeypatch):
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    load_dataset(engine, 30)
+    monkeypatch.setattr("routes.server.get_db", sessionmaker(bind=engine))
+    METRICS_COLLECTOR.reset()
+    with app.test_client() as client:
+        yield client
+
+
+def test_request_metrics(client):
+    rows = len(client.post("/api/server/query", json=QUERY).get_json()["data"])
+    client.post("/api/server/query", json=QUERY)
+
+    response = client.get("/metrics")
+    assert response.mimetype == "text/plain"
+    lines = response.get_data(as_text=True).splitlines()
+    assert f'cmdb_http_requests_total{{{ROUTE},status="200"}} 2' in lines
+    assert f"cmdb_response_rows_sum{{{ROUTE}}} {rows * 2}" in lines
+    assert f'cmdb_http_request_duration_seconds_bucket{{{ROUTE},le="+Inf"}} 2' in lines
+    assert f"cmdb_count_query_duration_seconds_count{{{ROUTE}}} 2" in lines
+    assert any(line.startswith(f"cmdb_sql_statements_sum{{{ROUTE}}}") for line in lines)
+    assert any(line.startswith('cmdb_cache_hit_ratio{cache="query_plan"}') for line in lines)
+    assert any(line.startswith('cmdb_db_pool_connections{pool="primary"') for line in lines)
+
+
+def test_directory_merges_processes(tmp_path):
+    metrics = Metrics(str(tmp_path))
+    other = {"counters": [["cmdb_cache_hits_total", [["cache", "count"]], 3],
+                          ["cmdb_cache_misses_total", [["cache", "count"]], 1]],
+             "histograms": [],
+             "gauges": [["cmdb_db_pool_connections", [["pool", "primary"], ["state", "checked_out"]], 4]]}
+    # 仍存活的进程（父进程）与已退出的进程
+    (tmp_path / "live.json").write_text(json.dumps({"pid": os.getppid(), **other}))
+    (tmp_path / "dead.json").write_text(json.dumps({"pid": 2 ** 22 + 1, **other}))
+
+    lines = metrics.render().splitlines()
+    assert (tmp_path / f"{os.getpid()}.json").exists()
+    # 本进程的 COUNT_CACHE 也会计入
+    hits = next(line for line in lines if line.startswith('cmdb_cache_hits_total{cache="count"}'))
+    misses = next(line for line in lines if line.startswith('cmdb_cache_misses_total{cache="count"}'))
+    assert int(hits.split()[-1]) >= 6 and int(misses.split()[-1]) >= 2
+    # 已退出进程的瞬时值不计入
+    checked_out = next(line for line in lines
+                       if line.startswith('cmdb_db_pool_connections{pool="primary",state="checked_out"}'))
+    assert int(checked_out.split()[-1]) == 4
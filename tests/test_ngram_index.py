@@ -0,0 +1,68 @@
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+
+from init.database import Base
+from models.server import Server
+from models.server_ngram import ServerNgram
+from schemas.requests import ServerQueryRequest
+from schemas.server import ServerUpdate
+from services.ngram_index import SERVER_NGRAM_INDEX, ngrams, pattern_ngrams
+from services.server_service import ServerService
+
+NAMES = ["web-bj1-001", "WEB-sh1-002", "db-bj1-003", "cache_gz1", "café-hk1", "app%bj2"]
+
+
+@pytest.fixture
+def service():
+    SERVER_NGRAM_INDEX.enabled = True
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = Session(engine)
+    for i, name in enumerate(NAMES, start=1):
+        session.add(Server(id=i, service_tag=f"tag{i}", name=name, network_segment_id=1, description=""))
+    session.commit()
+    SERVER_NGRAM_INDEX.rebuild(session)
+    session.commit()
+    yield ServerService(session)
+    session.close()
+    SERVER_NGRAM_INDEX.enabled = False
+
+
+def _like(service, value):
+    request = ServerQueryRequest(query={"operator": "AND", "conditions": [
+        {"field": "name", "operator": "like", "value": value}]}, pagination={}, query_all=True)
+    return sorted(s.id for s in service.get_servers(request)['items'])
+
+
+def _scan(service, value):
+    rows = service.db.execute(select(Server.id).where(Server.name.like(f"%{value}%")))
+    return sorted(row.id for row in rows)
+
+
+@pytest.mark.parametrize("value", ["web", "bj1", "-bj1-00", "cafe", "café", "e_gz", "p%bj", "b", "zz", "sh1-002", r"cache\_gz1"])
+def test_like_matches_full_scan(service, value):
+    assert _like(service, value) == _scan(service, value)
+
+
+def test_index_follows_writes(service):
+    service.update_server(1, ServerUpdate(name="renamed-host"))
+    assert _like(service, "renamed") == [1]
+    assert 1 not in _like(service, "web-bj1")
+
+    service.delete_server(2)
+    assert service.db.execute(select(func.count()).where(ServerNgram.server_id == 2)).scalar() == 0
+    assert _like(service, "WEB") == []
+
+
+@pytest.mark.parametrize("value, matches", [
+    (r"cache\_gz1", ["cache_gz1", "cache\\_gz1", "cache\\xgz1"]),
+    (r"app\%bj2", ["app%bj2", "app\\%bj2"]),
+    (r"web\\bj1", ["web\\bj1", "web\\\\bj1"]),
+])
+def test_pattern_ngrams_escaped_wildcard(value, matches):
+    # 转义序列不参与 n-gram，且 MySQL（\x 为字面 x）与 SQLite（\ 为字面字符）两种解释下的匹配文本都包含全部 n-gram
+    grams = pattern_ngrams(value)
+    assert grams
+    for text in matches:
+        assert grams <= ngrams(text)
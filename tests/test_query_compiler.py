@@ -0,0 +1,72 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from init.database import Base
+from models.server import Server
+from schemas.query import QueryGroup, SERVER_QUERY_CONFIG
+from services.query_compiler import QueryCompiler
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = Session(engine)
+    for i in range(1, 6):
+        session.add(Server(id=i, service_tag=f"tag{i}", name=f"host{i}", network_segment_id=i % 2,
+                           service_level=i, description=""))
+    session.commit()
+    yield session
+    session.close()
+
+
+def _query(conditions, operator="AND"):
+    return QueryGroup(operator=operator, conditions=conditions)
+
+
+def test_same_shape_reuses_plan(db):
+    compiler = QueryCompiler(Server, SERVER_QUERY_CONFIG)
+
+    # 1. 相同形态、不同取值的查询只编译一次
+    plan1, params1 = compiler.compile(_query([{"field": "service_level", "operator": ">=", "value": 2}]))
+    plan2, params2 = compiler.compile(_query([{"field": "service_level", "operator": ">=", "value": 4}]))
+    assert plan1 is plan2
+    assert compiler.stats()["hits"] == 1
+    assert compiler.stats()["misses"] == 1
+
+    # 2. 绑定不同参数得到不同结果
+    assert db.query(Server).filter(plan1.clause).params(params1).count() == 4
+    assert db.query(Server).filter(plan2.clause).params(params2).count() == 2
+
+
+def test_nested_group_and_in(db):
+    compiler = QueryCompiler(Server, SERVER_QUERY_CONFIG)
+    query = _query([
+        {"field": "network_segment_id", "operator": "in", "value": [1]},
+        {"operator": "AND", "conditions": [{"field": "name", "operator": "like", "value": "host2"}]},
+    ], operator="OR")
+    plan, params = compiler.compile(query)
+    ids = sorted(s.id for s in db.query(Server).filter(plan.clause).params(params))
+    assert ids == [1, 2, 3, 5]
+
+
+def test_lru_eviction():
+    compiler = QueryCompiler(Server, SERVER_QUERY_CONFIG, max_size=2)
+    for field in ("name", "owner", "label"):
+        compiler.compile(_query([{"field": field, "operator": "=", "value": "x"}]))
+    stats = compiler.stats()
+    assert stats["size"] == 2
+    assert stats["evictions"] == 1
+
+
+@pytest.mark.parametrize("condition", [
+    {"field": "not_exist", "operator": "=", "value": 1},
+    {"field": "name", "operator": ">", "value": "x"},
+    {"field": "use_status", "operator": "=", "value": "unknown"},
+    {"field": "service_level", "operator": "=", "value": "1"},
+])
+def test_invalid_condition(condition):
+    compiler = QueryCompiler(Server, SERVER_QUERY_CONFIG)
+    with pytest.raises(ValueError):
+        compiler.compile(_query([condition]))
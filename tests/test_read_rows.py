@@ -0,0 +1,36 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session
+
+from routes.server import serialize_servers
+from schemas.requests import ServerQueryRequest
+from scripts.synthetic_data import load_dataset
+from services.server_service import ServerService
+
+
+@pytest.fixture
+def service():
+    engine = create_engine("sqlite://")
+    load_dataset(engine, 200)
+    session = Session(engine)
+    yield ServerService(session)
+    session.close()
+
+
+@pytest.mark.parametrize("body", [
+    {"query": {"operator": "AND", "conditions": [{"field": "cpu_cores", "operator": ">", "value": 16}]},
+     "pagination": {"page": 2, "page_size": 15}, "sort": [{"field": "name", "order": "desc"}]},
+    {"query": {"operator": "AND", "conditions": []}, "pagination": {"page_size": 10, "cursor": ""},
+     "sort": [{"field": "ram_size", "order": "asc"}], "fields": ["name", "ram_size"]},
+])
+def test_rows_match_orm_objects(service, body):
+    request = ServerQueryRequest(**body)
+    rows = service.get_servers(request, as_rows=True)
+    # 只读路径不向会话加载对象
+    assert rows['items'] and all(isinstance(row, Row) for row in rows['items'])
+    assert len(service.db.identity_map) == 0
+
+    objects = service.get_servers(request)
+    assert rows['total'] == objects['total'] and rows.get('next_cursor') == objects.get('next_cursor')
+    assert serialize_servers(rows['items'], request.fields) == serialize_servers(objects['items'], request.fields)
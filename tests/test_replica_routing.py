@@ -0,0 +1,133 @@
+import pytest
+from sqlalchemy import create_engine, select, update
+from sqlalchemy.orm import sessionmaker
+
+from app import app
+from config import Config
+from init import database
+from init.routing import PIN_PRIMARY, RoutingSession
+from models.network_segment import NetworkSegment
+from models.server import Server
+from schemas.network_segment import NetworkSegmentUpdate
+from schemas.query import Pagination, QueryGroup
+from schemas.requests import ServerQueryRequest
+from schemas.server import ServerUpdate
+from scripts.synthetic_data import load_dataset
+from services.count_strategy import COUNT_CACHE
+from services.facet_service import FACET_CACHE, FacetService
+from services.inventory_snapshot import InventorySnapshot
+from services.network_segment_service import NetworkSegmentService
+from services.server_service import ServerService
+
+
+@pytest.fixture
+def engines(tmp_path):
+    # 三个 SQLite 文件分别作为主库与两个从库，初始数据相同
+    primary, *replicas = [create_engine(f"sqlite:///{tmp_path / name}.db") for name in ("primary", "r1", "r2")]
+    for engine in (primary, *replicas):
+        load_dataset(engine, 20)
+    # 从库上的名称与主库不同，用于区分读取来源
+    for replica in replicas:
+        with replica.begin() as connection:
+            connection.execute(update(Server).where(Server.id == 3).values(name="replica"))
+    yield primary, replicas
+    for engine in (primary, *replicas):
+        engine.dispose()
+
+
+def _read_name(db, server_id=3):
+    result = ServerService(db).get_servers_by_keys("id", [server_id], fields=["name"])[0]
+    return result[server_id].name
+
+
+def test_reads_use_replica_until_session_writes(engines):
+    primary, replicas = engines
+    SessionLocal = sessionmaker(class_=RoutingSession, bind=primary, replicas=replicas)
+
+    with SessionLocal() as db:
+        assert _read_name(db) == "replica"
+        # 非只读方法（更新）在主库上读取并写入，之后本会话的读取也走主库
+        ServerService(db).update_server(4, ServerUpdate(name="written"))
+        assert _read_name(db, 4) == "written"
+
+    with SessionLocal() as db:
+        db.info[PIN_PRIMARY] = True
+        assert _read_name(db) != "replica"
+
+
+def test_consistency_token_pins_client_to_primary(engines, monkeypatch):
+    primary, replicas = engines
+    monkeypatch.setattr(database, "SessionLocal", sessionmaker(class_=RoutingSession, bind=primary, replicas=replicas))
+
+    with app.test_client() as client:
+        assert client.get("/api/server/3").get_json()["data"]["name"] == "replica"
+        assert "X-Consistency-Token" not in client.get("/api/server/3").headers
+
+        response = client.put("/api/server/3", json={"name": "renamed"})
+        token = response.headers["X-Consistency-Token"]
+        assert response.status_code == 200
+
+        # 带令牌（请求头或 Cookie）读到自己的写入，不带令牌的客户端仍读从库
+        assert client.get("/api/server/3").get_json()["data"]["name"] == "renamed"
+        client.delete_cookie("consistency_token")
+        assert client.get("/api/server/3").get_json()["data"]["name"] == "replica"
+        assert client.get("/api/server/3", headers={"X-Consistency-Token": token}).get_json()["data"]["name"] == "renamed"
+
+
+def test_invalidated_caches_refill_from_primary(engines, monkeypatch):
+    primary, replicas = engines
+    SessionLocal = sessionmaker(class_=RoutingSession, bind=primary, replicas=replicas)
+    snapshot = InventorySnapshot(Server, enabled=True)
+    monkeypatch.setattr("services.server_service.INVENTORY_SNAPSHOT", snapshot)
+    monkeypatch.setattr(Config, "CONSISTENCY_WINDOW", 5)
+    everything = QueryGroup(operator="AND", conditions=[])
+
+    def cached_total(db):
+        request = ServerQueryRequest(query=everything, pagination=Pagination(page=1, page_size=1), count_mode="cached")
+        snapshot.enabled = False
+        try:
+            return ServerService(db).get_servers(request)["total"]
+        finally:
+            snapshot.enabled = True
+
+    def facet_total(db):
+        return sum(bucket["count"] for bucket in FacetService(db).get_facets(None, ["use_status"])["use_status"])
+
+    def snapshot_total(db):
+        request = ServerQueryRequest(query=everything, pagination=Pagination(page=1, page_size=1))
+        return ServerService(db).get_servers(request)["total"]
+
+    # 删除只发生在主库上（从库尚未同步），写操作使计数缓存、分面缓存与快照失效
+    with SessionLocal() as db:
+        ServerService(db).delete_server(5)
+
+    # 失效后 CONSISTENCY_WINDOW 内重新填充的读取走主库，缓存中不会写入从库上的旧结果
+    with SessionLocal() as db:
+        assert cached_total(db) == facet_total(db) == snapshot_total(db) == 19
+    with SessionLocal() as db:
+        assert cached_total(db) == facet_total(db) == 19 and snapshot.hits == 1
+
+    # 超过 CONSISTENCY_WINDOW 后重新填充的读取回到从库
+    monkeypatch.setattr(Config, "CONSISTENCY_WINDOW", 0)
+    COUNT_CACHE.invalidate()
+    FACET_CACHE.invalidate()
+    with SessionLocal() as db:
+        assert cached_total(db) == facet_total(db) == 20
+
+
+def test_network_segment_writes_read_primary(engines):
+    primary, replicas = engines
+    SessionLocal = sessionmaker(class_=RoutingSession, bind=primary, replicas=replicas)
+    # 从库落后主库一个版本
+    with primary.begin() as connection:
+        connection.execute(update(NetworkSegment).where(NetworkSegment.id.in_([1, 2]))
+                           .values(description="primary", version=NetworkSegment.version + 1))
+
+    with SessionLocal() as db:
+        # If-Match 为主库上的当前版本时不应误报 412，未带 If-Match 时也不应因版本不一致而更新失败
+        segment = NetworkSegmentService(db).update_network_segment(1, NetworkSegmentUpdate(name="renamed"), {2})
+        assert segment.name == "renamed" and segment.version == 3
+    with SessionLocal() as db:
+        NetworkSegmentService(db).delete_network_segment(2)
+    with primary.connect() as connection:
+        assert connection.execute(select(NetworkSegment.is_valid).where(NetworkSegment.id == 2)).scalar() in (False, 0)
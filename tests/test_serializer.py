@@ -0,0 +1,29 @@
+import json
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from models.network_segment import NetworkSegment
+from models.server import Server
+from schemas.network_segment import NetworkSegment as NetworkSegmentSchema
+from schemas.server import Server as ServerSchema
+from scripts.synthetic_data import load_dataset
+from services.serializer import NETWORK_SEGMENT_SERIALIZER, SERVER_SERIALIZER, dumps
+
+
+def test_matches_pydantic_output():
+    engine = create_engine("sqlite://")
+    load_dataset(engine, 50)
+    with Session(engine) as db:
+        for model, schema, serializer in ((Server, ServerSchema, SERVER_SERIALIZER),
+                                          (NetworkSegment, NetworkSegmentSchema, NETWORK_SEGMENT_SERIALIZER)):
+            objs = db.scalars(select(model).order_by(model.id)).all()
+            expected = [schema.model_validate(obj).model_dump(mode="json") for obj in objs]
+            assert json.loads(dumps(serializer.from_objects(objs))) == json.loads(json.dumps(expected))
+
+            rows = db.execute(select(*serializer.select_columns()).order_by(model.id)).all()
+            assert json.loads(dumps(serializer.from_rows(rows))) == json.loads(dumps(serializer.from_objects(objs)))
+
+        server = db.get(Server, 1)
+        assert SERVER_SERIALIZER.from_objects([server], ["id", "cpu_cores"]) == [
+            {"id": 1, "cpu_cores": server.cpu_cores}]
@@ -0,0 +1,38 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import app
+from config import Config
+from init.timing import TIMING_STATS
+from scripts.synthetic_data import load_dataset
+
+QUERY = {"query": {"operator": "AND", "conditions": [{"field": "cpu_cores", "operator": ">", "value": 16}]},
+         "pagination": {"page": 1, "page_size": 10}}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    load_dataset(engine, 30)
+    monkeypatch.setattr("routes.server.get_db", sessionmaker(bind=engine))
+    TIMING_STATS.reset()
+    with app.test_client() as client:
+        yield client
+
+
+def test_query_stages_in_header_and_stats(client):
+    response = client.post("/api/server/query", json=QUERY)
+    stages = [item.split(";")[0] for item in response.headers["Server-Timing"].split(", ")]
+    assert {"validate", "compile", "count", "fetch", "serialize", "encode", "sql"} <= set(stages)
+    assert stages[-1] == "total"
+
+    stats = client.get("/api/system/timing").get_json()["data"]["POST /api/server/query"]
+    assert stats["total"]["count"] == 1 and stats["fetch"]["max_ms"] > 0
+
+
+def test_sampling_can_be_disabled(client, monkeypatch):
+    monkeypatch.setattr(Config, "SERVER_TIMING_SAMPLE_RATE", 0)
+    assert "Server-Timing" not in client.post("/api/server/query", json=QUERY).headers
+    assert TIMING_STATS.snapshot() == {}
@@ -0,0 +1,87 @@
+import json
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import app
+from init.slow_query_log import SLOW_QUERY_LOG, SlowQueryLog, fingerprint
+from scripts.synthetic_data import load_dataset
+
+
+def query(cores):
+    return {"query": {"operator": "AND", "conditions": [{"field": "cpu_cores", "operator": ">", "value": cores}]},
+            "pagination": {"page": 1, "page_size": 10}}
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    load_dataset(engine, 30)
+    monkeypatch.setattr("routes.server.get_db", sessionmaker(bind=engine))
+    # 记录所有语句
+    monkeypatch.setattr(SLOW_QUERY_LOG, "threshold_ms", 1e-6)
+    monkeypatch.setattr(SLOW_QUERY_LOG, "path", str(tmp_path / "slow.log"))
+    monkeypatch.setattr(SLOW_QUERY_LOG, "_file_logger", None)
+    SLOW_QUERY_LOG.reset()
+    with app.test_client() as client:
+        yield client
+
+
+def test_log_and_summary(client, tmp_path):
+    client.post("/api/server/query", json=query(16))
+    client.post("/api/server/query", json=query(32))
+
+    entries = [json.loads(line) for line in (tmp_path / "slow.log").read_text(encoding="utf-8").splitlines()]
+    entry = next(entry for entry in entries if entry["query"] is not None)
+    assert entry["route"] == "POST /api/server/query"
+    assert entry["query"]["conditions"][0]["field"] == "cpu_cores"
+    assert "FROM server" in entry["sql"] and entry["duration_ms"] > 0
+
+    # 两次请求的查询形态相同，按指纹累计（COUNT 与分页查询各一个指纹）
+    data = client.get("/api/system/slow_queries?order_by=count").get_json()["data"]
+    assert [item["count"] for item in data if item["query"] is not None] == [2, 2]
+    assert data[0]["routes"] == {"POST /api/server/query": 2}
+
+    assert client.get("/api/system/slow_queries?order_by=rows").status_code == 400
+
+
+def test_fingerprint_ignores_in_list_length():
+    assert fingerprint("SELECT * FROM t WHERE id IN (?, ?)") == fingerprint("SELECT  *\nFROM t WHERE id IN (?)")
+    assert fingerprint("SELECT 1", shape=("AND", ())) != fingerprint("SELECT 1")
+
+
+def test_log_rotates(tmp_path):
+    log = SlowQueryLog(1, str(tmp_path / "slow.log"), max_bytes=200, backup_count=2)
+    for _ in range(5):
+        log.record("SELECT * FROM servers WHERE id = ?", (1,), False, 5.0, None)
+    assert (tmp_path / "slow.log.1").exists() and not (tmp_path / "slow.log.3").exists()
+    assert log.top(order_by="count")[0]["count"] == 5
+
+
+def entries(tmp_path):
+    return [json.loads(line) for line in (tmp_path / "slow.log").read_text(encoding="utf-8").splitlines()]
+
+
+def test_rowcount_of_select_and_write(client, tmp_path):
+    body = client.post("/api/server/query", json={**query(16), "pagination": {"page": 1, "page_size": 4}}).get_json()
+    page = next(entry for entry in entries(tmp_path) if entry["query"] and "LIMIT" in entry["sql"])
+    # SELECT 的行数为读取的行数，而不是驱动返回的 -1
+    assert page["rowcount"] == len(body["data"]) == 4
+
+    facets = client.post("/api/server/facets", json={**query(16), "fields": ["use_status", "service_level"]}).get_json()["data"]
+    facet = next(entry for entry in entries(tmp_path) if entry["route"] == "POST /api/server/facets")
+    assert facet["query"]["conditions"][0]["field"] == "cpu_cores"
+    assert facet["rowcount"] == sum(len(buckets) for buckets in facets.values())
+
+    deleted = client.delete("/api/server/by_query", json={**query(32), "max_rows": 30}).get_json()["data"]
+    delete = next(entry for entry in entries(tmp_path) if entry["sql"].startswith("DELETE"))
+    assert delete["rowcount"] == deleted["affected"] and delete["query"]["conditions"][0]["value"] == 32
+
+
+def test_export_binds_query(client, tmp_path):
+    response = client.post("/api/server/export", json={"query": query(16)["query"]})
+    assert response.status_code == 200 and response.get_data()
+    export = next(entry for entry in entries(tmp_path) if entry["route"] == "POST /api/server/export")
+    assert export["query"]["conditions"][0]["field"] == "cpu_cores"